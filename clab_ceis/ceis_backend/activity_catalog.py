@@ -0,0 +1,270 @@
+"""Local full-text catalog of Wiser activities behind /activity-search.
+
+Every activity returned by a Wiser search is recorded in the FTS5 table
+``activity_catalog`` (rowid = Wiser activity id), which can also be filled in
+bulk from an activity list file. Searches are answered from the catalog with
+bm25 ranking and prefix matching; Wiser is only asked when too few activities
+match locally, and the catalog alone is used when Wiser is unreachable.
+
+Usage:
+    python -m ceis_backend.activity_catalog import activities.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import re
+from pathlib import Path
+from time import time
+from typing import Any, Iterable
+
+from ceis_backend.async_queries import async_db
+from ceis_backend.config import (
+    ACTIVITY_SEARCH_LIMIT,
+    ACTIVITY_SEARCH_MIN_LOCAL_RESULTS,
+    ACTIVITY_SEARCH_QUERY_TTL_SECONDS,
+)
+from ceis_backend.db_connection import get_connection
+from ceis_backend.db_init import apply_schema_migrations, create_tables
+from ceis_backend.wiser_bridge import AsyncWiserClient, WiserClient, WiserClientError
+
+# Header aliases accepted by the bulk import, after lower-casing and
+# replacing spaces with underscores (covers ecoinvent activity overviews).
+_CSV_COLUMNS = {
+    "id": ("id", "activity_id", "wiser_id"),
+    "name": ("name", "activity_name"),
+    "reference_product": ("reference_product", "reference_product_name", "product"),
+    "location": ("location", "geography"),
+}
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(_TOKEN_PATTERN.findall(query.lower()))
+
+
+def _match_expression(query: str) -> str:
+    # Quote every token so FTS5 operators in user input stay literal, and
+    # prefix-match each one so partially typed words already find results.
+    return " ".join(f'"{token}"*' for token in _normalize_query(query).split())
+
+
+def _result_from_wiser(item: dict[str, Any]) -> dict[str, Any]:
+    location = item.get("location", {}) or {}
+    return {
+        "id": item.get("id"),
+        "location": location.get("code"),
+        "name": item.get("name"),
+        "reference_product": item.get("reference_product"),
+    }
+
+
+def record_activities(results: Iterable[dict[str, Any]]) -> int:
+    """Upsert search results (``id``, ``name``, ...) into the catalog."""
+    rows = [
+        (
+            int(result["id"]),
+            result.get("name") or "",
+            result.get("reference_product") or "",
+            result.get("location") or "",
+        )
+        for result in results
+        if result.get("id") is not None
+    ]
+    if not rows:
+        return 0
+    with get_connection() as conn:
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO activity_catalog
+                (rowid, name, reference_product, location)
+            VALUES (?, ?, ?, ?)
+            """,
+            rows,
+        )
+        conn.commit()
+    return len(rows)
+
+
+def search_local_activities(
+    query: str, limit: int = ACTIVITY_SEARCH_LIMIT
+) -> list[dict[str, Any]]:
+    match = _match_expression(query)
+    if not match:
+        return []
+    with get_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT rowid, location, name, reference_product
+            FROM activity_catalog
+            WHERE activity_catalog MATCH ?
+            ORDER BY bm25(activity_catalog, 10.0, 5.0, 1.0), rowid
+            LIMIT ?
+            """,
+            (match, limit),
+        ).fetchall()
+    return [
+        {
+            "id": row[0],
+            "location": row[1] or None,
+            "name": row[2] or None,
+            "reference_product": row[3] or None,
+        }
+        for row in rows
+    ]
+
+
+def _searched_recently(normalized_query: str) -> bool:
+    with get_connection() as conn:
+        row = conn.execute(
+            "SELECT searched_at FROM activity_catalog_searches WHERE query = ?",
+            (normalized_query,),
+        ).fetchone()
+    return row is not None and time() - row[0] <= ACTIVITY_SEARCH_QUERY_TTL_SECONDS
+
+
+def _record_search(normalized_query: str) -> None:
+    with get_connection() as conn:
+        conn.execute(
+            """
+            INSERT INTO activity_catalog_searches (query, searched_at)
+            VALUES (?, ?)
+            ON CONFLICT(query) DO UPDATE SET searched_at = excluded.searched_at
+            """,
+            (normalized_query, time()),
+        )
+        conn.commit()
+
+
+def _search_local_first(
+    query: str, limit: int
+) -> tuple[list[dict[str, Any]], str | None]:
+    """Local results, and the normalized query when Wiser should be asked too."""
+    local_results = search_local_activities(query, limit)
+    if len(local_results) >= min(ACTIVITY_SEARCH_MIN_LOCAL_RESULTS, limit):
+        return local_results, None
+    normalized_query = _normalize_query(query)
+    if _searched_recently(normalized_query):
+        return local_results, None
+    return local_results, normalized_query
+
+
+def _record_wiser_results(
+    normalized_query: str,
+    wiser_items: list[dict[str, Any]],
+    local_results: list[dict[str, Any]],
+    limit: int,
+) -> list[dict[str, Any]]:
+    wiser_results = [_result_from_wiser(item) for item in wiser_items]
+    record_activities(wiser_results)
+    _record_search(normalized_query)
+
+    # Keep Wiser's ranking, then add local matches it did not return.
+    seen_ids = {result["id"] for result in wiser_results}
+    merged = wiser_results + [
+        result for result in local_results if result["id"] not in seen_ids
+    ]
+    return merged[:limit]
+
+
+def search_activities(
+    wiser_client: WiserClient, query: str, limit: int = ACTIVITY_SEARCH_LIMIT
+) -> list[dict[str, Any]]:
+    """Search the catalog, asking Wiser only when local results are too few.
+
+    Raises WiserClientError only if Wiser fails and nothing matched locally.
+    """
+    local_results, normalized_query = _search_local_first(query, limit)
+    if normalized_query is None:
+        return local_results
+
+    try:
+        wiser_items = wiser_client.search_activities(query)
+    except WiserClientError:
+        if local_results:
+            return local_results
+        raise
+    return _record_wiser_results(normalized_query, wiser_items, local_results, limit)
+
+
+async def search_activities_async(
+    wiser_client: AsyncWiserClient, query: str, limit: int = ACTIVITY_SEARCH_LIMIT
+) -> list[dict[str, Any]]:
+    """``search_activities`` for async endpoints, on the database threads."""
+    local_results, normalized_query = await async_db.run_read(
+        _search_local_first, query, limit
+    )
+    if normalized_query is None:
+        return local_results
+
+    try:
+        wiser_items = await wiser_client.search_activities(query)
+    except WiserClientError:
+        if local_results:
+            return local_results
+        raise
+    return await async_db.run_write(
+        _record_wiser_results, normalized_query, wiser_items, local_results, limit
+    )
+
+
+def _read_csv_activities(path: Path) -> list[dict[str, Any]]:
+    with path.open(newline="", encoding="utf-8-sig") as handle:
+        reader = csv.DictReader(handle)
+        headers = {
+            (header or "").strip().lower().replace(" ", "_"): header
+            for header in reader.fieldnames or []
+        }
+        columns = {}
+        for field, aliases in _CSV_COLUMNS.items():
+            for alias in aliases:
+                if alias in headers:
+                    columns[field] = headers[alias]
+                    break
+        if "id" not in columns or "name" not in columns:
+            raise ValueError(f"{path} needs at least an id and a name column")
+        return [
+            {field: row.get(column) for field, column in columns.items()}
+            for row in reader
+            if (row.get(columns["id"]) or "").strip()
+        ]
+
+
+def import_activity_catalog(path: str | os.PathLike) -> int:
+    """Bulk-load a CSV activity list or a JSON list of Wiser search results."""
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        items = json.loads(path.read_text())
+        if not isinstance(items, list):
+            raise ValueError(f"{path} must contain a list of activities")
+        results = [
+            _result_from_wiser(item) if isinstance(item.get("location"), dict) else item
+            for item in items
+        ]
+    else:
+        results = _read_csv_activities(path)
+    return record_activities(results)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["import"])
+    parser.add_argument("path")
+    args = parser.parse_args(argv)
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        create_tables(cursor)
+        apply_schema_migrations(cursor)
+        conn.commit()
+
+    count = import_activity_catalog(args.path)
+    print(f"Imported {count} activities from {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Reverse dependency index from Wiser activities to what their factors feed.
+
+An activity's emission factor is read for the materials and process types
+referencing it, and through those for fabric block types, garment recipes
+and sold garments. The index is answered from the recipe and inventory
+tables (with the reverse lookup indexes of schema migration 3), so it can
+never disagree with them.
+
+When factors change, ``mark_sold_garments_stale`` flags only the sold
+garments whose ``co2eq`` reads one of them; the sold-garment CO2 job then
+recomputes those in bulk.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Iterable
+
+from ceis_backend.data.location_details import (
+    ACTIVITY_ID_LONG_DISTANCE_TRANSPORT,
+    ACTIVITY_ID_TRANSPORT,
+)
+from ceis_backend.db_connection import get_connection
+
+DEPENDENT_KINDS = (
+    "materials",
+    "process_types",
+    "fabric_block_types",
+    "garment_types",
+    "sold_garments",
+)
+
+# (activity_id, dependent id) pairs per kind. {ids} becomes numbered
+# parameters (?1, ?2, ...), so every branch binds the same activity IDs.
+_DEPENDENT_QUERIES = {
+    "materials": """
+        SELECT activity_id, id FROM materials WHERE activity_id IN ({ids})
+    """,
+    "process_types": """
+        SELECT activity_id, id FROM process_types WHERE activity_id IN ({ids})
+    """,
+    "fabric_block_types": """
+        SELECT pt.activity_id, fbrp.fabric_block_type
+        FROM fabric_block_recipe_processes fbrp
+        JOIN process_types pt ON pt.id = fbrp.process_id
+        WHERE pt.activity_id IN ({ids})
+    """,
+    "garment_types": """
+        SELECT m.activity_id, grm.garment_type
+        FROM garment_recipe_materials grm
+        JOIN materials m ON m.id = grm.material_id
+        WHERE m.activity_id IN ({ids})
+        UNION
+        SELECT pt.activity_id, grp.garment_type
+        FROM garment_recipe_processes grp
+        JOIN process_types pt ON pt.id = grp.process_id
+        WHERE pt.activity_id IN ({ids})
+        UNION
+        SELECT pt.activity_id, grfb.garment_type
+        FROM garment_recipe_fabric_blocks grfb
+        JOIN fabric_block_recipe_processes fbrp
+            ON fbrp.fabric_block_type = grfb.fabric_block_id
+        JOIN process_types pt ON pt.id = fbrp.process_id
+        WHERE pt.activity_id IN ({ids})
+    """,
+    # Mirrors the inputs of get_co2_for_sold_garment.
+    "sold_garments": """
+        SELECT m.activity_id, gi.id
+        FROM garments_inventory gi
+        JOIN fabric_blocks_inventory fbi ON fbi.garment_id = gi.id
+        JOIN materials m ON m.id = fbi.material_id
+        WHERE gi.sold = 1 AND m.activity_id IN ({ids})
+        UNION
+        SELECT pt.activity_id, gi.id
+        FROM garments_inventory gi
+        JOIN fabric_blocks_inventory fbi ON fbi.garment_id = gi.id
+        JOIN processes_fabric_blocks_inventory pfbi
+            ON pfbi.fabric_block_id = fbi.id
+        JOIN process_types pt ON pt.id = pfbi.process_id
+        WHERE gi.sold = 1 AND pt.activity_id IN ({ids})
+        UNION
+        SELECT pt.activity_id, gi.id
+        FROM garments_inventory gi
+        JOIN fabric_blocks_inventory fbi ON fbi.garment_id = gi.id
+        JOIN fabric_block_recipe_processes fbrp
+            ON fbrp.fabric_block_type = fbi.type_id
+        JOIN process_types pt ON pt.id = fbrp.process_id
+        WHERE gi.sold = 1 AND pt.activity_id IN ({ids})
+        UNION
+        SELECT pt.activity_id, gi.id
+        FROM garments_inventory gi
+        JOIN garment_recipe_processes grp ON grp.garment_type = gi.type_id
+        JOIN process_types pt ON pt.id = grp.process_id
+        WHERE gi.sold = 1 AND pt.activity_id IN ({ids})
+        UNION
+        SELECT pt.activity_id, gi.id
+        FROM garments_inventory gi
+        JOIN processes_garments_inventory pgi ON pgi.garment_id = gi.id
+        JOIN process_types pt ON pt.id = pgi.process_id
+        WHERE gi.sold = 1 AND pt.activity_id IN ({ids})
+    """,
+}
+
+# Every garment recipe reads the transport factors, whatever it is made of.
+_TRANSPORT_ACTIVITY_IDS = {ACTIVITY_ID_TRANSPORT, ACTIVITY_ID_LONG_DISTANCE_TRANSPORT}
+
+
+def _numbered_placeholders(count: int) -> str:
+    return ", ".join(f"?{index}" for index in range(1, count + 1))
+
+
+def activity_dependents(
+    activity_ids: Iterable[int],
+) -> dict[int, dict[str, list[int]]]:
+    """Per activity, the IDs of every entity depending on its factor, by kind."""
+    activity_ids = list(dict.fromkeys(int(activity_id) for activity_id in activity_ids))
+    if not activity_ids:
+        return {}
+    dependents = {
+        activity_id: {kind: set() for kind in DEPENDENT_KINDS}
+        for activity_id in activity_ids
+    }
+
+    placeholders = _numbered_placeholders(len(activity_ids))
+    with get_connection() as conn:
+        for kind, query in _DEPENDENT_QUERIES.items():
+            sql = query.format(ids=placeholders)
+            for activity_id, dependent_id in conn.execute(sql, activity_ids):
+                dependents[activity_id][kind].add(dependent_id)
+
+        if _TRANSPORT_ACTIVITY_IDS.intersection(activity_ids):
+            garment_type_ids = {
+                row[0]
+                for row in conn.execute(
+                    "SELECT DISTINCT garment_type FROM garment_recipe_fabric_blocks"
+                ).fetchall()
+            }
+            for activity_id in _TRANSPORT_ACTIVITY_IDS.intersection(activity_ids):
+                dependents[activity_id]["garment_types"].update(garment_type_ids)
+
+    return {
+        activity_id: {kind: sorted(ids) for kind, ids in by_kind.items()}
+        for activity_id, by_kind in dependents.items()
+    }
+
+
+def mark_sold_garments_stale(
+    activity_ids: Iterable[int], conn: sqlite3.Connection | None = None
+) -> int:
+    """Flag the sold garments whose CO2 reads any given factor as stale.
+
+    Bumps ``co2_stale`` in a single statement. A recomputation that started
+    before the change only subtracts the count it read, so the flag stays.
+    Pass ``conn`` to take part in the caller's transaction; otherwise the
+    update commits itself.
+    """
+    activity_ids = list({int(activity_id) for activity_id in activity_ids})
+    if not activity_ids:
+        return 0
+
+    query = _DEPENDENT_QUERIES["sold_garments"].format(
+        ids=_numbered_placeholders(len(activity_ids))
+    )
+    sql = f"""
+        UPDATE garments_inventory
+        SET co2_stale = co2_stale + 1
+        WHERE id IN (SELECT id FROM ({query}))
+    """
+    if conn is not None:
+        return conn.execute(sql, activity_ids).rowcount
+    with get_connection() as own_conn:
+        marked = own_conn.execute(sql, activity_ids).rowcount
+        own_conn.commit()
+    return marked
@@ -0,0 +1,94 @@
+"""Awaitable versions of the hot ``queries.py`` functions for async endpoints.
+
+The functions run unchanged on dedicated database threads, each with its
+own pooled connection (see ``db_connection.py``), so the event loop keeps
+serving other requests while SQLite works. Reads share a pool of
+``DB_READ_THREADS`` threads. Writes go to a single thread: SQLite allows
+one writer at a time, so queueing them here is cheaper than having
+threads wait on the database lock.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Awaitable, Callable, ParamSpec, TypeVar
+
+from ceis_backend import queries
+from ceis_backend.config import DB_READ_THREADS
+
+_P = ParamSpec("_P")
+_T = TypeVar("_T")
+
+
+class AsyncDatabase:
+    def __init__(self, read_threads: int) -> None:
+        self.read_threads = max(int(read_threads), 1)
+        self._lock = Lock()
+        self._readers: ThreadPoolExecutor | None = None
+        self._writer: ThreadPoolExecutor | None = None
+
+    def _executors(self) -> tuple[ThreadPoolExecutor, ThreadPoolExecutor]:
+        # Created on first use, and again after close(), e.g. between tests.
+        with self._lock:
+            if self._readers is None:
+                self._readers = ThreadPoolExecutor(
+                    self.read_threads, thread_name_prefix="ceis-db-read"
+                )
+                self._writer = ThreadPoolExecutor(1, thread_name_prefix="ceis-db-write")
+            return self._readers, self._writer
+
+    async def run_read(
+        self, fn: Callable[_P, _T], *args: _P.args, **kwargs: _P.kwargs
+    ) -> _T:
+        readers, _ = self._executors()
+        return await asyncio.get_running_loop().run_in_executor(
+            readers, functools.partial(fn, *args, **kwargs)
+        )
+
+    async def run_write(
+        self, fn: Callable[_P, _T], *args: _P.args, **kwargs: _P.kwargs
+    ) -> _T:
+        _, writer = self._executors()
+        return await asyncio.get_running_loop().run_in_executor(
+            writer, functools.partial(fn, *args, **kwargs)
+        )
+
+    def close(self) -> None:
+        """Wait for queued work and stop the threads, e.g. on shutdown."""
+        with self._lock:
+            executors = [self._readers, self._writer]
+            self._readers = self._writer = None
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+
+async_db = AsyncDatabase(DB_READ_THREADS)
+
+
+def _reader(fn: Callable[_P, _T]) -> Callable[_P, Awaitable[_T]]:
+    @functools.wraps(fn)
+    async def read(*args: _P.args, **kwargs: _P.kwargs) -> _T:
+        return await async_db.run_read(fn, *args, **kwargs)
+
+    return read
+
+
+def _writer(fn: Callable[_P, _T]) -> Callable[_P, Awaitable[_T]]:
+    @functools.wraps(fn)
+    async def write(*args: _P.args, **kwargs: _P.kwargs) -> _T:
+        return await async_db.run_write(fn, *args, **kwargs)
+
+    return write
+
+
+db_get_garment_types = _reader(queries.db_get_garment_types)
+db_get_locations = _reader(queries.db_get_locations)
+db_get_materials = _reader(queries.db_get_materials)
+db_get_strategy_progress = _reader(queries.db_get_strategy_progress)
+db_get_fabric_blocks = _reader(queries.db_get_fabric_blocks)
+db_create_fabric_block = _writer(queries.db_create_fabric_block)
+db_delete_fabric_block = _writer(queries.db_delete_fabric_block)
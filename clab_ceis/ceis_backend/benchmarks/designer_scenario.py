@@ -0,0 +1,151 @@
+"""Per-scenario cost of the designer balance.
+
+Evaluates ``get_designer_balance_scenario`` for every garment type x recipe
+material pair of a fresh, seeded database in a temporary directory, with
+synthetic suppliers and a constant-factor Wiser client, so only the scenario
+itself is measured. Reports the time and the SQL statements per scenario,
+once with the CO2 result cache warm and once with it cleared every call.
+
+Usage:
+    python -m ceis_backend.benchmarks.designer_scenario --rounds 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+from time import perf_counter
+from unittest.mock import MagicMock
+
+import numpy as np
+
+SUPPLIERS_PER_ROLE = 8
+
+
+def _seed_suppliers(db_path: str, rng: random.Random) -> list[tuple[str, ...]]:
+    """Insert synthetic suppliers with all distances; return supplier triples."""
+    companies = {
+        role_group: [f"{role_group} {index}" for index in range(SUPPLIERS_PER_ROLE)]
+        for role_group in ("fabric", "garment", "finishing")
+    }
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        """
+        INSERT OR IGNORE INTO manufacturers (company, role, role_group, location)
+        VALUES (?, ?, ?, ?)
+        """,
+        [
+            (company, role_group, role_group, f"{company} street")
+            for role_group, names in companies.items()
+            for company in names
+        ],
+    )
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO manufacturer_distances (
+            source_company, source_role_group, source_location,
+            destination_company, destination_role_group, destination_location,
+            distance_km
+        )
+        VALUES (?, ?, '', ?, ?, '', ?)
+        """,
+        [
+            (source, source_group, destination, destination_group, rng.uniform(5, 900))
+            for source_group, destination_group in (
+                ("fabric", "garment"),
+                ("garment", "finishing"),
+            )
+            for source in companies[source_group]
+            for destination in companies[destination_group]
+        ],
+    )
+    conn.commit()
+    conn.close()
+    return [
+        (rng.choice(companies["fabric"]), rng.choice(companies["garment"]), finishing)
+        for finishing in companies["finishing"]
+    ]
+
+
+def run_designer_scenarios(
+    rounds: int, seed: int = 0
+) -> dict[str, tuple[list[float], list[int]]]:
+    """Seconds and SQL statements per scenario, by CO2 cache state."""
+    os.environ.setdefault("CEIS_DISABLE_DISTANCE_SYNC", "1")
+    # Import late: the backend reads its database path relative to the directory.
+    from ceis_backend.co2_result_cache import co2_result_cache
+    from ceis_backend.config import DB_PATH
+    from ceis_backend.db_connection import close_all_connections, get_connection
+    from ceis_backend.db_init import init_sqlite_db
+    from ceis_backend.designer_balance import get_designer_balance_scenario
+
+    rng = random.Random(seed)
+    init_sqlite_db()
+    supplier_choices = _seed_suppliers(DB_PATH, rng)
+    with get_connection() as conn:
+        pairs = conn.execute(
+            "SELECT garment_type, material_id FROM garment_recipe_materials"
+        ).fetchall()
+    wiser_client = MagicMock()
+    wiser_client.get_emission_per_unit.side_effect = lambda activity_id: 0.5
+
+    statements = 0
+
+    def count_statement(_: str) -> None:
+        nonlocal statements
+        statements += 1
+
+    results = {}
+    try:
+        with get_connection() as conn:
+            conn.set_trace_callback(count_statement)
+        for label, clear_co2 in (("warm CO2 cache", False), ("cold CO2 cache", True)):
+            times, counts = [], []
+            for _ in range(rounds):
+                garment_type_id, material_id = rng.choice(pairs)
+                suppliers = rng.choice(supplier_choices)
+                if clear_co2:
+                    co2_result_cache.clear()
+                statements = 0
+                started = perf_counter()
+                get_designer_balance_scenario(
+                    garment_type_id, wiser_client, material_id, *suppliers
+                )
+                times.append(perf_counter() - started)
+                counts.append(statements)
+            results[label] = (times, counts)
+    finally:
+        with get_connection() as conn:
+            conn.set_trace_callback(None)
+        close_all_connections()
+    return results
+
+
+def _report(results: dict[str, tuple[list[float], list[int]]]) -> None:
+    print(f"{'scenario':16} {'count':>6} {'mean':>8} {'p50':>8} {'p95':>8} {'SQL':>6}")
+    for label, (times, counts) in results.items():
+        # The first call compiles the scenario context; leave it out.
+        times, counts = times[1:], counts[1:]
+        p50, p95 = np.percentile(np.array(times) * 1000, [50, 95])
+        print(
+            f"{label:16} {len(times):>6} {np.mean(times) * 1000:>6.2f}ms"
+            f" {p50:>6.2f}ms {p95:>6.2f}ms {np.mean(counts):>6.1f}"
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200, help="per cache state")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        _report(run_designer_scenarios(args.rounds, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Latency of the hot endpoints under concurrent mixed read/write load.
+
+Simulated clients send a weighted mix of fabric block, material, location and
+strategy progress reads, fabric block inserts and deletes of blocks they
+created, and report p50/p95/p99 per endpoint. By default the app runs
+in-process on a fresh database in a temporary directory, with requests and
+handlers sharing one event loop, so anything that blocks the loop shows up as
+tail latency; pass ``--url`` to load a running backend instead.
+
+Usage:
+    python -m ceis_backend.benchmarks.mixed_load --clients 32 --requests 200
+    python -m ceis_backend.benchmarks.mixed_load --url http://localhost:8052
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import AsyncIterator
+
+import httpx
+import numpy as np
+
+# Share of each operation in the mix.
+OPERATIONS = {
+    "GET /fabric-blocks": 0.35,
+    "GET /materials": 0.15,
+    "GET /locations": 0.15,
+    "GET /strategy-progress": 0.1,
+    "POST /fabric-blocks": 0.15,
+    "DELETE /fabric-blocks/{id}": 0.1,
+}
+
+
+async def _client(
+    client: httpx.AsyncClient,
+    rng: random.Random,
+    requests: int,
+    latencies: dict[str, list[float]],
+) -> None:
+    created: list[int] = []
+    names, weights = list(OPERATIONS), list(OPERATIONS.values())
+    for _ in range(requests):
+        operation = rng.choices(names, weights)[0]
+        if operation.startswith("DELETE") and not created:
+            operation = "POST /fabric-blocks"
+        started = perf_counter()
+        if operation == "GET /fabric-blocks":
+            response = await client.get("/fabric-blocks", params={"limit": 50})
+        elif operation == "POST /fabric-blocks":
+            response = await client.post(
+                "/fabric-blocks",
+                json={
+                    "type_id": 1,
+                    "location_id": rng.randint(1, 2),
+                    "material_id": 1,
+                    "quality": rng.randint(50, 100),
+                    "processes": [{"process_id": 1, "amount": 1.0}],
+                },
+            )
+            created.append(response.json()["id"])
+        elif operation.startswith("DELETE"):
+            response = await client.delete(
+                f"/fabric-blocks/{created.pop(rng.randrange(len(created)))}"
+            )
+        else:
+            response = await client.get(operation.split()[1])
+        latencies[operation].append(perf_counter() - started)
+        response.raise_for_status()
+
+
+@asynccontextmanager
+async def _in_process_client() -> AsyncIterator[httpx.AsyncClient]:
+    os.environ.setdefault("CEIS_DISABLE_DISTANCE_SYNC", "1")
+    # Import late: the app reads its database path relative to the directory.
+    import anyio
+
+    from ceis_backend.async_queries import async_db
+    from ceis_backend.config import THREADPOOL_SIZE
+    from ceis_backend.db_connection import close_all_connections
+    from ceis_backend.db_init import init_sqlite_db
+    from ceis_backend.main import app
+    from ceis_backend.wiser_bridge import WiserClient
+
+    # The app's startup without the Wiser warm-up and background work, so
+    # only the measured requests run.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    init_sqlite_db()
+    app.state.wiser_client = WiserClient()
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://benchmark"
+        ) as client:
+            yield client
+    finally:
+        app.state.wiser_client.close()
+        async_db.close()
+        close_all_connections()
+
+
+async def run_mixed_load(
+    clients: int, requests: int, url: str | None = None, seed: int = 0
+) -> tuple[dict[str, list[float]], float]:
+    """Per-operation latencies in seconds, and the wall time of the run."""
+    latencies: dict[str, list[float]] = {operation: [] for operation in OPERATIONS}
+    if url is None:
+        session = _in_process_client()
+    else:
+        session = httpx.AsyncClient(
+            base_url=url, limits=httpx.Limits(max_connections=clients)
+        )
+    async with session as client:
+        started = perf_counter()
+        await asyncio.gather(
+            *(
+                _client(client, random.Random(seed + index), requests, latencies)
+                for index in range(clients)
+            )
+        )
+        return latencies, perf_counter() - started
+
+
+def _report(latencies: dict[str, list[float]], elapsed: float) -> None:
+    print(f"{'operation':28} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    everything = [value for values in latencies.values() for value in values]
+    for operation, values in [*latencies.items(), ("all", everything)]:
+        if not values:
+            continue
+        p50, p95, p99, worst = np.percentile(np.array(values) * 1000, [50, 95, 99, 100])
+        print(
+            f"{operation:28} {len(values):>6} {p50:>6.1f}ms {p95:>6.1f}ms"
+            f" {p99:>6.1f}ms {worst:>6.1f}ms"
+        )
+    print(f"{len(everything) / elapsed:.0f} requests/s over {elapsed:.2f}s")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=100, help="per client")
+    parser.add_argument("--url", help="load a running backend instead")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.url is not None:
+        _report(*asyncio.run(run_mixed_load(args.clients, args.requests, args.url)))
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        _report(
+            *asyncio.run(run_mixed_load(args.clients, args.requests, seed=args.seed))
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""Emission-aware matching of second-life inventory blocks to recipe slots.
+
+Every unassigned block of a slot's type is scored with the CO2 of using it
+there, as ``calculate_used_fabric_block_alternative`` reports it: transport
+from its location to the manufacturer for the slot's weight, plus its
+preparation processes. Scores cover the whole inventory of a type at once,
+computed with NumPy from the arrays of the second-life allocator's index.
+
+The assignment then minimizes the total score of a garment, or of a
+production batch, where
+
+* blocks below a slot's ``min_quality`` are not candidates;
+* a block of the slot's material beats any other, however much CO2 the
+  other would save;
+* a block serves at most one slot.
+
+Slots of one type with the same weight, material and minimum quality are
+interchangeable, and all copies of a block in a garment are such slots, so
+a group of ``k`` of them takes its ``k`` cheapest candidates. Groups
+competing for the same blocks are solved as a min-cost flow over each
+group's cheapest candidates, the only ones an optimal assignment needs.
+"""
+
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass
+from math import inf
+from typing import TYPE_CHECKING, Sequence
+
+import numpy as np
+
+from ceis_backend.data.location_details import ACTIVITY_ID_TRANSPORT
+from ceis_backend.models import SecondLifeFabricBlock
+from ceis_backend.second_life_allocator import (
+    SecondLifeBlockAllocator,
+    TypeInventory,
+    second_life_allocator,
+)
+
+if TYPE_CHECKING:
+    from ceis_backend.wiser_bridge import WiserClient
+
+
+@dataclass(frozen=True)
+class RecipeSlot:
+    """One fabric block copy of a recipe to find a second-life block for."""
+
+    type_id: int
+    weight_kg: float
+    material: str | None = None
+    min_quality: float = 0.0
+
+
+def _emission_factors(
+    wiser_client: WiserClient, activity_ids: np.ndarray
+) -> np.ndarray:
+    """Factor per activity, 0 when unknown, like the per-block calculation.
+
+    Callers prefetch the inventory's activities with the recipe's (see
+    ``utils._recipe_activity_ids``).
+    """
+    return np.array(
+        [
+            wiser_client.get_emission_per_unit(int(activity_id)) or 0.0
+            for activity_id in activity_ids
+        ],
+        dtype=float,
+    )
+
+
+def block_emissions(
+    inventory: TypeInventory,
+    weights_kg: np.ndarray,
+    wiser_client: WiserClient,
+) -> np.ndarray:
+    """kg CO2eq of using each block for each slot weight.
+
+    ``(len(weights_kg), len(inventory))``.
+    """
+    process_emissions = np.bincount(
+        inventory.process_block_index,
+        weights=inventory.process_amounts
+        * _emission_factors(wiser_client, inventory.activity_ids)[
+            inventory.process_activity_index
+        ],
+        minlength=len(inventory),
+    )
+    transport_per_kg = (
+        (wiser_client.get_emission_per_unit(ACTIVITY_ID_TRANSPORT) or 0.0)
+        / 1000
+        * inventory.distance_km
+    )
+    return np.outer(weights_kg, transport_per_kg) + process_emissions
+
+
+def _cheapest(costs: np.ndarray, count: int) -> np.ndarray:
+    """Indices of the ``count`` lowest finite costs, by cost and then index."""
+    count = min(count, int(np.isfinite(costs).sum()))
+    if count == 0:
+        return np.empty(0, dtype=np.int64)
+    if count < len(costs):
+        threshold = costs[np.argpartition(costs, count - 1)[count - 1]]
+        below = np.flatnonzero(costs < threshold)
+        ties = np.flatnonzero(costs == threshold)[: count - len(below)]
+        candidates = np.concatenate([below, ties])
+    else:
+        candidates = np.arange(len(costs))
+    return candidates[np.argsort(costs[candidates], kind="stable")]
+
+
+def _min_cost_assignment(demands: list[int], costs: np.ndarray) -> list[list[int]]:
+    """Columns for each row group: as many as possible, at minimum total cost.
+
+    ``costs`` is ``(len(demands), candidates)`` with ``inf`` where a group
+    may not take a candidate; each candidate goes to at most one group.
+    Successive shortest paths with Dijkstra on reduced costs.
+    """
+    groups, candidates = costs.shape
+    source, sink = groups + candidates, groups + candidates + 1
+    # Per node: [target, capacity, cost, index of the reverse edge].
+    graph: list[list[list]] = [[] for _ in range(groups + candidates + 2)]
+
+    def add_edge(node: int, target: int, capacity: int, cost: float) -> None:
+        graph[node].append([target, capacity, cost, len(graph[target])])
+        graph[target].append([node, 0, -cost, len(graph[node]) - 1])
+
+    # Every unit of flow crosses exactly one group edge, so shifting their
+    # costs alike keeps the optimum and makes them non-negative for Dijkstra.
+    shift = min(float(costs[np.isfinite(costs)].min(initial=0.0)), 0.0)
+    for group, demand in enumerate(demands):
+        add_edge(source, group, demand, 0.0)
+    for group, column in zip(*np.nonzero(np.isfinite(costs))):
+        add_edge(group, groups + column, 1, float(costs[group, column]) - shift)
+    for column in range(candidates):
+        add_edge(groups + column, sink, 1, 0.0)
+
+    potential = [0.0] * len(graph)
+    while True:
+        distance = [inf] * len(graph)
+        previous: list[tuple[int, int] | None] = [None] * len(graph)
+        distance[source] = 0.0
+        heap = [(0.0, source)]
+        while heap:
+            node_distance, node = heapq.heappop(heap)
+            if node_distance > distance[node]:
+                continue
+            for index, (target, capacity, cost, _) in enumerate(graph[node]):
+                if capacity <= 0:
+                    continue
+                reduced = node_distance + cost + potential[node] - potential[target]
+                if reduced < distance[target] - 1e-12:
+                    distance[target] = reduced
+                    previous[target] = (node, index)
+                    heapq.heappush(heap, (reduced, target))
+        if distance[sink] == inf:
+            break
+        for node, node_distance in enumerate(distance):
+            if node_distance < inf:
+                potential[node] += node_distance
+        node = sink
+        while node != source:
+            parent, index = previous[node]
+            edge = graph[parent][index]
+            edge[1] -= 1
+            graph[node][edge[3]][1] += 1
+            node = parent
+
+    return [
+        [
+            target - groups
+            for target, capacity, _, _ in graph[group]
+            if groups <= target < groups + candidates and capacity == 0
+        ]
+        for group in range(groups)
+    ]
+
+
+def _compete(cheapest: list[np.ndarray]) -> bool:
+    """Whether any two groups share a candidate."""
+    candidates = np.concatenate(cheapest)
+    return len(np.unique(candidates)) < len(candidates)
+
+
+def _match_type(
+    inventory: TypeInventory,
+    slots: list[RecipeSlot],
+    wiser_client: WiserClient,
+) -> list[int | None]:
+    """Inventory index assigned to each slot of one block type, or None."""
+    if not len(inventory):
+        return [None] * len(slots)
+
+    positions_by_key: dict[tuple, list[int]] = {}
+    for position, slot in enumerate(slots):
+        positions_by_key.setdefault(
+            (slot.weight_kg, slot.material, slot.min_quality), []
+        ).append(position)
+    group_keys = list(positions_by_key)
+    slots_by_group = list(positions_by_key.values())
+
+    costs = block_emissions(
+        inventory, np.array([key[0] for key in group_keys], dtype=float), wiser_client
+    )
+    # Larger than any CO2 difference a whole assignment can make.
+    penalty = 1.0 + len(slots) * float(np.ptp(costs))
+    for group, (_, material, min_quality) in enumerate(group_keys):
+        if material in inventory.materials:
+            mismatch = inventory.material_index != inventory.materials.index(material)
+        else:
+            mismatch = np.ones(len(inventory), dtype=bool)
+        costs[group] += penalty * mismatch
+        costs[group, inventory.quality < min_quality] = inf
+
+    cheapest = [_cheapest(costs[group], len(slots)) for group in range(len(costs))]
+    if len(group_keys) == 1 or not _compete(cheapest):
+        chosen = [
+            cheapest[group][: len(positions)].tolist()
+            for group, positions in enumerate(slots_by_group)
+        ]
+    else:
+        columns = np.unique(np.concatenate(cheapest))
+        assigned = _min_cost_assignment(
+            [len(positions) for positions in slots_by_group], costs[:, columns]
+        )
+        chosen = [
+            sorted(
+                (int(columns[column]) for column in group_columns),
+                key=lambda index, group=group: (costs[group, index], index),
+            )
+            for group, group_columns in enumerate(assigned)
+        ]
+
+    matched: list[int | None] = [None] * len(slots)
+    for positions, indices in zip(slots_by_group, chosen):
+        for position, index in zip(positions, indices):
+            matched[position] = index
+    return matched
+
+
+def match_blocks_batch(
+    garments: Sequence[Sequence[RecipeSlot]],
+    wiser_client: WiserClient,
+    *,
+    allocator: SecondLifeBlockAllocator = second_life_allocator,
+) -> list[list[SecondLifeFabricBlock | None]]:
+    """Assign blocks to the slots of several garments at minimum total CO2.
+
+    No block is given to two slots, across all garments.
+    """
+    slots_by_type: dict[int, list[tuple[int, int]]] = {}
+    for garment_index, slots in enumerate(garments):
+        for slot_index, slot in enumerate(slots):
+            slots_by_type.setdefault(slot.type_id, []).append(
+                (garment_index, slot_index)
+            )
+
+    matched: list[list[SecondLifeFabricBlock | None]] = [
+        [None] * len(slots) for slots in garments
+    ]
+    inventories = allocator.inventories(slots_by_type)
+    for type_id, positions in slots_by_type.items():
+        inventory = inventories[type_id]
+        indices = _match_type(
+            inventory,
+            [garments[garment][slot] for garment, slot in positions],
+            wiser_client,
+        )
+        for (garment, slot), index in zip(positions, indices):
+            if index is not None:
+                matched[garment][slot] = inventory.block(index)
+    return matched
+
+
+def match_blocks(
+    slots: Sequence[RecipeSlot],
+    wiser_client: WiserClient,
+    *,
+    allocator: SecondLifeBlockAllocator = second_life_allocator,
+) -> list[SecondLifeFabricBlock | None]:
+    """Assign blocks to the slots of one garment at minimum total CO2."""
+    return match_blocks_batch([slots], wiser_client, allocator=allocator)[0]
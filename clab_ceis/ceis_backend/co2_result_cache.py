@@ -0,0 +1,187 @@
+"""Dependency-tracked cache of ``get_co2_for_garment`` results.
+
+Every cached (garment type, material) result records what it was computed
+from: database rows as ``(table, row_id)``, whole tables as ``(table, None)``
+and the Wiser activities whose emission factors it read. The write paths in
+``queries.py`` and emission-factor refreshes invalidate exactly the entries
+depending on what they changed.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Any, Iterable
+
+from ceis_backend.config import CO2_RESULT_CACHE_SIZE, DB_PATH
+
+Dependency = tuple[str, int | None]
+
+
+@dataclass(frozen=True)
+class _Entry:
+    result: Any
+    # Results depend on the emission factors of the client that computed them.
+    owner: Any
+    dependencies: frozenset[Dependency]
+    activity_ids: frozenset[int]
+
+
+class Co2ResultCache:
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(int(max_entries), 0)
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._keys_by_dependency: dict[Dependency, set[tuple]] = {}
+        self._keys_by_table: dict[str, set[tuple]] = {}
+        self._keys_by_activity: dict[int, set[tuple]] = {}
+        self._lock = Lock()
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.invalidated_entries = 0
+        self.invalidated_entries_by_source: dict[str, int] = {}
+
+    @staticmethod
+    def _key(garment_type_id: int, material_id: int) -> tuple:
+        # The database path is part of the key, so switching databases (as
+        # the tests do) never serves results computed from another one.
+        return (str(Path(DB_PATH).resolve()), garment_type_id, material_id)
+
+    def version(self) -> int:
+        """Token to pass to ``put``; taken before computing a result."""
+        with self._lock:
+            return self._version
+
+    def get(self, garment_type_id: int, material_id: int, owner: Any) -> Any | None:
+        key = self._key(garment_type_id, material_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.owner is not owner:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.result
+
+    def put(
+        self,
+        garment_type_id: int,
+        material_id: int,
+        owner: Any,
+        result: Any,
+        dependencies: Iterable[Dependency],
+        activity_ids: Iterable[int],
+        version: int,
+    ) -> bool:
+        """Store a result unless something was invalidated while computing it."""
+        if self.max_entries == 0:
+            return False
+        key = self._key(garment_type_id, material_id)
+        entry = _Entry(result, owner, frozenset(dependencies), frozenset(activity_ids))
+        with self._lock:
+            if version != self._version:
+                return False
+            self._remove(key)
+            self._entries[key] = entry
+            for dependency in entry.dependencies:
+                self._keys_by_dependency.setdefault(dependency, set()).add(key)
+                self._keys_by_table.setdefault(dependency[0], set()).add(key)
+            for activity_id in entry.activity_ids:
+                self._keys_by_activity.setdefault(activity_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+        return True
+
+    def invalidate(self, table: str, row_ids: Iterable[int] | None = None) -> int:
+        """Drop entries depending on the given rows, or on any row if None."""
+        with self._lock:
+            if row_ids is None:
+                keys = set(self._keys_by_table.get(table, ()))
+            else:
+                keys = set(self._keys_by_dependency.get((table, None), ()))
+                for row_id in row_ids:
+                    keys.update(self._keys_by_dependency.get((table, row_id), ()))
+            # Writes are rare; rejecting every concurrent put also covers
+            # results computed from rows that are not cached yet.
+            self._version += 1
+            return self._invalidate(keys, table)
+
+    def invalidate_activities(self, activity_ids: Iterable[int]) -> int:
+        """Drop entries that read the emission factor of any given activity.
+
+        Factor fetches are frequent, so concurrent puts are only rejected
+        when cached entries were actually removed.
+        """
+        with self._lock:
+            keys = set()
+            for activity_id in activity_ids:
+                keys.update(self._keys_by_activity.get(activity_id, ()))
+            if keys:
+                self._version += 1
+            return self._invalidate(keys, "emission_factors")
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._keys_by_dependency.clear()
+            self._keys_by_table.clear()
+            self._keys_by_activity.clear()
+            self.hits = self.misses = 0
+            self.invalidations = self.invalidated_entries = 0
+            self.invalidated_entries_by_source.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "invalidations": self.invalidations,
+                "invalidated_entries": self.invalidated_entries,
+                "invalidated_entries_by_source": dict(
+                    self.invalidated_entries_by_source
+                ),
+            }
+
+    def _invalidate(self, keys: set[tuple], source: str) -> int:
+        # Callers bump the version, which rejects results computed
+        # concurrently from data that has just changed.
+        self.invalidations += 1
+        for key in keys:
+            self._remove(key)
+        if keys:
+            self.invalidated_entries += len(keys)
+            self.invalidated_entries_by_source[source] = (
+                self.invalidated_entries_by_source.get(source, 0) + len(keys)
+            )
+        return len(keys)
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for dependency in entry.dependencies:
+            self._discard(self._keys_by_dependency, dependency, key)
+            self._discard(self._keys_by_table, dependency[0], key)
+        for activity_id in entry.activity_ids:
+            self._discard(self._keys_by_activity, activity_id, key)
+
+    @staticmethod
+    def _discard(index: dict, index_key: Any, key: tuple) -> None:
+        keys = index.get(index_key)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del index[index_key]
+
+
+co2_result_cache = Co2ResultCache(CO2_RESULT_CACHE_SIZE)
@@ -14,6 +14,15 @@ load_dotenv(BASE_DIR / ".env.secrets", override=True)
 # but can be overridden via environment variable.
 DB_PATH = os.getenv("CEIS_DB_PATH", "ceis_backend.db")
 
+# SQLite connection tuning, applied to every pooled backend connection.
+SQLITE_SYNCHRONOUS = os.getenv("CEIS_SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_KIB = int(os.getenv("CEIS_SQLITE_CACHE_SIZE_KIB", "16384"))
+SQLITE_MMAP_SIZE_BYTES = int(
+    os.getenv("CEIS_SQLITE_MMAP_SIZE_BYTES", str(64 * 1024 * 1024))
+)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("CEIS_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHED_STATEMENTS = int(os.getenv("CEIS_SQLITE_CACHED_STATEMENTS", "256"))
+
 # Backend server configuration
 BACKEND_HOST = os.getenv("BACKEND_HOST", "0.0.0.0")
 BACKEND_PORT = int(os.getenv("BACKEND_PORT", "8052"))
@@ -29,3 +38,77 @@ WISER_API_BASE_URL = os.getenv(
     "WISER_API_BASE_URL",
     "https://api.wiser.ehealth.hevs.ch/ecoinvent/3.12-cutoff",
 )
+
+# Snapshot of cached emission factors loaded on startup, see emission_snapshot.py.
+EMISSION_SNAPSHOT_PATH = os.getenv(
+    "CEIS_EMISSION_SNAPSHOT_PATH", "emission_snapshot.json"
+)
+
+# Local activity catalog answering /activity-search, see activity_catalog.py.
+# Wiser is only queried when fewer than MIN_LOCAL_RESULTS activities match
+# locally and the same query was not already sent within QUERY_TTL seconds.
+ACTIVITY_SEARCH_LIMIT = int(os.getenv("CEIS_ACTIVITY_SEARCH_LIMIT", "50"))
+ACTIVITY_SEARCH_MIN_LOCAL_RESULTS = int(
+    os.getenv("CEIS_ACTIVITY_SEARCH_MIN_LOCAL_RESULTS", "5")
+)
+ACTIVITY_SEARCH_QUERY_TTL_SECONDS = int(
+    os.getenv("CEIS_ACTIVITY_SEARCH_QUERY_TTL_SECONDS", str(7 * 24 * 60 * 60))
+)
+
+# Number of get_co2_for_garment results kept, see co2_result_cache.py (0 disables).
+CO2_RESULT_CACHE_SIZE = int(os.getenv("CEIS_CO2_RESULT_CACHE_SIZE", "512"))
+
+# Lowest quality (0-100) of a second-life block proposed as an alternative.
+SECOND_LIFE_MIN_QUALITY = float(os.getenv("CEIS_SECOND_LIFE_MIN_QUALITY", "0"))
+
+# Worker threads for sync endpoints and blocking calls of async ones (FastAPI's
+# default is 40), and database threads serving reads of the async endpoints,
+# see async_queries.py. Writes of the async endpoints use one thread.
+THREADPOOL_SIZE = int(os.getenv("CEIS_THREADPOOL_SIZE", "40"))
+DB_READ_THREADS = int(os.getenv("CEIS_DB_READ_THREADS", "4"))
+
+# Largest number of (garment type, material) pairs accepted by POST /co2/batch.
+CO2_BATCH_MAX_ITEMS = int(os.getenv("CEIS_CO2_BATCH_MAX_ITEMS", "500"))
+
+# Background persistence of sold-garment CO2, see sold_garment_co2.py.
+SOLD_GARMENT_CO2_BATCH_SIZE = int(os.getenv("CEIS_SOLD_GARMENT_CO2_BATCH_SIZE", "500"))
+SOLD_GARMENT_CO2_INTERVAL_SECONDS = float(
+    os.getenv("CEIS_SOLD_GARMENT_CO2_INTERVAL_SECONDS", "60")
+)
+
+# Number of emission factors kept in memory in front of the SQLite cache.
+WISER_EMISSION_MEMORY_CACHE_SIZE = int(
+    os.getenv("WISER_EMISSION_MEMORY_CACHE_SIZE", "1024")
+)
+
+# Stale-while-revalidate for cached emission factors: once past their TTL,
+# factors are still served for up to MAX_STALE seconds while a background
+# refresher re-fetches them. Entries expiring within REFRESH_AHEAD seconds
+# are refreshed proactively every REFRESH_INTERVAL seconds.
+WISER_EMISSION_CACHE_MAX_STALE_SECONDS = int(
+    os.getenv("WISER_EMISSION_CACHE_MAX_STALE_SECONDS", str(7 * 24 * 60 * 60))
+)
+WISER_EMISSION_REFRESH_INTERVAL_SECONDS = float(
+    os.getenv("WISER_EMISSION_REFRESH_INTERVAL_SECONDS", "3600")
+)
+WISER_EMISSION_REFRESH_AHEAD_SECONDS = float(
+    os.getenv("WISER_EMISSION_REFRESH_AHEAD_SECONDS", str(12 * 60 * 60))
+)
+WISER_EMISSION_REFRESH_BATCH_SIZE = int(
+    os.getenv("WISER_EMISSION_REFRESH_BATCH_SIZE", "50")
+)
+# A failed refresh of an activity waits REFRESH_INTERVAL seconds before its
+# next attempt, doubling after every further failure up to MAX_BACKOFF.
+WISER_EMISSION_REFRESH_MAX_BACKOFF_SECONDS = float(
+    os.getenv("WISER_EMISSION_REFRESH_MAX_BACKOFF_SECONDS", str(24 * 60 * 60))
+)
+
+# Upper bound on parallel Wiser requests when prefetching emission factors.
+WISER_MAX_CONCURRENT_REQUESTS = int(os.getenv("WISER_MAX_CONCURRENT_REQUESTS", "8"))
+
+# Keep-alive connection pool of the Wiser HTTP session. Connections are
+# pooled per host; the pool blocks instead of opening more than the maximum.
+WISER_HTTP_POOL_HOSTS = int(os.getenv("WISER_HTTP_POOL_HOSTS", "2"))
+WISER_HTTP_POOL_MAXSIZE = int(
+    os.getenv("WISER_HTTP_POOL_MAXSIZE", str(WISER_MAX_CONCURRENT_REQUESTS))
+)
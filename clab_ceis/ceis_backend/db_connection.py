@@ -0,0 +1,127 @@
+"""Pooled SQLite connections for CEIS backend.
+
+Each worker thread keeps one long-lived connection per database file, so
+query functions no longer pay for connect/close and start from a warm page
+cache. Connections are opened in WAL mode so readers do not block the writer.
+A thread's connections are closed once the thread ends, so short-lived worker
+threads do not leave open file handles behind.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import weakref
+from contextlib import contextmanager
+from threading import Lock, local
+from typing import Iterator
+
+from ceis_backend import config
+
+_thread_state = local()
+_registry_lock = Lock()
+_thread_pools: weakref.WeakSet[_ThreadPool] = weakref.WeakSet()
+_pool_generation = 0
+
+
+def _close_connections(connections: dict[str, sqlite3.Connection]) -> None:
+    for conn in list(connections.values()):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            continue
+    connections.clear()
+
+
+class _ThreadPool:
+    """The connections of one thread, closed when the thread-local is collected."""
+
+    def __init__(self, generation: int) -> None:
+        self.generation = generation
+        self.connections: dict[str, sqlite3.Connection] = {}
+        self.depths: dict[str, int] = {}
+        # The finalizer holds the dict, not the pool, so the pool can be
+        # collected when its thread ends.
+        self.close = weakref.finalize(self, _close_connections, self.connections)
+
+
+def _resolve_db_path(db_path: str | None) -> str:
+    path = config.DB_PATH if db_path is None else db_path
+    if path == ":memory:":
+        return path
+    # Tests and tools change the working directory, so key connections by the
+    # absolute path instead of the configured (possibly relative) one.
+    return os.path.abspath(path)
+
+
+def _open_connection(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        db_path,
+        timeout=config.SQLITE_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=config.SQLITE_CACHED_STATEMENTS,
+        check_same_thread=False,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size=-{int(config.SQLITE_CACHE_SIZE_KIB)}")
+    conn.execute(f"PRAGMA mmap_size={int(config.SQLITE_MMAP_SIZE_BYTES)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute(f"PRAGMA busy_timeout={int(config.SQLITE_BUSY_TIMEOUT_MS)}")
+    return conn
+
+
+def _thread_pool() -> _ThreadPool:
+    # A generation bump from close_all_connections() invalidates the
+    # connections cached by every thread, not only the closing one.
+    pool = getattr(_thread_state, "pool", None)
+    if pool is None or pool.generation != _pool_generation:
+        with _registry_lock:
+            pool = _ThreadPool(_pool_generation)
+            _thread_pools.add(pool)
+        _thread_state.pool = pool
+    return pool
+
+
+@contextmanager
+def get_connection(db_path: str | None = None) -> Iterator[sqlite3.Connection]:
+    """Yield the calling thread's pooled connection for ``db_path``.
+
+    Callers commit explicitly. Anything left uncommitted when the outermost
+    block exits, for example because an ``HTTPException`` was raised half-way
+    through a write, is rolled back so the next user of the connection starts
+    clean.
+    """
+    resolved_path = _resolve_db_path(db_path)
+    pool = _thread_pool()
+    conn = pool.connections.get(resolved_path)
+    if conn is None:
+        conn = _open_connection(resolved_path)
+        pool.connections[resolved_path] = conn
+
+    # Query helpers call each other, so only the outermost block may roll back;
+    # otherwise a nested read would discard the caller's pending writes.
+    depths = pool.depths
+    depths[resolved_path] = depths.get(resolved_path, 0) + 1
+    try:
+        yield conn
+    finally:
+        depths[resolved_path] -= 1
+        if depths[resolved_path] == 0 and conn.in_transaction:
+            conn.rollback()
+
+
+def open_connection_count() -> int:
+    """Pooled connections of the threads that are still alive."""
+    with _registry_lock:
+        return sum(len(pool.connections) for pool in _thread_pools)
+
+
+def close_all_connections() -> None:
+    """Close every pooled connection, e.g. on application shutdown."""
+    global _pool_generation
+    with _registry_lock:
+        pools = list(_thread_pools)
+        _thread_pools.clear()
+        _pool_generation += 1
+    for pool in pools:
+        pool.close()
@@ -1,7 +1,9 @@
-import sqlite3
 import os
+import time
+from dataclasses import dataclass
 
 from ceis_backend.config import DB_PATH
+from ceis_backend.db_connection import get_connection
 from ceis_backend.manufacturer_distance_sync import (
     sync_manufacturer_distances_if_changed,
 )
@@ -238,6 +240,159 @@ def create_tables(cursor):
     )
 
 
+@dataclass(frozen=True)
+class SchemaMigration:
+    version: int
+    description: str
+    statements: tuple[str, ...]
+
+
+# Append-only: applied migrations are recorded in schema_migrations, so an
+# existing database only runs the entries newer than its recorded version.
+# manufacturer_distances needs no extra index: its UNIQUE constraint already
+# serves the (source_company, destination_company) lookups.
+SCHEMA_MIGRATIONS = (
+    SchemaMigration(
+        version=1,
+        description="Add foreign-key and lookup indexes",
+        statements=(
+            """
+            CREATE INDEX IF NOT EXISTS idx_fabric_blocks_inventory_garment
+            ON fabric_blocks_inventory (garment_id)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_fabric_blocks_inventory_type
+            ON fabric_blocks_inventory (type_id, garment_id)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_processes_fabric_blocks_inventory_block
+            ON processes_fabric_blocks_inventory (fabric_block_id, process_id, amount)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_processes_garments_inventory_garment
+            ON processes_garments_inventory (garment_id, process_id, amount)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_garment_recipe_fabric_blocks_garment
+            ON garment_recipe_fabric_blocks (garment_type, fabric_block_id, amount)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_garment_recipe_processes_garment
+            ON garment_recipe_processes (garment_type, process_id, amount)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_fabric_block_recipe_processes_type
+            ON fabric_block_recipe_processes (fabric_block_type, process_id, amount)
+            """,
+        ),
+    ),
+    SchemaMigration(
+        version=2,
+        description="Add local full-text catalog of Wiser activities",
+        statements=(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS activity_catalog USING fts5(
+                name,
+                reference_product,
+                location,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS activity_catalog_searches (
+                query TEXT PRIMARY KEY,
+                searched_at REAL NOT NULL
+            )
+            """,
+        ),
+    ),
+    SchemaMigration(
+        version=3,
+        description="Track stale sold-garment CO2 and index activity dependents",
+        statements=(
+            # Bumped when an emission factor a persisted co2eq read changes,
+            # see activity_dependencies.py.
+            """
+            ALTER TABLE garments_inventory
+            ADD COLUMN co2_stale INTEGER NOT NULL DEFAULT 0
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_materials_activity
+            ON materials (activity_id)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_process_types_activity
+            ON process_types (activity_id)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_fabric_block_recipe_processes_process
+            ON fabric_block_recipe_processes (process_id, fabric_block_type)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_garment_recipe_processes_process
+            ON garment_recipe_processes (process_id, garment_type)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_processes_fabric_blocks_inventory_process
+            ON processes_fabric_blocks_inventory (process_id, fabric_block_id)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_processes_garments_inventory_process
+            ON processes_garments_inventory (process_id, garment_id)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_fabric_blocks_inventory_material
+            ON fabric_blocks_inventory (material_id, garment_id)
+            """,
+        ),
+    ),
+)
+
+LATEST_SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1].version
+
+
+def get_schema_version(cursor) -> int:
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at REAL NOT NULL
+        )
+    """
+    )
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+    return cursor.fetchone()[0]
+
+
+def apply_schema_migrations(cursor) -> int:
+    """Bring an existing database up to LATEST_SCHEMA_VERSION in place."""
+    current_version = get_schema_version(cursor)
+    for migration in SCHEMA_MIGRATIONS:
+        if migration.version <= current_version:
+            continue
+        # A migration and its version row land together or not at all, so a
+        # failed statement cannot leave e.g. an added column unrecorded.
+        cursor.execute("SAVEPOINT schema_migration")
+        try:
+            for statement in migration.statements:
+                cursor.execute(statement)
+            cursor.execute(
+                """
+                INSERT INTO schema_migrations (version, description, applied_at)
+                VALUES (?, ?, ?)
+                """,
+                (migration.version, migration.description, time.time()),
+            )
+        except BaseException:
+            cursor.execute("ROLLBACK TO schema_migration")
+            cursor.execute("RELEASE schema_migration")
+            raise
+        cursor.execute("RELEASE schema_migration")
+        current_version = migration.version
+    return current_version
+
+
 def seed_data(cursor):
     cursor.execute("SELECT seeded FROM seed_meta WHERE id = 1;")
     if cursor.fetchone()[0] != 0:
@@ -503,15 +658,15 @@ def seed_demo_sales_data(cursor):
 
 
 def init_sqlite_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        cursor = conn.cursor()
 
-    create_tables(cursor)
-    seed_data(cursor)
-    seed_demo_sales_data(cursor)
+        create_tables(cursor)
+        apply_schema_migrations(cursor)
+        seed_data(cursor)
+        seed_demo_sales_data(cursor)
 
-    conn.commit()
-    conn.close()
+        conn.commit()
 
     disable_sync = os.getenv("CEIS_DISABLE_DISTANCE_SYNC", "0") == "1"
     is_pytest = "PYTEST_CURRENT_TEST" in os.environ
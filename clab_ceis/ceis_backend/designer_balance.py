@@ -1,33 +1,48 @@
 from __future__ import annotations
 
 import json
+from dataclasses import dataclass
 from functools import lru_cache
 
+import numpy as np
 from fastapi import HTTPException
 
 from ceis_backend.config import BASE_DIR
 from ceis_backend.data.location_details import (
     ACTIVITY_ID_LONG_DISTANCE_TRANSPORT,
     ACTIVITY_ID_TRANSPORT,
-    COTTON_DISTANCE_TO_MANUFACTURER_KM,
-    HEMP_DISTANCE_TO_MANUFACTURER_KM,
-    SILK_DISTANCE_TO_MANUFACTURER_KM,
 )
+from ceis_backend.designer_reference_cache import (
+    ReferenceChanges,
+    ReferenceEntry,
+    designer_reference_cache,
+)
+from ceis_backend.distance_matrix import manufacturer_distance_matrix
+from ceis_backend.emission_engine import material_distance_to_manufacturer_km
+from ceis_backend.models import CompiledGarmentRecipe
 from ceis_backend.queries import (
-    db_get_fabric_block_types,
+    db_get_designer_reference_rows,
     db_get_garment_types,
-    db_get_manufacturer_distance_row,
-    db_get_materials,
     db_get_manufacturers,
     db_get_materials_for_garment,
     db_get_process_types,
-    get_fabric_block_processes_for_emission,
-    get_full_garment_recipe,
+    compile_garment_recipe,
+    compile_garment_recipes,
+)
+from ceis_backend.supplier_combinations import (
+    combination_objectives,
+    count_combinations,
+    pareto_front,
+    top_combinations,
+)
+from ceis_backend.utils import (
+    calculate_transport_emission,
+    get_co2_for_garment,
+    prefetch_emissions,
+    prefetch_recipe_emissions,
 )
-from ceis_backend.utils import calculate_transport_emission, get_co2_for_garment
 from ceis_backend.wiser_bridge import WiserClient
 
-
 MOCK_DATA_PATH = BASE_DIR / "data" / "designer_balance_mock_data.json"
 
 
@@ -37,6 +52,155 @@ def load_designer_balance_mock_data() -> dict:
         return json.load(mock_file)
 
 
+@dataclass(frozen=True)
+class _CostModel:
+    """The cost and delay tables of the mock data, resolved once.
+
+    Material and process tables are keyed by lowercase name, and names
+    without an entry of their own fall back to ``default``.
+    """
+
+    material_costs_per_kg: dict[str, float]
+    material_longevity_wears: dict[str, int]
+    process_costs_per_unit: dict[str, float]
+    actor_delay_days: dict[str, float]
+    transport_cost_per_ton_km: float
+    transport_base_delay_days: float
+    transport_delay_days_per_100_km: float
+
+    def material_cost_per_kg(self, material_name: str) -> float:
+        return self.material_costs_per_kg.get(
+            material_name.lower(), self.material_costs_per_kg["default"]
+        )
+
+    def longevity_wears(self, material_name: str) -> int:
+        return self.material_longevity_wears.get(
+            material_name.lower(), self.material_longevity_wears["default"]
+        )
+
+    def process_cost_per_unit(self, process_name: str) -> float:
+        return self.process_costs_per_unit.get(
+            process_name.lower(), self.process_costs_per_unit["default"]
+        )
+
+    def process_cost(self, process_name: str, amount: float) -> float:
+        return self.process_cost_per_unit(process_name) * float(amount)
+
+    def transport_cost(
+        self, distance_km: float | np.ndarray | None, amount_kg: float
+    ) -> float | np.ndarray:
+        if distance_km is None:
+            return 0.0
+        return (
+            self.transport_cost_per_ton_km * (float(amount_kg) / 1000.0) * distance_km
+        )
+
+    def transport_delay(
+        self, distance_km: float | np.ndarray | None
+    ) -> float | np.ndarray:
+        if distance_km is None:
+            return 0.0
+        return (
+            self.transport_base_delay_days
+            + (distance_km / 100.0) * self.transport_delay_days_per_100_km
+        )
+
+    def actor_delay(self, role_group: str) -> float:
+        return self.actor_delay_days.get(role_group, self.actor_delay_days["default"])
+
+
+@lru_cache(maxsize=1)
+def _cost_model() -> _CostModel:
+    mock_data = load_designer_balance_mock_data()
+    materials = mock_data.get("materials", {})
+    process_types = mock_data.get("process_types", {})
+    delay_model = mock_data.get("delay_model", {})
+    actor_delays = delay_model.get("actor_base_delay_days", {})
+    return _CostModel(
+        material_costs_per_kg={
+            "default": 0.0,
+            **{
+                name: float(material.get("cost_per_kg_chf", 0))
+                for name, material in materials.items()
+            },
+        },
+        material_longevity_wears={
+            "default": 0,
+            **{
+                name: int(material.get("longevity_wears", 0))
+                for name, material in materials.items()
+            },
+        },
+        process_costs_per_unit={
+            "default": 0.0,
+            **{
+                name: float(process.get("cost_per_unit_chf", 0))
+                for name, process in process_types.items()
+            },
+        },
+        actor_delay_days={
+            "default": 0.0,
+            **{name: float(delay) for name, delay in actor_delays.items()},
+        },
+        transport_cost_per_ton_km=float(
+            process_types.get("transport", {}).get("cost_per_ton_km_chf", 0)
+        ),
+        transport_base_delay_days=float(
+            delay_model.get("transport_base_delay_days", 0)
+        ),
+        transport_delay_days_per_100_km=float(
+            delay_model.get("transport_delay_days_per_100_km", 0)
+        ),
+    )
+
+
+SUPPLIER_ROLE_GROUPS = ("fabric", "garment", "finishing")
+
+
+@dataclass(frozen=True)
+class _ScenarioContext:
+    """Everything a designer balance scenario reads besides its recipe and CO2."""
+
+    catalog_key: tuple[str, int]
+    costs: _CostModel
+    garment_types: dict[int, dict]
+    process_types: list[dict]
+    process_type_names: frozenset[str]
+    suppliers: dict[str, list[dict]]
+    suppliers_by_company: dict[str, dict[str, dict]]
+
+
+# The compiled context of each database, replaced when its catalog changes.
+_scenario_contexts: dict[str, _ScenarioContext] = {}
+
+
+def _scenario_context() -> _ScenarioContext:
+    catalog_key = designer_reference_cache.catalog_key()
+    context = _scenario_contexts.get(catalog_key[0])
+    if context is not None and context.catalog_key == catalog_key:
+        return context
+
+    process_types = db_get_process_types()
+    suppliers = {
+        role_group: db_get_manufacturers(role_group)
+        for role_group in SUPPLIER_ROLE_GROUPS
+    }
+    context = _ScenarioContext(
+        catalog_key=catalog_key,
+        costs=_cost_model(),
+        garment_types={row["id"]: row for row in db_get_garment_types()},
+        process_types=process_types,
+        process_type_names=frozenset(row["name"].lower() for row in process_types),
+        suppliers=suppliers,
+        suppliers_by_company={
+            role_group: {supplier["company"]: supplier for supplier in options}
+            for role_group, options in suppliers.items()
+        },
+    )
+    _scenario_contexts[catalog_key[0]] = context
+    return context
+
+
 def get_designer_balance_options() -> dict:
     return {
         "garment_types": db_get_garment_types(),
@@ -48,124 +212,243 @@ def get_designer_balance_options() -> dict:
     }
 
 
-def get_designer_garment_reference_data(wiser_client: WiserClient) -> dict:
-    mock_data = load_designer_balance_mock_data()
-    emission_cache: dict[int, float | None] = {}
+@dataclass(frozen=True)
+class _ReferenceDataset:
+    garment_types: list[dict]
+    materials: dict[int, dict]
+    process_types: dict[int, dict]
+    fabric_block_types: dict[int, dict]
+    # (process ID, name, amount, activity ID) per fabric block type.
+    block_processes: dict[int, list[tuple[int, str, float, int]]]
+    # Rows by (fabric block type ID, material ID).
+    fabric_blocks: dict[tuple[int, int], dict]
+    payload: dict
+
+
+def get_designer_garment_reference_entry(wiser_client: WiserClient) -> ReferenceEntry:
+    """The reference payload and its version, recomputed where it changed."""
+    return designer_reference_cache.get(
+        wiser_client,
+        lambda dataset, changes: _refresh_reference_dataset(
+            wiser_client, dataset, changes
+        ),
+    )
+
 
-    materials = []
-    for material in db_get_materials():
-        material_mock = _mock_material_data(material["name"], mock_data)
-        material_emission_per_unit = _get_emission_per_unit(
-            wiser_client, material["activity_id"], emission_cache
+def _refresh_reference_dataset(
+    wiser_client: WiserClient,
+    dataset: _ReferenceDataset | None,
+    changes: ReferenceChanges,
+) -> tuple[_ReferenceDataset, bool]:
+    """Recompute the rows depending on ``changes``, or all without a dataset."""
+    if dataset is None or changes.full:
+        dataset = _ReferenceDataset([], {}, {}, {}, {}, {}, {})
+        catalog = db_get_designer_reference_rows()
+        material_ids = {row["id"] for row in catalog["materials"]}
+        process_type_ids = {row["id"] for row in catalog["process_types"]}
+        type_ids = {row["id"] for row in catalog["fabric_block_types"]}
+        garment_types = db_get_garment_types()
+    else:
+        activity_ids = changes.activity_ids
+        material_ids = changes.ids("materials") | {
+            row["id"]
+            for row in dataset.materials.values()
+            if row["activity_id"] in activity_ids
+        }
+        process_type_ids = changes.ids("process_types") | {
+            row["id"]
+            for row in dataset.process_types.values()
+            if row["activity_id"] in activity_ids
+        }
+        type_ids = changes.ids("fabric_block_types") | {
+            type_id
+            for type_id, processes in dataset.block_processes.items()
+            if any(process[0] in process_type_ids for process in processes)
+        }
+        if ACTIVITY_ID_LONG_DISTANCE_TRANSPORT in activity_ids:
+            # Every fabric block row includes material transport.
+            type_ids |= set(dataset.fabric_block_types)
+        catalog = db_get_designer_reference_rows(
+            sorted(material_ids), sorted(process_type_ids), sorted(type_ids)
         )
-        materials.append(
-            {
-                **material,
-                "cost_per_kg_chf": _safe_round(
-                    float(material_mock.get("cost_per_kg_chf", 0))
-                ),
-                "longevity_wears": int(material_mock.get("longevity_wears", 0)),
-                "co2eq_per_kg": (
-                    _safe_round(material_emission_per_unit, 3)
-                    if material_emission_per_unit is not None
-                    else None
-                ),
-            }
+        garment_types = (
+            db_get_garment_types()
+            if "garment_types" in changes.rows
+            else dataset.garment_types
         )
 
-    process_rows = []
-    process_defs = mock_data.get("process_types", {})
-    for process_type in db_get_process_types():
-        process_mock = process_defs.get(
-            process_type["name"].lower(), process_defs.get("default", {})
+    # Unchanged rows are kept; changed ones are replaced or, if deleted, dropped.
+    materials = _replace_rows(dataset.materials, material_ids, catalog["materials"])
+    process_types = _replace_rows(
+        dataset.process_types, process_type_ids, catalog["process_types"]
+    )
+    fabric_block_types = _replace_rows(
+        dataset.fabric_block_types, type_ids, catalog["fabric_block_types"]
+    )
+    block_processes = {
+        type_id: processes
+        for type_id, processes in dataset.block_processes.items()
+        if type_id not in type_ids
+    }
+    block_processes.update(catalog["block_processes"])
+    block_keys = [
+        (type_id, material_id)
+        for type_id in fabric_block_types
+        for material_id in materials
+        if type_id in type_ids or material_id in material_ids
+    ]
+
+    emission_by_activity = _reference_emissions(
+        wiser_client,
+        {
+            ACTIVITY_ID_LONG_DISTANCE_TRANSPORT,
+            *(row["activity_id"] for row in catalog["materials"]),
+            *(row["activity_id"] for row in catalog["process_types"]),
+            *(materials[material_id]["activity_id"] for _, material_id in block_keys),
+            *(
+                process[3]
+                for type_id in type_ids
+                for process in block_processes.get(type_id, [])
+            ),
+        },
+    )
+    costs = _cost_model()
+    for material in catalog["materials"]:
+        materials[material["id"]] = _material_reference_row(
+            material, emission_by_activity, costs
         )
-        ecological_unit_cost = _get_emission_per_unit(
-            wiser_client, process_type["activity_id"], emission_cache
+    for process_type in catalog["process_types"]:
+        process_types[process_type["id"]] = _process_type_reference_row(
+            process_type, emission_by_activity, costs
         )
-
-        process_rows.append(
-            {
-                **process_type,
-                "economic_cost_per_unit_chf": _safe_round(
-                    float(process_mock.get("cost_per_unit_chf", 0))
-                ),
-                "ecological_cost_per_unit_co2eq": (
-                    _safe_round(float(ecological_unit_cost), 6)
-                    if ecological_unit_cost is not None
-                    else None
-                ),
-            }
+    fabric_blocks = {
+        key: row
+        for key, row in dataset.fabric_blocks.items()
+        if key[0] not in type_ids and key[1] not in material_ids
+    }
+    for type_id, material_id in block_keys:
+        fabric_blocks[(type_id, material_id)] = _fabric_block_reference_row(
+            fabric_block_types[type_id],
+            materials[material_id],
+            block_processes.get(type_id, []),
+            emission_by_activity,
+            costs,
         )
 
-    fabric_block_types = db_get_fabric_block_types()
+    changed = (
+        garment_types != dataset.garment_types
+        or materials != dataset.materials
+        or process_types != dataset.process_types
+        or fabric_blocks != dataset.fabric_blocks
+    )
+    if not changed:
+        return dataset, False
 
-    return {
-        "garment_types": db_get_garment_types(),
-        "materials": materials,
-        "process_types": process_rows,
-        "fabric_block_types": _build_fabric_block_reference_rows(
-            fabric_block_types, materials, wiser_client, emission_cache, mock_data
-        ),
+    material_order = sorted(
+        materials, key=lambda material_id: materials[material_id]["name"]
+    )
+    payload = {
+        "garment_types": garment_types,
+        "materials": [materials[material_id] for material_id in material_order],
+        "process_types": [process_types[key] for key in sorted(process_types)],
+        "fabric_block_types": [
+            fabric_blocks[(type_id, material_id)]
+            for type_id in sorted(fabric_block_types)
+            for material_id in material_order
+        ],
     }
+    return (
+        _ReferenceDataset(
+            garment_types=garment_types,
+            materials=materials,
+            process_types=process_types,
+            fabric_block_types=fabric_block_types,
+            block_processes=block_processes,
+            fabric_blocks=fabric_blocks,
+            payload=payload,
+        ),
+        True,
+    )
 
 
-def _safe_round(value: float | int | None, digits: int = 2) -> float:
-    return round(float(value or 0), digits)
+def _replace_rows(rows: dict[int, dict], ids: set[int], loaded: list[dict]) -> dict:
+    rows = {row_id: row for row_id, row in rows.items() if row_id not in ids}
+    rows.update((row["id"], row) for row in loaded)
+    return rows
 
 
-def _get_emission_per_unit(
-    wiser_client: WiserClient,
-    activity_id: int | None,
-    emission_cache: dict[int, float | None] | None = None,
-) -> float | None:
-    if activity_id is None:
-        return None
-    if emission_cache is not None and activity_id in emission_cache:
-        return emission_cache[activity_id]
+def _reference_emissions(
+    wiser_client: WiserClient, activity_ids: set[int]
+) -> dict[int, float | None]:
+    # A failed lookup counts as a missing factor instead of failing the page.
+    activity_ids = sorted(activity_ids)
     try:
-        emission_per_unit = wiser_client.get_emission_per_unit(activity_id)
+        prefetch_emissions(wiser_client, activity_ids)
     except Exception:
-        emission_per_unit = None
-    if emission_cache is not None:
-        emission_cache[activity_id] = emission_per_unit
-    return emission_per_unit
-
-
-def _get_material_distance_to_manufacturer_km(material_name: str) -> float | None:
-    material_distances = {
-        "hemp": HEMP_DISTANCE_TO_MANUFACTURER_KM,
-        "cotton": COTTON_DISTANCE_TO_MANUFACTURER_KM,
-        "silk": SILK_DISTANCE_TO_MANUFACTURER_KM,
-        "mikado silk": SILK_DISTANCE_TO_MANUFACTURER_KM,
+        pass
+    emission_by_activity = {}
+    for activity_id in activity_ids:
+        try:
+            emission_per_unit = wiser_client.get_emission_per_unit(activity_id)
+        except Exception:
+            emission_per_unit = None
+        emission_by_activity[activity_id] = emission_per_unit
+    return emission_by_activity
+
+
+def _material_reference_row(
+    material: dict, emission_by_activity: dict[int, float | None], costs: _CostModel
+) -> dict:
+    material_emission_per_unit = emission_by_activity[material["activity_id"]]
+    return {
+        **material,
+        "cost_per_kg_chf": _safe_round(costs.material_cost_per_kg(material["name"])),
+        "longevity_wears": costs.longevity_wears(material["name"]),
+        "co2eq_per_kg": (
+            _safe_round(material_emission_per_unit, 3)
+            if material_emission_per_unit is not None
+            else None
+        ),
+    }
+
+
+def _process_type_reference_row(
+    process_type: dict, emission_by_activity: dict[int, float | None], costs: _CostModel
+) -> dict:
+    ecological_unit_cost = emission_by_activity.get(process_type["activity_id"])
+    return {
+        **process_type,
+        "economic_cost_per_unit_chf": _safe_round(
+            costs.process_cost_per_unit(process_type["name"])
+        ),
+        "ecological_cost_per_unit_co2eq": (
+            _safe_round(float(ecological_unit_cost), 6)
+            if ecological_unit_cost is not None
+            else None
+        ),
     }
-    return material_distances.get(material_name.lower())
+
+
+def _safe_round(value: float | int | None, digits: int = 2) -> float:
+    return round(float(value or 0), digits)
 
 
 def _build_fabric_block_process_breakdown(
-    fabric_block_type: dict,
-    wiser_client: WiserClient,
-    emission_cache: dict[int, float | None],
-    mock_data: dict,
-) -> tuple[list[dict], float, float | None]:
+    block_processes: list[tuple[str, float, int]],
+    emission_by_activity: dict[int, float | None],
+    costs: _CostModel,
+) -> tuple[list[dict], float]:
     process_rows = []
     total_process_cost = 0.0
-    total_process_co2 = 0.0
 
-    for process_name, process_amount, process_activity_id in get_fabric_block_processes_for_emission(
-        fabric_block_type["id"]
-    ):
-        process_emission_per_unit = _get_emission_per_unit(
-            wiser_client, process_activity_id, emission_cache
+    for process_name, process_amount, process_activity_id in block_processes:
+        process_emission_per_unit = emission_by_activity[process_activity_id]
+        process_emission = (
+            process_emission_per_unit * float(process_amount)
+            if process_emission_per_unit is not None
+            else None
         )
-        if process_emission_per_unit is None:
-            total_process_co2 = None
-            process_emission = None
-        else:
-            process_emission = process_emission_per_unit * float(process_amount)
-            if total_process_co2 is not None:
-                total_process_co2 += process_emission
-
-        process_cost = _process_cost(process_name, float(process_amount), mock_data)
+        process_cost = costs.process_cost(process_name, float(process_amount))
         total_process_cost += process_cost
         process_rows.append(
             {
@@ -180,46 +463,54 @@ def _build_fabric_block_process_breakdown(
             }
         )
 
-    return process_rows, _safe_round(total_process_cost), (
-        _safe_round(total_process_co2, 3) if total_process_co2 is not None else None
-    )
+    return process_rows, _safe_round(total_process_cost)
 
 
-def _build_fabric_block_reference_row(
+def _fabric_block_reference_row(
     fabric_block_type: dict,
     material: dict,
-    wiser_client: WiserClient,
-    emission_cache: dict[int, float | None],
-    mock_data: dict,
+    block_processes: list[tuple[int, str, float, int]],
+    emission_by_activity: dict[int, float | None],
+    costs: _CostModel,
 ) -> dict:
-    block_weight_kg = float(material["kg_per_sqm"]) * float(fabric_block_type["sqm"])
-
-    material_emission_per_unit = _get_emission_per_unit(
-        wiser_client, material.get("activity_id"), emission_cache
-    )
+    # A CO2 category is None as soon as one of its emission factors is missing.
+    block_weight_kg = material["kg_per_sqm"] * fabric_block_type["sqm"]
+    material_emission_per_unit = emission_by_activity[material["activity_id"]]
     material_emission = (
-        material_emission_per_unit * block_weight_kg
+        block_weight_kg * material_emission_per_unit
         if material_emission_per_unit is not None
         else None
     )
-    material_cost = float(material.get("cost_per_kg_chf") or 0) * block_weight_kg
-
-    block_processes, block_process_cost, block_process_co2 = (
-        _build_fabric_block_process_breakdown(
-            fabric_block_type, wiser_client, emission_cache, mock_data
-        )
+    block_process_co2 = 0.0
+    for _, _, process_amount, process_activity_id in block_processes:
+        process_emission_per_unit = emission_by_activity[process_activity_id]
+        if process_emission_per_unit is None:
+            block_process_co2 = None
+            break
+        block_process_co2 += (process_amount or 0) * process_emission_per_unit
+    if block_process_co2 is not None:
+        block_process_co2 = _safe_round(block_process_co2, 3)
+    distance_km = material_distance_to_manufacturer_km(material["name"])
+    transport_emission_per_unit = emission_by_activity[
+        ACTIVITY_ID_LONG_DISTANCE_TRANSPORT
+    ]
+    transport_emission = (
+        (distance_km or 0) / 1000 * block_weight_kg * transport_emission_per_unit
+        if transport_emission_per_unit is not None
+        else None
     )
+    material_cost = float(material.get("cost_per_kg_chf") or 0) * block_weight_kg
 
-    distance_km = _get_material_distance_to_manufacturer_km(material["name"])
-    transport_emission = calculate_transport_emission(
-        float(distance_km or 0),
-        block_weight_kg,
-        _get_emission_per_unit(
-            wiser_client, ACTIVITY_ID_LONG_DISTANCE_TRANSPORT, emission_cache
-        ),
+    processes, block_process_cost = _build_fabric_block_process_breakdown(
+        [
+            (process_name, process_amount, process_activity_id)
+            for _, process_name, process_amount, process_activity_id in block_processes
+        ],
+        emission_by_activity,
+        costs,
     )
     if distance_km is not None:
-        block_processes.append(
+        processes.append(
             {
                 "process": "material transport to manufacturer",
                 "amount": _safe_round(distance_km, 3),
@@ -259,72 +550,10 @@ def _build_fabric_block_reference_row(
             else None
         ),
         "co2eq_kg": _safe_round(total_co2, 3) if total_co2 is not None else None,
-        "processes": block_processes,
+        "processes": processes,
     }
 
 
-def _build_fabric_block_reference_rows(
-    fabric_block_types: list[dict],
-    materials: list[dict],
-    wiser_client: WiserClient,
-    emission_cache: dict[int, float | None],
-    mock_data: dict,
-) -> list[dict]:
-    rows = []
-    for fabric_block_type in fabric_block_types:
-        for material in materials:
-            rows.append(
-                _build_fabric_block_reference_row(
-                    fabric_block_type,
-                    material,
-                    wiser_client,
-                    emission_cache,
-                    mock_data,
-                )
-            )
-    return rows
-
-
-def _mock_material_data(material_name: str, mock_data: dict) -> dict:
-    materials = mock_data.get("materials", {})
-    return materials.get(material_name.lower(), materials.get("default", {}))
-
-
-def _process_cost(process_name: str, amount: float, mock_data: dict) -> float:
-    process_definitions = mock_data.get("process_types", {})
-    process_data = process_definitions.get(
-        process_name.lower(), process_definitions.get("default", {})
-    )
-    return float(process_data.get("cost_per_unit_chf", 0)) * float(amount)
-
-
-def _transport_cost(
-    distance_km: float | None, amount_kg: float, mock_data: dict
-) -> float:
-    if distance_km is None:
-        return 0.0
-    process_definitions = mock_data.get("process_types", {})
-    cost_per_ton_km = float(
-        process_definitions.get("transport", {}).get("cost_per_ton_km_chf", 0)
-    )
-    return cost_per_ton_km * (float(amount_kg) / 1000.0) * float(distance_km)
-
-
-def _transport_delay(distance_km: float | None, mock_data: dict) -> float:
-    if distance_km is None:
-        return 0.0
-    delay_model = mock_data.get("delay_model", {})
-    base_delay = float(delay_model.get("transport_base_delay_days", 0))
-    delay_per_100_km = float(delay_model.get("transport_delay_days_per_100_km", 0))
-    return base_delay + (float(distance_km) / 100.0) * delay_per_100_km
-
-
-def _actor_delay(role_group: str, mock_data: dict) -> float:
-    delay_model = mock_data.get("delay_model", {})
-    actor_delays = delay_model.get("actor_base_delay_days", {})
-    return float(actor_delays.get(role_group, actor_delays.get("default", 0)))
-
-
 def _select_default_company(
     options: list[dict], preferred: str | None = None
 ) -> str | None:
@@ -337,14 +566,17 @@ def _select_default_company(
     return options[0]["company"]
 
 
-def _build_supply_chain_legs(
+def _supply_chain_route(
     fabric_supplier: dict | None,
     garment_supplier: dict | None,
     finishing_supplier: dict | None,
-    total_weight_kg: float,
-    transport_emission_per_unit: float | None,
-    mock_data: dict,
-) -> tuple[list[dict], list[dict], dict]:
+    costs: _CostModel,
+) -> tuple[list[dict], list[tuple[dict, dict, float | None, float]], dict]:
+    """Actors, legs and delays of a supply chain, none of which depend on weight.
+
+    Legs are (source, destination, distance, delay) tuples for
+    ``_price_supply_chain_legs``.
+    """
     actors = []
     if fabric_supplier:
         actors.append(
@@ -352,7 +584,7 @@ def _build_supply_chain_legs(
                 "role_group": "fabric",
                 "company": fabric_supplier["company"],
                 "location": fabric_supplier["location"],
-                "delay_days": _actor_delay("fabric", mock_data),
+                "delay_days": costs.actor_delay("fabric"),
             }
         )
     if garment_supplier:
@@ -361,7 +593,7 @@ def _build_supply_chain_legs(
                 "role_group": "garment",
                 "company": garment_supplier["company"],
                 "location": garment_supplier["location"],
-                "delay_days": _actor_delay("garment", mock_data),
+                "delay_days": costs.actor_delay("garment"),
             }
         )
     if finishing_supplier:
@@ -370,7 +602,7 @@ def _build_supply_chain_legs(
                 "role_group": "finishing",
                 "company": finishing_supplier["company"],
                 "location": finishing_supplier["location"],
-                "delay_days": _actor_delay("finishing", mock_data),
+                "delay_days": costs.actor_delay("finishing"),
             }
         )
 
@@ -378,45 +610,27 @@ def _build_supply_chain_legs(
         (fabric_supplier, garment_supplier),
         (garment_supplier, finishing_supplier),
     ]
+    distances = manufacturer_distance_matrix.matrix()
     legs = []
-    transport_cost_total = 0.0
-    transport_co2_total = 0.0
     total_delay_days = 0.0
 
     for source_supplier, destination_supplier in raw_legs:
         if not source_supplier or not destination_supplier:
             continue
 
-        distance_row = db_get_manufacturer_distance_row(
+        distance_km = distances.get(
             source_supplier["company"], destination_supplier["company"]
         )
-        distance_km = distance_row["distance_km"] if distance_row else None
-        leg_delay_days = _transport_delay(distance_km, mock_data)
-        leg_cost_chf = _transport_cost(distance_km, total_weight_kg, mock_data)
-        leg_co2eq_kg = calculate_transport_emission(
-            float(distance_km) if distance_km is not None else 0.0,
-            total_weight_kg,
-            transport_emission_per_unit,
-        )
-        transport_cost_total += leg_cost_chf
-        transport_co2_total += float(leg_co2eq_kg or 0)
+        leg_delay_days = costs.transport_delay(distance_km)
         total_delay_days += leg_delay_days
         legs.append(
-            {
-                "source_company": source_supplier["company"],
-                "source_role_group": source_supplier["role_group"],
-                "destination_company": destination_supplier["company"],
-                "destination_role_group": destination_supplier["role_group"],
-                "distance_km": _safe_round(distance_km),
-                "delay_days": _safe_round(leg_delay_days),
-                "economic_cost_chf": _safe_round(leg_cost_chf),
-                "co2eq_kg": _safe_round(leg_co2eq_kg),
-            }
+            (source_supplier, destination_supplier, distance_km, leg_delay_days)
         )
 
     actor_delays = []
     incoming_delay_by_company = {
-        leg["destination_company"]: float(leg["delay_days"]) for leg in legs
+        destination["company"]: float(_safe_round(delay_days))
+        for _, destination, _, delay_days in legs
     }
     for actor in actors:
         total_actor_delay = float(actor["delay_days"]) + float(
@@ -438,30 +652,58 @@ def _build_supply_chain_legs(
     )
 
     return (
-        legs,
         actors,
+        legs,
         {
-            "transport_cost_total": _safe_round(transport_cost_total),
-            "transport_co2_total": _safe_round(transport_co2_total, 3),
             "total_delay_days": _safe_round(total_delay_days),
             "highest_delay_actor": highest_delay_actor,
         },
     )
 
 
-def get_designer_balance_scenario(
+def _price_supply_chain_legs(
+    route_legs: list[tuple[dict, dict, float | None, float]],
+    total_weight_kg: float,
+    transport_emission_per_unit: float | None,
+    costs: _CostModel,
+) -> tuple[list[dict], dict]:
+    """Transport cost and CO2 of the legs of a route for one shipment weight."""
+    legs = []
+    transport_cost_total = 0.0
+    transport_co2_total = 0.0
+    for source_supplier, destination_supplier, distance_km, delay_days in route_legs:
+        leg_cost_chf = costs.transport_cost(distance_km, total_weight_kg)
+        leg_co2eq_kg = calculate_transport_emission(
+            float(distance_km) if distance_km is not None else 0.0,
+            total_weight_kg,
+            transport_emission_per_unit,
+        )
+        transport_cost_total += leg_cost_chf
+        transport_co2_total += float(leg_co2eq_kg or 0)
+        legs.append(
+            {
+                "source_company": source_supplier["company"],
+                "source_role_group": source_supplier["role_group"],
+                "destination_company": destination_supplier["company"],
+                "destination_role_group": destination_supplier["role_group"],
+                "distance_km": _safe_round(distance_km),
+                "delay_days": _safe_round(delay_days),
+                "economic_cost_chf": _safe_round(leg_cost_chf),
+                "co2eq_kg": _safe_round(leg_co2eq_kg),
+            }
+        )
+    return legs, {
+        "transport_cost_total": _safe_round(transport_cost_total),
+        "transport_co2_total": _safe_round(transport_co2_total, 3),
+    }
+
+
+def _designer_balance_materials(
     garment_type_id: int,
-    wiser_client: WiserClient,
-    material_id: int | None = None,
-    fabric_supplier_name: str | None = None,
-    garment_supplier_name: str | None = None,
-    finishing_supplier_name: str | None = None,
-) -> dict:
-    mock_data = load_designer_balance_mock_data()
-    garment_types = db_get_garment_types()
-    garment = next(
-        (item for item in garment_types if item["id"] == garment_type_id), None
-    )
+) -> tuple[_ScenarioContext, dict, list[dict]]:
+    """The scenario context, garment and configured materials of a garment."""
+    context = _scenario_context()
+    garment = context.garment_types.get(garment_type_id)
     if garment is None:
         raise HTTPException(status_code=404, detail="Garment type not found")
 
@@ -471,19 +713,51 @@ def get_designer_balance_scenario(
             status_code=404,
             detail="No materials configured for this garment type",
         )
+    return context, garment, materials
+
+
+def _designer_balance_base(
+    garment_type_id: int,
+    wiser_client: WiserClient,
+    material_id: int | None = None,
+) -> dict:
+    """The supplier-independent part of a designer balance scenario.
 
+    Bills of materials and processes, and the CO2 of the recipe itself, do
+    not depend on the supply chain, so scenarios for several supplier
+    choices share one base.
+    """
+    context, garment, materials = _designer_balance_materials(garment_type_id)
     selected_material = next(
         (item for item in materials if item["id"] == material_id), None
     )
     if selected_material is None:
         selected_material = materials[0]
 
-    recipe = get_full_garment_recipe(garment_type_id, int(selected_material["id"]))
+    recipe = compile_garment_recipe(garment_type_id, int(selected_material["id"]))
     if recipe is None:
         raise HTTPException(status_code=404, detail="Garment recipe not found")
+    return _material_balance_base(
+        context, garment, materials, selected_material, recipe, wiser_client
+    )
+
 
+def _material_balance_base(
+    context: _ScenarioContext,
+    garment: dict,
+    materials: list[dict],
+    selected_material: dict,
+    recipe: CompiledGarmentRecipe,
+    wiser_client: WiserClient,
+    prefetch: bool = True,
+) -> dict:
+    costs = context.costs
     co2_data = get_co2_for_garment(
-        garment_type_id, wiser_client, int(selected_material["id"])
+        garment["id"],
+        wiser_client,
+        int(selected_material["id"]),
+        recipe,
+        prefetch=prefetch,
     )
     co2_process_details = [
         detail
@@ -495,62 +769,27 @@ def get_designer_balance_scenario(
     )
     base_fabric_co2 = float(co2_data.fabric_blocks.total_emission)
 
-    supplier_options = {
-        "fabric": db_get_manufacturers("fabric"),
-        "garment": db_get_manufacturers("garment"),
-        "finishing": db_get_manufacturers("finishing"),
-    }
-    selected_supplier_names = {
-        "fabric": _select_default_company(
-            supplier_options["fabric"], fabric_supplier_name
-        ),
-        "garment": _select_default_company(
-            supplier_options["garment"], garment_supplier_name
-        ),
-        "finishing": _select_default_company(
-            supplier_options["finishing"], finishing_supplier_name
-        ),
-    }
-    supplier_lookup = {
-        role_group: {item["company"]: item for item in options}
-        for role_group, options in supplier_options.items()
-    }
-
-    fabric_supplier = supplier_lookup["fabric"].get(selected_supplier_names["fabric"])
-    garment_supplier = supplier_lookup["garment"].get(
-        selected_supplier_names["garment"]
-    )
-    finishing_supplier = supplier_lookup["finishing"].get(
-        selected_supplier_names["finishing"]
+    total_weight_kg = sum(
+        float(entry.fabric_block.weight_kg or 0) * entry.quantity
+        for entry in recipe.fabric_blocks
     )
-
-    total_weight_kg = sum(float(block.weight_kg or 0) for block in recipe.fabric_blocks)
     selected_material_kg_per_sqm = float(selected_material.get("kg_per_sqm") or 0)
-    transport_emission_per_unit = wiser_client.get_emission_per_unit(
-        ACTIVITY_ID_TRANSPORT
-    )
-
-    supply_chain_legs, supply_chain_actors, transport_summary = (
-        _build_supply_chain_legs(
-            fabric_supplier,
-            garment_supplier,
-            finishing_supplier,
-            total_weight_kg,
-            transport_emission_per_unit,
-            mock_data,
-        )
-    )
 
-    material_mock = _mock_material_data(selected_material["name"], mock_data)
-    material_cost_per_kg = float(material_mock.get("cost_per_kg_chf", 0))
+    material_cost_per_kg = costs.material_cost_per_kg(selected_material["name"])
 
     bom_by_block_name: dict[str, dict] = {}
     bop_rows: list[dict] = []
     process_usage: dict[str, dict] = {}
 
-    for fabric_block, block_detail in zip(
-        recipe.fabric_blocks, co2_data.fabric_blocks.details
-    ):
+    # Fabric block details hold one entry per copy, in recipe order. Copies only
+    # differ in their second-life alternative, so each recipe entry is read
+    # from its first copy and scaled by its quantity.
+    detail_index = 0
+    for entry in recipe.fabric_blocks:
+        fabric_block = entry.fabric_block
+        quantity = entry.quantity
+        block_detail = co2_data.fabric_blocks.details[detail_index]
+        detail_index += quantity
         sqm_per_unit = (
             float(fabric_block.weight_kg or 0) / selected_material_kg_per_sqm
             if selected_material_kg_per_sqm > 0
@@ -569,21 +808,23 @@ def get_designer_balance_scenario(
                 "co2eq_kg": 0.0,
             }
 
-        bom_by_block_name[fabric_block.name]["quantity"] += 1
-        bom_by_block_name[fabric_block.name]["total_sqm"] += sqm_per_unit
-        bom_by_block_name[fabric_block.name]["weight_kg"] += float(
-            fabric_block.weight_kg or 0
+        bom_by_block_name[fabric_block.name]["quantity"] += quantity
+        bom_by_block_name[fabric_block.name]["total_sqm"] += sqm_per_unit * quantity
+        bom_by_block_name[fabric_block.name]["weight_kg"] += (
+            float(fabric_block.weight_kg or 0) * quantity
+        )
+        bom_by_block_name[fabric_block.name]["economic_cost_chf"] += (
+            material_cost * quantity
         )
-        bom_by_block_name[fabric_block.name]["economic_cost_chf"] += material_cost
-        bom_by_block_name[fabric_block.name]["co2eq_kg"] += float(
-            block_detail.get("emission", 0)
+        bom_by_block_name[fabric_block.name]["co2eq_kg"] += (
+            float(block_detail.get("emission", 0)) * quantity
         )
 
         for process_detail in block_detail.get("production_processes", []):
             process_name = process_detail.get("process", "Unknown")
-            process_amount = float(process_detail.get("amount", 0))
-            process_emission = float(process_detail.get("emission", 0))
-            process_cost = _process_cost(process_name, process_amount, mock_data)
+            process_amount = float(process_detail.get("amount", 0)) * quantity
+            process_emission = float(process_detail.get("emission", 0)) * quantity
+            process_cost = costs.process_cost(process_name, process_amount)
             bop_rows.append(
                 {
                     "source": f"Fabric block {fabric_block.name}",
@@ -593,9 +834,7 @@ def get_designer_balance_scenario(
                     "co2eq_kg": _safe_round(process_emission, 3),
                 }
             )
-            if process_name.lower() in {
-                item["name"].lower() for item in db_get_process_types()
-            }:
+            if process_name.lower() in context.process_type_names:
                 process_key = process_name.lower()
                 current = process_usage.setdefault(
                     process_key,
@@ -611,7 +850,7 @@ def get_designer_balance_scenario(
             process_detail.get("amount", process_detail.get("duration", 0))
         )
         process_emission = float(process_detail.get("emission", 0))
-        process_cost = _process_cost(process_name, process_amount, mock_data)
+        process_cost = costs.process_cost(process_name, process_amount)
         bop_rows.append(
             {
                 "source": "Garment assembly",
@@ -630,29 +869,6 @@ def get_designer_balance_scenario(
         current["economic_cost_chf"] += process_cost
         current["co2eq_kg"] += process_emission
 
-    transport_tkm = sum(
-        (float(leg.get("distance_km", 0)) * total_weight_kg / 1000.0)
-        for leg in supply_chain_legs
-    )
-    total_transport_co2 = float(transport_summary["transport_co2_total"])
-    total_transport_cost = float(transport_summary["transport_cost_total"])
-    bop_rows.extend(
-        {
-            "source": f"{leg['source_company']} -> {leg['destination_company']}",
-            "process": "transport inside supply chain",
-            "amount": leg["distance_km"],
-            "economic_cost_chf": leg["economic_cost_chf"],
-            "co2eq_kg": leg["co2eq_kg"],
-        }
-        for leg in supply_chain_legs
-    )
-
-    process_usage["transport"] = {
-        "amount": transport_tkm,
-        "economic_cost_chf": total_transport_cost,
-        "co2eq_kg": total_transport_co2,
-    }
-
     bom_rows = []
     total_material_cost = 0.0
     for row in bom_by_block_name.values():
@@ -663,7 +879,29 @@ def get_designer_balance_scenario(
         total_material_cost += float(row["economic_cost_chf"])
         bom_rows.append(row)
 
-    process_types = db_get_process_types()
+    return {
+        "context": context,
+        "garment": garment,
+        "materials": materials,
+        "selected_material": selected_material,
+        "material_cost_per_kg": material_cost_per_kg,
+        "longevity_wears": costs.longevity_wears(selected_material["name"]),
+        "total_weight_kg": total_weight_kg,
+        "transport_emission_per_unit": wiser_client.get_emission_per_unit(
+            ACTIVITY_ID_TRANSPORT
+        ),
+        "base_fabric_co2": base_fabric_co2,
+        "base_process_co2": base_process_co2,
+        "bom_rows": bom_rows,
+        "total_material_cost": total_material_cost,
+        "bop_rows": bop_rows,
+        "process_usage": process_usage,
+    }
+
+
+def _build_process_table(
+    process_types: list[dict], process_usage: dict[str, dict]
+) -> tuple[list[dict], float]:
     process_table = []
     total_process_cost = 0.0
     for process_type in process_types:
@@ -682,8 +920,102 @@ def get_designer_balance_scenario(
                 "co2eq_kg": _safe_round(usage["co2eq_kg"], 3),
             }
         )
+    return process_table, total_process_cost
+
+
+def _select_suppliers(
+    context: _ScenarioContext,
+    fabric_supplier_name: str | None,
+    garment_supplier_name: str | None,
+    finishing_supplier_name: str | None,
+) -> tuple[dict[str, str | None], tuple[dict | None, dict | None, dict | None]]:
+    """The chosen company of each role, falling back to the first, and its row."""
+    selected_supplier_names = {
+        "fabric": _select_default_company(
+            context.suppliers["fabric"], fabric_supplier_name
+        ),
+        "garment": _select_default_company(
+            context.suppliers["garment"], garment_supplier_name
+        ),
+        "finishing": _select_default_company(
+            context.suppliers["finishing"], finishing_supplier_name
+        ),
+    }
+    return selected_supplier_names, tuple(
+        context.suppliers_by_company[role_group].get(
+            selected_supplier_names[role_group]
+        )
+        for role_group in SUPPLIER_ROLE_GROUPS
+    )
+
+
+def get_designer_balance_scenario(
+    garment_type_id: int,
+    wiser_client: WiserClient,
+    material_id: int | None = None,
+    fabric_supplier_name: str | None = None,
+    garment_supplier_name: str | None = None,
+    finishing_supplier_name: str | None = None,
+) -> dict:
+    base = _designer_balance_base(garment_type_id, wiser_client, material_id)
+    context = base["context"]
+    selected_supplier_names, suppliers = _select_suppliers(
+        context, fabric_supplier_name, garment_supplier_name, finishing_supplier_name
+    )
+    route = _supply_chain_route(*suppliers, context.costs)
+    return _balance_scenario(base, selected_supplier_names, route)
+
+
+def _balance_scenario(
+    base: dict,
+    selected_supplier_names: dict[str, str | None],
+    route: tuple[list[dict], list[tuple[dict, dict, float | None, float]], dict],
+) -> dict:
+    context = base["context"]
+    garment = base["garment"]
+    selected_material = base["selected_material"]
+    total_weight_kg = base["total_weight_kg"]
+    supply_chain_actors, route_legs, delay_summary = route
+    supply_chain_legs, transport_summary = _price_supply_chain_legs(
+        route_legs,
+        total_weight_kg,
+        base["transport_emission_per_unit"],
+        context.costs,
+    )
+
+    transport_tkm = sum(
+        (float(leg.get("distance_km", 0)) * total_weight_kg / 1000.0)
+        for leg in supply_chain_legs
+    )
+    total_transport_co2 = float(transport_summary["transport_co2_total"])
+    total_transport_cost = float(transport_summary["transport_cost_total"])
+    bop_rows = base["bop_rows"] + [
+        {
+            "source": f"{leg['source_company']} -> {leg['destination_company']}",
+            "process": "transport inside supply chain",
+            "amount": leg["distance_km"],
+            "economic_cost_chf": leg["economic_cost_chf"],
+            "co2eq_kg": leg["co2eq_kg"],
+        }
+        for leg in supply_chain_legs
+    ]
+
+    process_usage = {
+        **base["process_usage"],
+        "transport": {
+            "amount": transport_tkm,
+            "economic_cost_chf": total_transport_cost,
+            "co2eq_kg": total_transport_co2,
+        },
+    }
+    process_table, total_process_cost = _build_process_table(
+        context.process_types, process_usage
+    )
 
+    total_material_cost = base["total_material_cost"]
     total_economic_cost = total_material_cost + total_process_cost
+    base_fabric_co2 = base["base_fabric_co2"]
+    base_process_co2 = base["base_process_co2"]
     total_co2eq = base_fabric_co2 + base_process_co2 + total_transport_co2
 
     return {
@@ -691,12 +1023,12 @@ def get_designer_balance_scenario(
         "material": {
             "id": selected_material["id"],
             "name": selected_material["name"],
-            "cost_per_kg_chf": _safe_round(material_cost_per_kg),
-            "longevity_wears": int(material_mock.get("longevity_wears", 0)),
+            "cost_per_kg_chf": _safe_round(base["material_cost_per_kg"]),
+            "longevity_wears": base["longevity_wears"],
         },
         "options": {
-            "materials": materials,
-            "suppliers": supplier_options,
+            "materials": base["materials"],
+            "suppliers": context.suppliers,
         },
         "selection": {
             "fabric_supplier": selected_supplier_names["fabric"],
@@ -715,11 +1047,11 @@ def get_designer_balance_scenario(
             "material_and_fabric_co2eq_kg": _safe_round(base_fabric_co2, 3),
             "process_co2eq_kg": _safe_round(base_process_co2, 3),
             "transport_co2eq_kg": _safe_round(total_transport_co2, 3),
-            "average_lifetime_wears": int(material_mock.get("longevity_wears", 0)),
-            "total_delay_days": transport_summary["total_delay_days"],
-            "highest_delay_actor": transport_summary["highest_delay_actor"],
+            "average_lifetime_wears": base["longevity_wears"],
+            "total_delay_days": delay_summary["total_delay_days"],
+            "highest_delay_actor": delay_summary["highest_delay_actor"],
         },
-        "bill_of_materials": bom_rows,
+        "bill_of_materials": base["bom_rows"],
         "bill_of_processes": bop_rows,
         "process_table": process_table,
         "supply_chain": {
@@ -727,3 +1059,229 @@ def get_designer_balance_scenario(
             "legs": supply_chain_legs,
         },
     }
+
+
+SUPPLIER_OBJECTIVES = ("economic_total_chf", "co2eq_total_kg", "total_delay_days")
+
+
+def _transport_leg_objectives(
+    distance_km: np.ndarray,
+    total_weight_kg: float,
+    transport_emission_per_unit: float | None,
+    includes_transport_cost: bool,
+    costs: _CostModel,
+) -> np.ndarray:
+    """Cost, CO2 and delay of every leg, as a single scenario sums them."""
+    transport_co2 = calculate_transport_emission(
+        distance_km, total_weight_kg, transport_emission_per_unit
+    )
+    return np.stack(
+        [
+            costs.transport_cost(distance_km, total_weight_kg)
+            * includes_transport_cost,
+            transport_co2 if transport_co2 is not None else distance_km * 0.0,
+            costs.transport_delay(distance_km),
+        ],
+        axis=-1,
+    )
+
+
+def get_designer_supplier_combinations(
+    garment_type_id: int,
+    wiser_client: WiserClient,
+    material_id: int | None = None,
+    top_k: int = 5,
+) -> dict:
+    """Every supplier combination of a garment and material, in one pass.
+
+    Returns the Pareto front over economic cost, CO2 and delay, and the
+    ``top_k`` combinations of each objective. Combinations with a leg of
+    unknown distance are left out.
+    """
+    base = _designer_balance_base(garment_type_id, wiser_client, material_id)
+    context = base["context"]
+    garment = base["garment"]
+    suppliers = context.suppliers
+
+    # The transport leg's cost only counts where the process table has a row
+    # for it, as in the single scenario.
+    includes_transport_cost = "transport" in context.process_type_names
+    _, process_cost_without_transport = _build_process_table(
+        context.process_types,
+        {
+            **base["process_usage"],
+            "transport": {"amount": 0.0, "economic_cost_chf": 0.0, "co2eq_kg": 0.0},
+        },
+    )
+    fixed_cost = base["total_material_cost"] + process_cost_without_transport
+    fixed_co2 = base["base_fabric_co2"] + base["base_process_co2"]
+    fixed_delay = sum(
+        context.costs.actor_delay(role_group) for role_group in SUPPLIER_ROLE_GROUPS
+    )
+
+    distances = manufacturer_distance_matrix.matrix()
+    first_km, second_km = (
+        distances.grid(
+            [supplier["company"] for supplier in suppliers[source]],
+            [supplier["company"] for supplier in suppliers[destination]],
+        )
+        for source, destination in (("fabric", "garment"), ("garment", "finishing"))
+    )
+    first_leg, second_leg = (
+        _transport_leg_objectives(
+            distance_km,
+            base["total_weight_kg"],
+            base["transport_emission_per_unit"],
+            includes_transport_cost,
+            context.costs,
+        )
+        for distance_km in (first_km, second_km)
+    )
+
+    def combination_rows(combinations: np.ndarray) -> list[dict]:
+        transport = combination_objectives(first_leg, second_leg, combinations)
+        rows = []
+        for (fabric, garment_index, finishing), (cost, co2, delay) in zip(
+            combinations.tolist(), transport.tolist()
+        ):
+            economic_total = fixed_cost + _safe_round(cost)
+            rows.append(
+                {
+                    "fabric_supplier": suppliers["fabric"][fabric]["company"],
+                    "garment_supplier": suppliers["garment"][garment_index]["company"],
+                    "finishing_supplier": suppliers["finishing"][finishing]["company"],
+                    "economic_total_chf": _safe_round(economic_total),
+                    "margin_chf": _safe_round(
+                        float(garment.get("price_chf") or 0) - economic_total
+                    ),
+                    "co2eq_total_kg": _safe_round(fixed_co2 + _safe_round(co2, 3), 3),
+                    "total_delay_days": _safe_round(fixed_delay + delay),
+                    "transport_cost_chf": _safe_round(cost),
+                    "transport_co2eq_kg": _safe_round(co2, 3),
+                    "distance_km": _safe_round(
+                        first_km[fabric, garment_index]
+                        + second_km[garment_index, finishing]
+                    ),
+                }
+            )
+        return rows
+
+    front = combination_rows(pareto_front(first_leg, second_leg))
+    front.sort(key=lambda row: tuple(row[name] for name in SUPPLIER_OBJECTIVES))
+    return {
+        "garment": garment,
+        "material": {
+            "id": base["selected_material"]["id"],
+            "name": base["selected_material"]["name"],
+        },
+        "suppliers": {
+            role_group: len(options) for role_group, options in suppliers.items()
+        },
+        "evaluated_combinations": count_combinations(first_leg, second_leg),
+        "pareto_front": front,
+        "top_k": {
+            name: combination_rows(
+                top_combinations(first_leg, second_leg, objective, top_k)
+            )
+            for objective, name in enumerate(SUPPLIER_OBJECTIVES)
+        },
+    }
+
+
+def get_designer_material_sweep(
+    garment_type_id: int,
+    wiser_client: WiserClient,
+    material_ids: list[int] | None = None,
+    fabric_supplier_name: str | None = None,
+    garment_supplier_name: str | None = None,
+    finishing_supplier_name: str | None = None,
+) -> dict:
+    """Designer balance scenarios of several materials of a garment, side by side.
+
+    Evaluates every material configured for the garment, or those of
+    ``material_ids`` in that order, for one supplier choice. Suppliers and
+    the supply chain route are resolved once and the recipes are loaded
+    and prefetched together; only weight-dependent transport and the
+    recipe itself are evaluated per material. Each material's summary and
+    process table equal those of its single scenario.
+    """
+    context, garment, materials = _designer_balance_materials(garment_type_id)
+    if material_ids is not None:
+        materials_by_id = {material["id"]: material for material in materials}
+        unknown_ids = [
+            material_id
+            for material_id in material_ids
+            if material_id not in materials_by_id
+        ]
+        if unknown_ids:
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    "Materials not configured for this garment type: "
+                    f"{', '.join(str(material_id) for material_id in unknown_ids)}"
+                ),
+            )
+        selected_materials = [
+            materials_by_id[material_id] for material_id in dict.fromkeys(material_ids)
+        ]
+    else:
+        selected_materials = materials
+
+    recipes, recipe_errors = compile_garment_recipes(
+        [(garment_type_id, int(material["id"])) for material in selected_materials]
+    )
+    for error in recipe_errors.values():
+        if error.status_code == 404:
+            raise HTTPException(status_code=404, detail="Garment recipe not found")
+        raise error
+    prefetch_recipe_emissions(wiser_client, recipes.values())
+
+    selected_supplier_names, suppliers = _select_suppliers(
+        context, fabric_supplier_name, garment_supplier_name, finishing_supplier_name
+    )
+    route = _supply_chain_route(*suppliers, context.costs)
+    actors, route_legs, delay_summary = route
+
+    rows = []
+    for material in selected_materials:
+        base = _material_balance_base(
+            context,
+            garment,
+            materials,
+            material,
+            recipes[(garment_type_id, int(material["id"]))],
+            wiser_client,
+            prefetch=False,
+        )
+        scenario = _balance_scenario(base, selected_supplier_names, route)
+        rows.append(
+            {
+                "material": scenario["material"],
+                "total_weight_kg": _safe_round(base["total_weight_kg"], 3),
+                "summary": scenario["summary"],
+                "process_table": scenario["process_table"],
+            }
+        )
+
+    return {
+        "garment": garment,
+        "selection": {
+            "fabric_supplier": selected_supplier_names["fabric"],
+            "garment_supplier": selected_supplier_names["garment"],
+            "finishing_supplier": selected_supplier_names["finishing"],
+        },
+        "supply_chain": {
+            "actors": actors,
+            "legs": [
+                {
+                    "source_company": source["company"],
+                    "destination_company": destination["company"],
+                    "distance_km": _safe_round(distance_km),
+                    "delay_days": _safe_round(delay_days),
+                }
+                for source, destination, distance_km, delay_days in route_legs
+            ],
+            "total_delay_days": delay_summary["total_delay_days"],
+        },
+        "materials": rows,
+    }
@@ -0,0 +1,186 @@
+"""Materialized ``/designer-garment/reference`` payloads.
+
+One payload is kept per database, computed with the emission factors of one
+Wiser client. The write paths in ``queries.py`` and emission-factor
+refreshes record which rows they changed, and the next request recomputes
+only the reference rows depending on them (see
+``designer_balance.get_designer_garment_reference_entry``). A payload's
+version only moves when a refresh actually changes it; it is served as the
+ETag, so clients holding the current payload get a 304.
+
+The same invalidations, recipe writes and supplier syncs move a per-database
+catalog key, which the compiled designer balance scenario context and
+emission engine are keyed by.
+"""
+
+from __future__ import annotations
+
+import secrets
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Iterable
+
+from ceis_backend.config import DB_PATH
+
+
+@dataclass
+class ReferenceChanges:
+    """Changed rows by table and changed emission factors since a refresh.
+
+    ``full`` means it is unknown which rows changed.
+    """
+
+    full: bool = False
+    rows: dict[str, set[int]] = field(default_factory=dict)
+    activity_ids: set[int] = field(default_factory=set)
+
+    def __bool__(self) -> bool:
+        return self.full or bool(self.rows) or bool(self.activity_ids)
+
+    def ids(self, table: str) -> set[int]:
+        return self.rows.get(table, set())
+
+
+@dataclass(frozen=True)
+class ReferenceEntry:
+    owner: Any
+    dataset: Any
+    version: int
+    etag: str
+
+
+# Computes a dataset from the previous one and what changed since, or from
+# scratch when there is none; also says whether the result differs.
+Refresh = Callable[[Any | None, ReferenceChanges], tuple[Any, bool]]
+
+
+class DesignerReferenceCache:
+    def __init__(self) -> None:
+        self._entries: dict[str, ReferenceEntry] = {}
+        self._changes: dict[str, ReferenceChanges] = {}
+        self._catalog_versions: dict[str, int] = {}
+        self._lock = Lock()
+        # Refreshes build on the previous dataset, so they run one at a time.
+        self._refresh_lock = Lock()
+        self._refreshing: str | None = None
+        # Keeps ETags of an earlier process from matching this one's.
+        self._etag_prefix = secrets.token_hex(4)
+        self._versions = 0
+        self.hits = 0
+        self.builds = 0
+        self.refreshes = 0
+
+    @staticmethod
+    def _db_key() -> str:
+        return str(Path(DB_PATH).resolve())
+
+    def get(self, owner: Any, refresh: Refresh) -> ReferenceEntry:
+        """The current entry of the database, refreshing it if anything changed."""
+        db_key = self._db_key()
+        with self._lock:
+            entry = self._entries.get(db_key)
+            if (
+                entry is not None
+                and entry.owner is owner
+                and not self._changes.get(db_key)
+            ):
+                self.hits += 1
+                return entry
+
+        with self._refresh_lock:
+            with self._lock:
+                entry = self._entries.get(db_key)
+                if entry is not None and entry.owner is not owner:
+                    entry = None
+                changes = self._changes.pop(db_key, None) or ReferenceChanges()
+                if entry is not None and not changes:
+                    self.hits += 1
+                    return entry
+                self._refreshing = db_key
+
+            try:
+                dataset, changed = refresh(
+                    entry.dataset if entry is not None else None, changes
+                )
+            except BaseException:
+                with self._lock:
+                    # The popped changes are gone; start over next time.
+                    self._entries.pop(db_key, None)
+                    self._refreshing = None
+                raise
+
+            with self._lock:
+                self._refreshing = None
+                if entry is None:
+                    self.builds += 1
+                else:
+                    self.refreshes += 1
+                if entry is None or changed:
+                    self._versions += 1
+                    version = self._versions
+                else:
+                    version = entry.version
+                entry = ReferenceEntry(
+                    owner=owner,
+                    dataset=dataset,
+                    version=version,
+                    etag=f'"{self._etag_prefix}-{version}"',
+                )
+                self._entries[db_key] = entry
+            return entry
+
+    def catalog_key(self) -> tuple[str, int]:
+        """Identifies the catalog state of the database; any change moves it."""
+        db_key = self._db_key()
+        with self._lock:
+            return db_key, self._catalog_versions.get(db_key, 0)
+
+    def invalidate_catalog(self) -> None:
+        """Move the catalog key for a change the reference payload does not show."""
+        db_key = self._db_key()
+        with self._lock:
+            self._catalog_versions[db_key] = self._catalog_versions.get(db_key, 0) + 1
+
+    def invalidate(self, table: str, row_ids: Iterable[int] | None = None) -> None:
+        """Record changed rows of a table, or a change to any row if None."""
+        db_key = self._db_key()
+        with self._lock:
+            self._catalog_versions[db_key] = self._catalog_versions.get(db_key, 0) + 1
+            changes = self._changes.setdefault(db_key, ReferenceChanges())
+            if row_ids is None:
+                changes.full = True
+            else:
+                changes.rows.setdefault(table, set()).update(row_ids)
+
+    def invalidate_activities(self, activity_ids: Iterable[int]) -> None:
+        """Record changed emission factors for every database's payload."""
+        activity_ids = set(activity_ids)
+        if not activity_ids:
+            return
+        with self._lock:
+            db_keys = set(self._entries)
+            if self._refreshing is not None:
+                db_keys.add(self._refreshing)
+            for db_key in db_keys:
+                self._changes.setdefault(
+                    db_key, ReferenceChanges()
+                ).activity_ids.update(activity_ids)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._changes.clear()
+            self.hits = self.builds = self.refreshes = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "builds": self.builds,
+                "refreshes": self.refreshes,
+                "size": len(self._entries),
+            }
+
+
+designer_reference_cache = DesignerReferenceCache()
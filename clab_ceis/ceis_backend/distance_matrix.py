@@ -0,0 +1,136 @@
+"""In-memory matrix of manufacturer transport distances.
+
+``manufacturer_distances`` is loaded once per database into a dense NumPy
+matrix indexed by company, so supply chain legs are array reads instead of
+one query each, and whole supplier grids can be looked up at once. The sync
+in ``manufacturer_distance_sync.py`` reloads it after writing new rows: the
+new matrix is built on the side and swapped in, while readers keep the one
+they already hold.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Sequence
+
+import numpy as np
+
+from ceis_backend.config import DB_PATH
+from ceis_backend.db_connection import get_connection
+
+
+@dataclass(frozen=True, eq=False)
+class DistanceMatrix:
+    """km from each company (row) to each company (column), NaN when unknown."""
+
+    companies: tuple[str, ...]
+    index: dict[str, int]
+    distance_km: np.ndarray
+
+    def get(self, source_company: str, destination_company: str) -> float | None:
+        source = self.index.get(source_company)
+        destination = self.index.get(destination_company)
+        if source is None or destination is None:
+            return None
+        distance_km = self.distance_km[source, destination]
+        return None if np.isnan(distance_km) else float(distance_km)
+
+    def _indices(self, companies: Sequence[str]) -> np.ndarray:
+        return np.fromiter(
+            (self.index.get(company, -1) for company in companies),
+            dtype=np.int64,
+            count=len(companies),
+        )
+
+    def grid(
+        self, source_companies: Sequence[str], destination_companies: Sequence[str]
+    ) -> np.ndarray:
+        """``(sources, destinations)`` distances of every pair, NaN when unknown."""
+        sources = self._indices(source_companies)
+        destinations = self._indices(destination_companies)
+        distance_km = self.distance_km[
+            np.ix_(np.maximum(sources, 0), np.maximum(destinations, 0))
+        ]
+        distance_km[sources < 0] = np.nan
+        distance_km[:, destinations < 0] = np.nan
+        return distance_km
+
+
+class ManufacturerDistanceMatrix:
+    def __init__(self) -> None:
+        self._matrices: dict[str, DistanceMatrix] = {}
+        self._lock = Lock()
+        self._reload_lock = Lock()
+        self._generation = 0
+        self.loads = 0
+        self.reloads = 0
+
+    @staticmethod
+    def _db_key(db_path: str | None) -> str:
+        return str(Path(DB_PATH if db_path is None else db_path).resolve())
+
+    def matrix(self, db_path: str | None = None) -> DistanceMatrix:
+        """The distances of a database, loading them on first use."""
+        db_key = self._db_key(db_path)
+        with self._lock:
+            matrix = self._matrices.get(db_key)
+            generation = self._generation
+        if matrix is not None:
+            return matrix
+
+        matrix = _load_distance_matrix(db_key)
+        with self._lock:
+            self.loads += 1
+            # A reload that finished meanwhile has the newer rows.
+            if generation == self._generation:
+                self._matrices[db_key] = matrix
+        return matrix
+
+    def reload(self, db_path: str | None = None) -> DistanceMatrix:
+        """Load the table again and swap it in, e.g. after the sync wrote it."""
+        db_key = self._db_key(db_path)
+        with self._reload_lock:
+            matrix = _load_distance_matrix(db_key)
+            with self._lock:
+                self._generation += 1
+                self.loads += 1
+                self.reloads += 1
+                self._matrices[db_key] = matrix
+        return matrix
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "databases": len(self._matrices),
+                "companies": sum(
+                    len(matrix.companies) for matrix in self._matrices.values()
+                ),
+                "loads": self.loads,
+                "reloads": self.reloads,
+            }
+
+
+def _load_distance_matrix(db_path: str) -> DistanceMatrix:
+    with get_connection(db_path) as conn:
+        rows = conn.execute(
+            """
+            SELECT source_company, destination_company, distance_km
+            FROM manufacturer_distances
+            """
+        ).fetchall()
+
+    companies = tuple(sorted({row[0] for row in rows} | {row[1] for row in rows}))
+    index = {company: position for position, company in enumerate(companies)}
+    distance_km = np.full((len(companies), len(companies)), np.nan)
+    if rows:
+        sources, destinations, distances = zip(*rows)
+        distance_km[
+            [index[company] for company in sources],
+            [index[company] for company in destinations],
+        ] = distances
+    return DistanceMatrix(companies=companies, index=index, distance_km=distance_km)
+
+
+manufacturer_distance_matrix = ManufacturerDistanceMatrix()
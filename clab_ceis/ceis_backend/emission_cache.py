@@ -0,0 +1,70 @@
+"""In-process cache tier for Wiser emission factors.
+
+Sits in front of the ``activity_emission_cache`` table so repeated lookups of
+the same activity within a request (or across requests) do not touch SQLite.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from threading import Lock
+
+
+class EmissionMemoryCache:
+    """Bounded, thread-safe LRU of ``activity_id -> emission_per_unit``.
+
+    Entries keep the timestamp they were fetched at, so an entry loaded from
+    the database expires at the same time as the row it came from. Callers
+    decide whether an entry younger than ``ttl_seconds`` is still fresh.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max(int(max_entries), 0)
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[int, tuple[float | None, float]] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self, activity_id: int, now: float, record_stats: bool = True
+    ) -> tuple[float | None, float] | None:
+        """Return ``(emission_per_unit, cached_at)`` or None when absent/expired."""
+        with self._lock:
+            entry = self._entries.get(activity_id)
+            if entry is not None and now - entry[1] <= self.ttl_seconds:
+                self._entries.move_to_end(activity_id)
+                if record_stats:
+                    self.hits += 1
+                return entry
+            if entry is not None:
+                del self._entries[activity_id]
+            if record_stats:
+                self.misses += 1
+            return None
+
+    def put(
+        self, activity_id: int, emission_per_unit: float | None, cached_at: float
+    ) -> None:
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._entries[activity_id] = (emission_per_unit, cached_at)
+            self._entries.move_to_end(activity_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
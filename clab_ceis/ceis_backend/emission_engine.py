@@ -0,0 +1,338 @@
+"""Vectorized CO2 evaluation of every garment type and material at once.
+
+The recipe tables are compiled into dense amount matrices over the set of
+Wiser activities, so the emissions of all garment x material pairs follow
+from a single matrix product with the emission-factor vector:
+
+* fabric block level: ``block_amounts[c, b, a]`` for every block type x
+  material pair ``b`` and the categories material, processes and material
+  transport to the manufacturer;
+* garment level: ``garment_amounts[c, p, a]`` for every garment type x
+  recipe material pair ``p`` and the categories in ``GARMENT_CATEGORIES``,
+  with block quantities and material weights already folded in.
+
+Missing emission factors count as zero, like in ``get_co2_for_garment``.
+The totals match that per-garment calculation, which additionally picks a
+second-life alternative per block copy from the inventory.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from ceis_backend.data.location_details import (
+    ACTIVITY_ID_LONG_DISTANCE_TRANSPORT,
+    ACTIVITY_ID_TRANSPORT,
+    COTTON_DISTANCE_TO_MANUFACTURER_KM,
+    HEMP_DISTANCE_TO_MANUFACTURER_KM,
+    SILK_DISTANCE_TO_MANUFACTURER_KM,
+    SUPPLY_CHAIN_DESTINATION_COMPANY,
+    SUPPLY_CHAIN_SOURCE_COMPANY,
+)
+from ceis_backend.db_connection import get_connection
+from ceis_backend.designer_reference_cache import designer_reference_cache
+from ceis_backend.distance_matrix import manufacturer_distance_matrix
+from ceis_backend.utils import prefetch_emissions
+from ceis_backend.wiser_bridge import WiserClient
+
+BLOCK_CATEGORIES = ("material", "processes", "transport")
+GARMENT_CATEGORIES = ("material", "production", "assembly", "supply_chain_transport")
+
+MATERIAL_DISTANCES_TO_MANUFACTURER_KM = {
+    "hemp": HEMP_DISTANCE_TO_MANUFACTURER_KM,
+    "cotton": COTTON_DISTANCE_TO_MANUFACTURER_KM,
+    "silk": SILK_DISTANCE_TO_MANUFACTURER_KM,
+    "mikado silk": SILK_DISTANCE_TO_MANUFACTURER_KM,
+}
+
+
+def material_distance_to_manufacturer_km(material_name: str) -> float | None:
+    return MATERIAL_DISTANCES_TO_MANUFACTURER_KM.get(material_name.lower())
+
+
+@dataclass(frozen=True)
+class EmissionEngine:
+    activity_ids: np.ndarray
+    garment_types: list[dict]
+    materials: list[dict]
+    fabric_block_types: list[dict]
+    # (process name, amount, activity id) per fabric block type, in recipe order.
+    block_processes: dict[int, list[tuple[str, float, int]]]
+    block_keys: list[tuple[int, int]]
+    block_weights_kg: np.ndarray
+    block_amounts: np.ndarray
+    # Which activities a block category reads, even with a zero amount.
+    block_uses: np.ndarray
+    garment_keys: list[tuple[int, int]]
+    garment_amounts: np.ndarray
+
+    def resolve_factors(
+        self, wiser_client: WiserClient, strict: bool = True
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Emission factor per activity (0 when unknown) and a missing mask.
+
+        With ``strict=False`` a failed lookup counts as missing instead of
+        raising, as the designer reference does.
+        """
+        activity_ids = [int(activity_id) for activity_id in self.activity_ids]
+        if strict:
+            prefetch_emissions(wiser_client, activity_ids)
+        else:
+            try:
+                prefetch_emissions(wiser_client, activity_ids)
+            except Exception:
+                pass
+
+        factors = np.zeros(len(activity_ids))
+        missing = np.zeros(len(activity_ids), dtype=bool)
+        for index, activity_id in enumerate(activity_ids):
+            if strict:
+                emission_per_unit = wiser_client.get_emission_per_unit(activity_id)
+            else:
+                try:
+                    emission_per_unit = wiser_client.get_emission_per_unit(activity_id)
+                except Exception:
+                    emission_per_unit = None
+            if emission_per_unit is None:
+                missing[index] = True
+            else:
+                factors[index] = emission_per_unit
+        return factors, missing
+
+    def factor_lookup(
+        self, factors: np.ndarray, missing: np.ndarray
+    ) -> dict[int, float | None]:
+        return {
+            int(activity_id): None if is_missing else float(factor)
+            for activity_id, factor, is_missing in zip(
+                self.activity_ids, factors, missing
+            )
+        }
+
+    def block_emissions(self, factors: np.ndarray) -> np.ndarray:
+        """``(len(BLOCK_CATEGORIES), len(block_keys))`` kg CO2eq."""
+        return self.block_amounts @ factors
+
+    def block_missing(self, missing: np.ndarray) -> np.ndarray:
+        """Whether a block category reads at least one missing factor."""
+        return self.block_uses @ missing.astype(np.int64) > 0
+
+    def garment_emissions(self, factors: np.ndarray) -> np.ndarray:
+        """``(len(GARMENT_CATEGORIES), len(garment_keys))`` kg CO2eq."""
+        return self.garment_amounts @ factors
+
+    def garment_totals(self, factors: np.ndarray) -> list[dict]:
+        """Per-category and total CO2 of every garment type x material pair."""
+        emissions = self.garment_emissions(factors)
+        fabric_blocks = emissions[0] + emissions[1]
+        processes = emissions[2] + emissions[3]
+        garment_names = {row["id"]: row["name"] for row in self.garment_types}
+        material_names = {row["id"]: row["name"] for row in self.materials}
+
+        return [
+            {
+                "garment_type_id": garment_type_id,
+                "garment_type": garment_names[garment_type_id],
+                "material_id": material_id,
+                "material": material_names[material_id],
+                "categories": {
+                    category: float(emissions[category_index, pair_index])
+                    for category_index, category in enumerate(GARMENT_CATEGORIES)
+                },
+                "fabric_blocks_emission": float(fabric_blocks[pair_index]),
+                "processes_emission": float(processes[pair_index]),
+                "total_emission": float(
+                    fabric_blocks[pair_index] + processes[pair_index]
+                ),
+            }
+            for pair_index, (garment_type_id, material_id) in enumerate(
+                self.garment_keys
+            )
+        ]
+
+
+# The compiled engine of each database with the catalog key it was built at,
+# replaced when the catalog changes.
+_engines: dict[str, tuple[tuple[str, int], EmissionEngine]] = {}
+
+
+def get_emission_engine() -> EmissionEngine:
+    """The engine of the current database, compiled once per catalog version."""
+    catalog_key = designer_reference_cache.catalog_key()
+    cached = _engines.get(catalog_key[0])
+    if cached is not None and cached[0] == catalog_key:
+        return cached[1]
+
+    engine = compile_emission_engine()
+    _engines[catalog_key[0]] = (catalog_key, engine)
+    return engine
+
+
+def compile_emission_engine() -> EmissionEngine:
+    """Compile the recipe tables into an EmissionEngine with set-based queries."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        garment_types = [
+            {"id": row[0], "name": row[1]}
+            for row in cursor.execute(
+                "SELECT id, name FROM garment_types ORDER BY id"
+            ).fetchall()
+        ]
+        materials = [
+            {"id": row[0], "name": row[1], "kg_per_sqm": row[2], "activity_id": row[3]}
+            for row in cursor.execute(
+                "SELECT id, name, kg_per_sqm, activity_id FROM materials ORDER BY name"
+            ).fetchall()
+        ]
+        fabric_block_types = [
+            {"id": row[0], "name": row[1], "sqm": row[2]}
+            for row in cursor.execute(
+                "SELECT id, name, sqm FROM fabric_block_types"
+            ).fetchall()
+        ]
+        block_processes: dict[int, list[tuple[str, float, int]]] = {}
+        cursor.execute(
+            """
+            SELECT fbrp.fabric_block_type, pt.name, fbrp.amount, pt.activity_id
+            FROM fabric_block_recipe_processes fbrp
+            JOIN process_types pt ON fbrp.process_id = pt.id
+            ORDER BY fbrp.id
+            """
+        )
+        for type_id, name, amount, activity_id in cursor.fetchall():
+            block_processes.setdefault(type_id, []).append((name, amount, activity_id))
+
+        cursor.execute(
+            """
+            SELECT garment_type, fabric_block_id, amount
+            FROM garment_recipe_fabric_blocks
+            WHERE amount
+            ORDER BY id
+            """
+        )
+        recipe_blocks = cursor.fetchall()
+
+        cursor.execute(
+            """
+            SELECT grp.garment_type, grp.amount, pt.activity_id
+            FROM garment_recipe_processes grp
+            JOIN process_types pt ON grp.process_id = pt.id
+            ORDER BY grp.id
+            """
+        )
+        recipe_processes = cursor.fetchall()
+
+        cursor.execute(
+            """
+            SELECT DISTINCT grm.garment_type, grm.material_id
+            FROM garment_recipe_materials grm
+            JOIN garment_types gt ON gt.id = grm.garment_type
+            JOIN materials m ON m.id = grm.material_id
+            ORDER BY grm.garment_type, grm.material_id
+            """
+        )
+        garment_keys = [tuple(row) for row in cursor.fetchall()]
+        process_activity_ids = [
+            row[0]
+            for row in cursor.execute(
+                "SELECT DISTINCT activity_id FROM process_types"
+            ).fetchall()
+        ]
+    supply_chain_distance_km = manufacturer_distance_matrix.matrix().get(
+        SUPPLY_CHAIN_SOURCE_COMPANY, SUPPLY_CHAIN_DESTINATION_COMPANY
+    )
+
+    activity_ids = sorted(
+        {
+            ACTIVITY_ID_TRANSPORT,
+            ACTIVITY_ID_LONG_DISTANCE_TRANSPORT,
+            *(material["activity_id"] for material in materials),
+            *process_activity_ids,
+        }
+    )
+    activity_index = {
+        activity_id: index for index, activity_id in enumerate(activity_ids)
+    }
+    long_distance_index = activity_index[ACTIVITY_ID_LONG_DISTANCE_TRANSPORT]
+
+    block_keys = [
+        (block_type["id"], material["id"])
+        for block_type in fabric_block_types
+        for material in materials
+    ]
+    block_index = {key: index for index, key in enumerate(block_keys)}
+    block_weights_kg = np.zeros(len(block_keys))
+    block_amounts = np.zeros(
+        (len(BLOCK_CATEGORIES), len(block_keys), len(activity_ids))
+    )
+    block_uses = np.zeros(block_amounts.shape, dtype=np.int64)
+    for block_type in fabric_block_types:
+        for material in materials:
+            index = block_index[(block_type["id"], material["id"])]
+            weight_kg = material["kg_per_sqm"] * block_type["sqm"]
+            block_weights_kg[index] = weight_kg
+
+            material_activity = activity_index[material["activity_id"]]
+            block_amounts[0, index, material_activity] += weight_kg
+            block_uses[0, index, material_activity] = 1
+
+            for _, amount, activity_id in block_processes.get(block_type["id"], []):
+                block_amounts[1, index, activity_index[activity_id]] += amount or 0
+                block_uses[1, index, activity_index[activity_id]] = 1
+
+            distance_km = material_distance_to_manufacturer_km(material["name"])
+            block_amounts[2, index, long_distance_index] = (
+                (distance_km or 0) / 1000 * weight_kg
+            )
+            block_uses[2, index, long_distance_index] = 1
+
+    # Quantity of each block type x material pair per garment pair, so the
+    # block matrices fold into the garment level with one product each.
+    pair_index = {key: index for index, key in enumerate(garment_keys)}
+    garment_types_by_id: dict[int, list[int]] = {}
+    for garment_type_id, material_id in garment_keys:
+        garment_types_by_id.setdefault(garment_type_id, []).append(material_id)
+    quantities = np.zeros((len(garment_keys), len(block_keys)))
+    for garment_type_id, fabric_block_id, amount in recipe_blocks:
+        for material_id in garment_types_by_id.get(garment_type_id, []):
+            block = block_index.get((fabric_block_id, material_id))
+            if block is not None:
+                quantities[pair_index[(garment_type_id, material_id)], block] += amount
+
+    assembly = np.zeros((len(garment_keys), len(activity_ids)))
+    for garment_type_id, amount, activity_id in recipe_processes:
+        for material_id in garment_types_by_id.get(garment_type_id, []):
+            assembly[
+                pair_index[(garment_type_id, material_id)], activity_index[activity_id]
+            ] += (amount or 0)
+
+    supply_chain = np.zeros((len(garment_keys), len(activity_ids)))
+    if supply_chain_distance_km is not None:
+        supply_chain[:, activity_index[ACTIVITY_ID_TRANSPORT]] = (
+            supply_chain_distance_km / 1000 * (quantities @ block_weights_kg)
+        )
+
+    garment_amounts = np.stack(
+        [
+            quantities @ block_amounts[0],
+            quantities @ (block_amounts[1] + block_amounts[2]),
+            assembly,
+            supply_chain,
+        ]
+    )
+
+    return EmissionEngine(
+        activity_ids=np.array(activity_ids, dtype=np.int64),
+        garment_types=garment_types,
+        materials=materials,
+        fabric_block_types=fabric_block_types,
+        block_processes=block_processes,
+        block_keys=block_keys,
+        block_weights_kg=block_weights_kg,
+        block_amounts=block_amounts,
+        block_uses=block_uses,
+        garment_keys=garment_keys,
+        garment_amounts=garment_amounts,
+    )
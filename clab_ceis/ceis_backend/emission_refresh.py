@@ -0,0 +1,141 @@
+"""Background refresh of Wiser emission factors (stale-while-revalidate).
+
+Requests are answered from stale cache entries while this refresher
+re-fetches them, together with entries that are about to expire, in
+batches off the request path. An activity whose refresh failed is backed
+off exponentially, so an unavailable Wiser API is not re-requested for
+every stale activity on every cycle.
+"""
+
+from __future__ import annotations
+
+from threading import Condition, Thread
+from time import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ceis_backend.wiser_bridge import WiserClient
+
+
+class EmissionRefresher:
+    def __init__(
+        self,
+        client: WiserClient,
+        *,
+        interval_seconds: float,
+        refresh_ahead_seconds: float,
+        batch_size: int,
+        max_backoff_seconds: float,
+    ) -> None:
+        self._client = client
+        self.interval_seconds = interval_seconds
+        self.refresh_ahead_seconds = refresh_ahead_seconds
+        self.batch_size = max(int(batch_size), 1)
+        self.max_backoff_seconds = max_backoff_seconds
+        self._pending: dict[int, float] = {}
+        # Activity id -> (next attempt time, current delay) after failures.
+        self._backoff: dict[int, tuple[float, float]] = {}
+        self._condition = Condition()
+        self._thread: Thread | None = None
+        self._stopping = False
+        self.stale_served = 0
+        self.refreshed = 0
+        self.failures = 0
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+
+    def schedule(self, activity_id: int, cached_at: float) -> None:
+        """Queue a stale entry that was just served for refresh."""
+        with self._condition:
+            self.stale_served += 1
+            self._pending.setdefault(activity_id, cached_at)
+            self._condition.notify()
+        self.start()
+
+    def start(self) -> None:
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = Thread(
+                target=self._run, name="wiser-emission-refresh", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def refresh_now(self, pending: dict[int, float] | None = None) -> None:
+        """Refresh queued entries plus every entry expiring within the lead time.
+
+        Activities still backing off from a failed refresh are skipped.
+        """
+        now = time()
+        due = self._client._find_expiring_emissions(now + self.refresh_ahead_seconds)
+        due.update(pending or {})
+        with self._condition:
+            activity_ids = [
+                activity_id
+                for activity_id in due
+                if self._backoff.get(activity_id, (0.0, 0.0))[0] <= now
+            ]
+        for start in range(0, len(activity_ids), self.batch_size):
+            batch = activity_ids[start : start + self.batch_size]
+            errors = self._client._refresh_emissions(batch)
+            refreshed_at = time()
+            with self._condition:
+                for activity_id in batch:
+                    if errors.get(activity_id) is not None:
+                        self.failures += 1
+                        _, delay = self._backoff.get(activity_id, (0.0, 0.0))
+                        delay = min(
+                            max(delay * 2, self.interval_seconds),
+                            self.max_backoff_seconds,
+                        )
+                        self._backoff[activity_id] = (refreshed_at + delay, delay)
+                        continue
+                    self._backoff.pop(activity_id, None)
+                    self.refreshed += 1
+                    # How long the entry had been past its TTL when replaced;
+                    # refreshing ahead of expiry counts as no lag.
+                    lag = max(
+                        refreshed_at
+                        - due[activity_id]
+                        - self._client.emission_cache_ttl_seconds,
+                        0.0,
+                    )
+                    self.last_lag_seconds = lag
+                    self.max_lag_seconds = max(self.max_lag_seconds, lag)
+
+    def stats(self) -> dict[str, int | float]:
+        with self._condition:
+            return {
+                "stale_served": self.stale_served,
+                "refreshed": self.refreshed,
+                "refresh_failures": self.failures,
+                "refresh_lag_seconds_last": self.last_lag_seconds,
+                "refresh_lag_seconds_max": self.max_lag_seconds,
+                "refresh_pending": len(self._pending),
+                "refresh_backing_off": len(self._backoff),
+            }
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._pending and not self._stopping:
+                    self._condition.wait(self.interval_seconds)
+                if self._stopping:
+                    return
+                pending, self._pending = self._pending, {}
+            try:
+                self.refresh_now(pending)
+            except Exception:
+                # Failures are counted per activity; anything else (e.g. the
+                # database being unavailable) must not kill the refresher.
+                with self._condition:
+                    self.failures += len(pending)
@@ -0,0 +1,193 @@
+"""Export and import snapshots of cached Wiser emission factors.
+
+A snapshot lets a fresh backend instance start with a warm
+``activity_emission_cache`` instead of paying for every Wiser fetch on its
+first requests. Snapshots are tagged with the ecoinvent database version the
+factors were fetched from and are only imported into a matching backend.
+
+Usage:
+    python -m ceis_backend.emission_snapshot export snapshot.json
+    python -m ceis_backend.emission_snapshot import snapshot.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+from time import time
+
+from ceis_backend.activity_dependencies import mark_sold_garments_stale
+from ceis_backend.co2_result_cache import co2_result_cache
+from ceis_backend.config import EMISSION_SNAPSHOT_PATH, WISER_API_BASE_URL
+from ceis_backend.data.location_details import (
+    ACTIVITY_ID_LONG_DISTANCE_TRANSPORT,
+    ACTIVITY_ID_TRANSPORT,
+)
+from ceis_backend.db_connection import get_connection
+from ceis_backend.designer_reference_cache import designer_reference_cache
+from ceis_backend.db_init import apply_schema_migrations, create_tables
+from ceis_backend.wiser_bridge import WiserClient, WiserClientError
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+class SnapshotVersionError(ValueError):
+    """Raised when a snapshot was taken from another ecoinvent version."""
+
+
+def ecoinvent_version(api_base_url: str = WISER_API_BASE_URL) -> str:
+    """The ecoinvent database of a Wiser base URL, e.g. ``3.12-cutoff``."""
+    return api_base_url.rstrip("/").rsplit("/", 1)[-1]
+
+
+def build_emission_snapshot() -> dict:
+    with get_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT activity_id, emission_per_unit, cached_at
+            FROM activity_emission_cache
+            ORDER BY activity_id
+            """
+        ).fetchall()
+    return {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "ecoinvent_version": ecoinvent_version(),
+        "exported_at": time(),
+        "emissions": [list(row) for row in rows],
+    }
+
+
+def load_emission_snapshot(
+    snapshot: dict, wiser_client: WiserClient | None = None
+) -> int:
+    """Merge a snapshot into the cache, keeping whichever entry is newer.
+
+    A running client's in-memory factors are dropped before the CO2 results
+    are invalidated, so no result is recomputed from the old factors.
+    """
+    if snapshot.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported snapshot format: {snapshot.get('format_version')!r}"
+        )
+    if snapshot.get("ecoinvent_version") != ecoinvent_version():
+        raise SnapshotVersionError(
+            f"Snapshot is for ecoinvent {snapshot.get('ecoinvent_version')!r}, "
+            f"backend uses {ecoinvent_version()!r}"
+        )
+
+    rows = [
+        (int(activity_id), emission_per_unit, float(cached_at))
+        for activity_id, emission_per_unit, cached_at in snapshot.get("emissions", [])
+    ]
+    with get_connection() as conn:
+        stored = {
+            activity_id: (emission_per_unit, cached_at)
+            for activity_id, emission_per_unit, cached_at in conn.execute(
+                "SELECT activity_id, emission_per_unit, cached_at "
+                "FROM activity_emission_cache"
+            )
+        }
+        changed_activity_ids = [
+            activity_id
+            for activity_id, emission_per_unit, cached_at in rows
+            if activity_id not in stored
+            or (
+                cached_at > stored[activity_id][1]
+                and emission_per_unit != stored[activity_id][0]
+            )
+        ]
+        conn.executemany(
+            """
+            INSERT INTO activity_emission_cache
+                (activity_id, emission_per_unit, cached_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(activity_id) DO UPDATE SET
+                emission_per_unit = excluded.emission_per_unit,
+                cached_at = excluded.cached_at
+            WHERE excluded.cached_at > activity_emission_cache.cached_at
+            """,
+            rows,
+        )
+        mark_sold_garments_stale(changed_activity_ids, conn)
+        conn.commit()
+    if wiser_client is not None:
+        wiser_client.clear_emission_memory_cache()
+    co2_result_cache.invalidate_activities(changed_activity_ids)
+    designer_reference_cache.invalidate_activities(changed_activity_ids)
+    return len(rows)
+
+
+def export_emission_snapshot(path: str | os.PathLike) -> int:
+    snapshot = build_emission_snapshot()
+    Path(path).write_text(json.dumps(snapshot, separators=(",", ":")))
+    return len(snapshot["emissions"])
+
+
+def import_emission_snapshot(
+    path: str | os.PathLike, wiser_client: WiserClient | None = None
+) -> int:
+    return load_emission_snapshot(json.loads(Path(path).read_text()), wiser_client)
+
+
+def referenced_activity_ids() -> list[int]:
+    """Every activity the CO2 calculations can ask Wiser for."""
+    with get_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT activity_id FROM materials
+            UNION
+            SELECT activity_id FROM process_types
+            """
+        ).fetchall()
+    activity_ids = {row[0] for row in rows if row[0] is not None}
+    activity_ids.update({ACTIVITY_ID_TRANSPORT, ACTIVITY_ID_LONG_DISTANCE_TRANSPORT})
+    return sorted(activity_ids)
+
+
+def warm_emission_cache(
+    wiser_client: WiserClient, snapshot_path: str | os.PathLike = EMISSION_SNAPSHOT_PATH
+) -> None:
+    """Load the snapshot, if any, then prefetch referenced activities not cached."""
+    if Path(snapshot_path).exists():
+        try:
+            imported = import_emission_snapshot(snapshot_path, wiser_client)
+            print(f"Loaded {imported} emission factors from {snapshot_path}")
+        except (OSError, ValueError) as exc:
+            print(f"Emission snapshot {snapshot_path} skipped: {exc}")
+
+    disable_warmup = os.getenv("CEIS_DISABLE_EMISSION_WARMUP", "0") == "1"
+    if disable_warmup or "PYTEST_CURRENT_TEST" in os.environ:
+        print("Emission cache warm-up skipped by environment.")
+        return
+
+    try:
+        wiser_client.get_emissions_per_unit(referenced_activity_ids())
+    except WiserClientError as exc:
+        # Warm-up is best-effort; requests fall back to on-demand fetches.
+        print(f"Emission cache warm-up incomplete: {exc}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", nargs="?", default=EMISSION_SNAPSHOT_PATH)
+    args = parser.parse_args(argv)
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        create_tables(cursor)
+        apply_schema_migrations(cursor)
+        conn.commit()
+
+    if args.command == "export":
+        count = export_emission_snapshot(args.path)
+        print(f"Exported {count} emission factors to {args.path}")
+    else:
+        count = import_emission_snapshot(args.path)
+        print(f"Imported {count} emission factors from {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,55 @@
 from contextlib import asynccontextmanager
 from typing import Optional
 
+import anyio
 import uvicorn
-from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 
+from ceis_backend import async_queries
+from ceis_backend.async_queries import async_db
+from ceis_backend.co2_result_cache import co2_result_cache
+from ceis_backend.db_connection import close_all_connections
 from ceis_backend.db_init import init_sqlite_db
-from ceis_backend.config import BACKEND_HOST, BACKEND_PORT
+from ceis_backend.designer_reference_cache import designer_reference_cache
+from ceis_backend.distance_matrix import manufacturer_distance_matrix
+from ceis_backend.config import (
+    BACKEND_HOST,
+    BACKEND_PORT,
+    CO2_BATCH_MAX_ITEMS,
+    SOLD_GARMENT_CO2_BATCH_SIZE,
+    SOLD_GARMENT_CO2_INTERVAL_SECONDS,
+    THREADPOOL_SIZE,
+)
 from ceis_backend.utils import (
     get_co2_for_garment,
+    get_co2_for_garments,
     calculate_transport_emission,
     build_scenario_activities,
     calculate_replacement_fabric_blocks_emissions,
-    refresh_sold_garment_co2_values,
 )
 from ceis_backend.designer_balance import (
-    get_designer_garment_reference_data,
+    get_designer_garment_reference_entry,
     get_designer_balance_options,
     get_designer_balance_scenario,
+    get_designer_material_sweep,
+    get_designer_supplier_combinations,
+)
+from ceis_backend.wiser_bridge import AsyncWiserClient, WiserClient, WiserClientError
+from ceis_backend.activity_dependencies import activity_dependents
+from ceis_backend.activity_catalog import search_activities_async
+from ceis_backend.emission_engine import get_emission_engine
+from ceis_backend.sold_garment_co2 import SoldGarmentCo2Runner
+from ceis_backend.second_life_allocator import second_life_allocator
+from ceis_backend.emission_snapshot import (
+    SnapshotVersionError,
+    build_emission_snapshot,
+    load_emission_snapshot,
+    warm_emission_cache,
 )
-from ceis_backend.wiser_bridge import WiserClient, WiserClientError
 from ceis_backend.queries import (
     db_create_garment_type,
-    db_get_garment_types,
-    db_get_locations,
     db_get_materials,
-    db_get_strategy_progress,
     db_get_materials_for_garment,
     db_get_recipe_fabric_blocks,
     db_upsert_material,
@@ -36,9 +61,6 @@ from ceis_backend.queries import (
     db_get_process_types,
     db_delete_process_type,
     db_create_garment_recipe,
-    db_create_fabric_block,
-    db_get_fabric_blocks,
-    db_delete_fabric_block,
     get_full_garment_recipe,
 )
 from ceis_backend.data.location_details import (
@@ -49,6 +71,8 @@ from ceis_backend.models import (
     FabricBlockInventoryCreate,
     FabricBlockTypeCreate,
     ActivitySearchRequest,
+    Co2BatchRequest,
+    EmissionSnapshot,
     GarmentRecipeCreate,
     GarmentTypeCreate,
     MaterialCreate,
@@ -59,9 +83,22 @@ from ceis_backend.models import (
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle startup and shutdown events."""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
     init_sqlite_db()
     app.state.wiser_client = WiserClient()
+    warm_emission_cache(app.state.wiser_client)
+    app.state.wiser_client.start_background_refresh()
+    app.state.sold_garment_co2_runner = SoldGarmentCo2Runner(
+        lambda: app.state.wiser_client,
+        interval_seconds=SOLD_GARMENT_CO2_INTERVAL_SECONDS,
+        batch_size=SOLD_GARMENT_CO2_BATCH_SIZE,
+    )
+    app.state.sold_garment_co2_runner.start()
     yield
+    app.state.sold_garment_co2_runner.stop()
+    app.state.wiser_client.close()
+    async_db.close()
+    close_all_connections()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -71,6 +108,14 @@ def get_wiser_client(request: Request) -> WiserClient:
     return request.app.state.wiser_client
 
 
+def get_async_wiser_client(request: Request) -> AsyncWiserClient:
+    return AsyncWiserClient(request.app.state.wiser_client)
+
+
+def get_sold_garment_co2_runner(request: Request) -> SoldGarmentCo2Runner | None:
+    return getattr(request.app.state, "sold_garment_co2_runner", None)
+
+
 def _raise_wiser_http_exception(error: WiserClientError) -> None:
     raise HTTPException(status_code=502, detail=str(error)) from error
 
@@ -86,26 +131,34 @@ def create_garment_type(payload: GarmentTypeCreate):
 
 
 @app.get("/garment-types")
-def get_garment_types():
-    return db_get_garment_types()
+async def get_garment_types():
+    return await async_queries.db_get_garment_types()
 
 
 @app.get("/locations")
-def get_locations():
-    return db_get_locations()
+async def get_locations():
+    return await async_queries.db_get_locations()
 
 
 @app.get("/materials")
-def get_materials():
-    return db_get_materials()
+async def get_materials():
+    return await async_queries.db_get_materials()
 
 
 @app.get("/strategy-progress")
-def get_strategy_progress(
-    wiser_client: WiserClient = Depends(get_wiser_client),
+async def get_strategy_progress(
+    runner: SoldGarmentCo2Runner | None = Depends(get_sold_garment_co2_runner),
 ):
-    refresh_sold_garment_co2_values(wiser_client)
-    return db_get_strategy_progress()
+    progress = await async_queries.db_get_strategy_progress()
+    pending = progress["aggregates"]["co2_pending_garments"]
+    if pending and runner is not None:
+        runner.trigger()
+    progress["co2_refresh"] = {
+        "pending_garments": pending,
+        "status": f"{pending} garments pending",
+        **(runner.stats() if runner is not None else {}),
+    }
+    return progress
 
 
 @app.get("/garment-types/{garment_type_id}/materials")
@@ -118,11 +171,26 @@ def get_designer_balance_page_options():
     return get_designer_balance_options()
 
 
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(
+        candidate.removeprefix("W/") == etag for candidate in candidates
+    )
+
+
 @app.get("/designer-garment/reference")
 def get_designer_garment_reference(
+    request: Request,
     wiser_client: WiserClient = Depends(get_wiser_client),
 ):
-    return get_designer_garment_reference_data(wiser_client)
+    """Reference data of the garment designer, with an ETag of its version."""
+    reference = get_designer_garment_reference_entry(wiser_client)
+    headers = {"ETag": reference.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), reference.etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(reference.dataset.payload, headers=headers)
 
 
 @app.get("/designer-balance/{garment_type_id}")
@@ -144,6 +212,39 @@ def get_designer_balance(
     )
 
 
+@app.get("/designer-balance/{garment_type_id}/supplier-combinations")
+def get_designer_balance_supplier_combinations(
+    garment_type_id: int,
+    material_id: int | None = None,
+    top_k: int = Query(5, ge=1, le=50),
+    wiser_client: WiserClient = Depends(get_wiser_client),
+):
+    """Pareto front and top-k supplier combinations for cost, CO2 and delay."""
+    return get_designer_supplier_combinations(
+        garment_type_id, wiser_client, material_id=material_id, top_k=top_k
+    )
+
+
+@app.get("/designer-balance/{garment_type_id}/material-sweep")
+def get_designer_balance_material_sweep(
+    garment_type_id: int,
+    material_id: list[int] | None = Query(default=None),
+    fabric_supplier: str | None = None,
+    garment_supplier: str | None = None,
+    finishing_supplier: str | None = None,
+    wiser_client: WiserClient = Depends(get_wiser_client),
+):
+    """Designer balance of every material of a garment, or the given ones, side by side."""
+    return get_designer_material_sweep(
+        garment_type_id,
+        wiser_client,
+        material_ids=material_id,
+        fabric_supplier_name=fabric_supplier,
+        garment_supplier_name=garment_supplier,
+        finishing_supplier_name=finishing_supplier,
+    )
+
+
 @app.get("/garment-types/{garment_type_id}/fabric-blocks")
 def get_recipe_fabric_blocks_for_garment(garment_type_id: int):
     return db_get_recipe_fabric_blocks(garment_type_id)
@@ -171,32 +272,44 @@ def create_process_type(payload: ProcessTypeCreate):
     return db_create_process_type(payload.name, payload.unit, payload.activity_id)
 
 
+@app.get("/emission-snapshot")
+def get_emission_snapshot():
+    return build_emission_snapshot()
+
+
+@app.post("/emission-snapshot")
+def import_emission_snapshot(
+    snapshot: EmissionSnapshot,
+    wiser_client: WiserClient = Depends(get_wiser_client),
+):
+    try:
+        imported = load_emission_snapshot(snapshot.model_dump(), wiser_client)
+    except SnapshotVersionError as error:
+        raise HTTPException(status_code=409, detail=str(error)) from error
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error)) from error
+    return {"imported": imported}
+
+
+@app.get("/activities/{activity_id}/dependents")
+def get_activity_dependents(activity_id: int):
+    """Materials, processes, block types, garments and sold garments using it."""
+    return activity_dependents([activity_id])[activity_id]
+
+
 @app.post("/activity-search")
-def activity_search(
+async def activity_search(
     payload: ActivitySearchRequest,
-    wiser_client: WiserClient = Depends(get_wiser_client),
+    wiser_client: AsyncWiserClient = Depends(get_async_wiser_client),
 ):
     if not payload.query:
         raise HTTPException(status_code=400, detail="Query is required")
 
-    search_results: list[dict] = []
     try:
-        search_results = wiser_client.search_activities(payload.query)
+        results = await search_activities_async(wiser_client, payload.query)
     except WiserClientError as error:
         _raise_wiser_http_exception(error)
 
-    results = []
-    for item in search_results:
-        location = item.get("location", {}) or {}
-        results.append(
-            {
-                "id": item.get("id"),
-                "location": location.get("code"),
-                "name": item.get("name"),
-                "reference_product": item.get("reference_product"),
-            }
-        )
-
     return {"results": results}
 
 
@@ -233,7 +346,7 @@ def create_garment_recipe(payload: GarmentRecipeCreate):
 @app.post("/fabric-blocks")
 async def create_fabric_block(fabric_block: FabricBlockInventoryCreate):
     print("Received fabric block:", fabric_block)
-    return db_create_fabric_block(
+    return await async_queries.db_create_fabric_block(
         fabric_block.type_id,
         fabric_block.location_id,
         fabric_block.material_id,
@@ -243,13 +356,29 @@ async def create_fabric_block(fabric_block: FabricBlockInventoryCreate):
 
 
 @app.get("/fabric-blocks")
-def get_fabric_blocks(type: Optional[str] = None):
-    return db_get_fabric_blocks(type)
+async def get_fabric_blocks(
+    type: Optional[str] = None,
+    material_id: Optional[int] = None,
+    location_id: Optional[int] = None,
+    min_quality: Optional[float] = None,
+    max_quality: Optional[float] = None,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+):
+    return await async_queries.db_get_fabric_blocks(
+        type,
+        material_id=material_id,
+        location_id=location_id,
+        min_quality=min_quality,
+        max_quality=max_quality,
+        after_id=after_id,
+        limit=limit,
+    )
 
 
 @app.delete("/fabric-blocks/{fabric_block_id}")
-def delete_fabric_block(fabric_block_id: int):
-    return db_delete_fabric_block(fabric_block_id)
+async def delete_fabric_block(fabric_block_id: int):
+    return await async_queries.db_delete_fabric_block(fabric_block_id)
 
 
 @app.get("/scenarios")
@@ -259,7 +388,7 @@ def get_co2_scenarios(
     garment_type_id = 18  # Basic Crop Top
     replacements = ["64x40"]
     # use hemp as the material for now
-    materials = get_materials()
+    materials = db_get_materials()
     hemp_material = next((m for m in materials if m["name"].lower() == "hemp"), None)
     if not hemp_material:
         raise HTTPException(status_code=500, detail="Hemp material not found")
@@ -400,6 +529,83 @@ def get_co2_scenarios(
         _raise_wiser_http_exception(error)
 
 
+def _garment_emission_totals(wiser_client: WiserClient) -> list[dict]:
+    engine = get_emission_engine()
+    factors, _ = engine.resolve_factors(wiser_client)
+    return engine.garment_totals(factors)
+
+
+@app.get("/cache-stats")
+def get_cache_stats(wiser_client: WiserClient = Depends(get_wiser_client)):
+    """Hit ratios and invalidation counts of the CO2 and emission caches."""
+    return {
+        "co2_results": co2_result_cache.stats(),
+        "emission_factors": wiser_client.emission_cache_stats(),
+        "second_life_blocks": second_life_allocator.stats(),
+        "manufacturer_distances": manufacturer_distance_matrix.stats(),
+        "designer_reference": designer_reference_cache.stats(),
+    }
+
+
+@app.get("/co2/leaderboard")
+def get_co2_leaderboard(
+    limit: Optional[int] = None,
+    wiser_client: WiserClient = Depends(get_wiser_client),
+):
+    """Every garment type x recipe material pair, lowest total CO2 first."""
+    if limit is not None and limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    try:
+        totals = _garment_emission_totals(wiser_client)
+    except WiserClientError as error:
+        _raise_wiser_http_exception(error)
+    totals.sort(key=lambda row: row["total_emission"])
+    return totals[:limit]
+
+
+@app.get("/co2/{garment_type_id}/totals")
+def get_co2_totals_for_garment(
+    garment_type_id: int,
+    wiser_client: WiserClient = Depends(get_wiser_client),
+):
+    """Total and per-category CO2 of a garment type for each recipe material."""
+    try:
+        totals = _garment_emission_totals(wiser_client)
+    except WiserClientError as error:
+        _raise_wiser_http_exception(error)
+    garment_totals = [
+        row for row in totals if row["garment_type_id"] == garment_type_id
+    ]
+    if not garment_totals:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Garment recipe not found for garment type ID: {garment_type_id}",
+        )
+    return garment_totals
+
+
+@app.post("/co2/batch")
+def get_co2_batch(
+    payload: Co2BatchRequest,
+    wiser_client: WiserClient = Depends(get_wiser_client),
+):
+    """CO2 of many garment type x material pairs, with an error per failed pair."""
+    if not payload.items:
+        raise HTTPException(status_code=400, detail="items must not be empty")
+    if len(payload.items) > CO2_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {CO2_BATCH_MAX_ITEMS} items are allowed per request",
+        )
+    try:
+        return get_co2_for_garments(
+            [(item.garment_type_id, item.material_id) for item in payload.items],
+            wiser_client,
+        )
+    except WiserClientError as error:
+        _raise_wiser_http_exception(error)
+
+
 @app.get("/co2/{garment_type_id}")
 def get_co2_for_garment_endpoint(
     garment_type_id: int,
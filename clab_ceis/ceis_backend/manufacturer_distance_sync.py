@@ -12,7 +12,10 @@ import time
 from dataclasses import dataclass
 from pathlib import Path
 
+from ceis_backend.co2_result_cache import co2_result_cache
 from ceis_backend.config import BASE_DIR, DB_PATH
+from ceis_backend.designer_reference_cache import designer_reference_cache
+from ceis_backend.distance_matrix import manufacturer_distance_matrix
 
 CSV_PATH = BASE_DIR / "data" / "Lake Constance Region Manufacturers.csv"
 SYNC_HASH_KEY = "lake_constance_manufacturers_csv_sha256"
@@ -357,6 +360,9 @@ def sync_manufacturer_distances_if_changed() -> dict:
     if expected_pairs > 0 and not distance_rows:
         conn.commit()
         conn.close()
+        co2_result_cache.invalidate("manufacturer_distances")
+        manufacturer_distance_matrix.reload(DB_PATH)
+        designer_reference_cache.invalidate_catalog()
         return {
             "updated": False,
             "reason": "distance_resolution_failed",
@@ -397,6 +403,9 @@ def sync_manufacturer_distances_if_changed() -> dict:
     )
     conn.commit()
     conn.close()
+    co2_result_cache.invalidate("manufacturer_distances")
+    manufacturer_distance_matrix.reload(DB_PATH)
+    designer_reference_cache.invalidate_catalog()
 
     return {
         "updated": True,
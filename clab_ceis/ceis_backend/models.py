@@ -69,6 +69,16 @@ class GarmentRecipe(BaseModel):
     processes: list[Process]
 
 
+class RecipeFabricBlock(BaseModel):
+    fabric_block: FabricBlock
+    quantity: int
+
+
+class CompiledGarmentRecipe(BaseModel):
+    fabric_blocks: list[RecipeFabricBlock]
+    processes: list[Process]
+
+
 class GarmentTypeCreate(BaseModel):
     name: str
     price_chf: float
@@ -120,3 +130,19 @@ class GarmentRecipeCreate(BaseModel):
 
 class ActivitySearchRequest(BaseModel):
     query: str
+
+
+class Co2BatchItem(BaseModel):
+    garment_type_id: int
+    material_id: int
+
+
+class Co2BatchRequest(BaseModel):
+    items: list[Co2BatchItem]
+
+
+class EmissionSnapshot(BaseModel):
+    format_version: int
+    ecoinvent_version: str
+    exported_at: float
+    emissions: list[tuple[int, Optional[float], float]]
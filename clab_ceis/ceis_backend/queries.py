@@ -4,78 +4,72 @@ import sqlite3
 
 from fastapi import HTTPException
 
-from ceis_backend.config import DB_PATH
+from ceis_backend.co2_result_cache import co2_result_cache
+from ceis_backend.db_connection import get_connection
+from ceis_backend.designer_reference_cache import designer_reference_cache
 from ceis_backend.models import (
+    CompiledGarmentRecipe,
     FabricBlock,
     FabricBlockType,
-    SecondLifeFabricBlock,
     GarmentRecipe,
     Process,
+    RecipeFabricBlock,
 )
+from ceis_backend.second_life_allocator import second_life_allocator
 
 STRATEGIST_CIRCULARITY_THRESHOLD = 30.0
 
 
 def db_create_garment_type(name: str, price_chf: float) -> dict:
     """Create a new garment type in the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    try:
-        if price_chf <= 0:
-            raise HTTPException(
-                status_code=400, detail="price_chf must be greater than 0"
-            )
+    if price_chf <= 0:
+        raise HTTPException(status_code=400, detail="price_chf must be greater than 0")
 
-        cursor.execute(
-            "INSERT INTO garment_types (name, price_chf) VALUES (?, ?)",
-            (name, price_chf),
-        )
-        cursor.execute(
-            "SELECT id, name, price_chf FROM garment_types WHERE id = ?",
-            (cursor.lastrowid,),
-        )
-        created = cursor.fetchone()
-        conn.commit()
-        return {
-            "id": created[0],
-            "name": created[1],
-            "price_chf": float(price_chf),
-        }
-    except sqlite3.IntegrityError:
-        raise HTTPException(status_code=409, detail="Garment type already exists")
-    finally:
-        conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "INSERT INTO garment_types (name, price_chf) VALUES (?, ?)",
+                (name, price_chf),
+            )
+            cursor.execute(
+                "SELECT id, name, price_chf FROM garment_types WHERE id = ?",
+                (cursor.lastrowid,),
+            )
+            created = cursor.fetchone()
+            conn.commit()
+        except sqlite3.IntegrityError:
+            raise HTTPException(status_code=409, detail="Garment type already exists")
+    designer_reference_cache.invalidate("garment_types", [created[0]])
+    return {
+        "id": created[0],
+        "name": created[1],
+        "price_chf": float(price_chf),
+    }
 
 
 def db_get_garment_types() -> list[dict]:
     """Get all garment types from the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name, price_chf FROM garment_types")
-    garment_types = cursor.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        garment_types = conn.execute(
+            "SELECT id, name, price_chf FROM garment_types"
+        ).fetchall()
     return [{"id": gt[0], "name": gt[1], "price_chf": gt[2]} for gt in garment_types]
 
 
 def db_get_locations() -> list[dict]:
     """Get all locations from the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name FROM locations")
-    locations = cursor.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        locations = conn.execute("SELECT id, name FROM locations").fetchall()
     return [{"id": loc[0], "name": loc[1]} for loc in locations]
 
 
 def db_get_materials() -> list[dict]:
     """Get all materials from the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT id, name, kg_per_sqm, activity_id FROM materials ORDER BY name"
-    )
-    materials = cursor.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        materials = conn.execute(
+            "SELECT id, name, kg_per_sqm, activity_id FROM materials ORDER BY name"
+        ).fetchall()
     return [
         {
             "id": row[0],
@@ -89,52 +83,52 @@ def db_get_materials() -> list[dict]:
 
 def db_get_strategy_progress() -> dict:
     """Aggregate strategist-facing progress metrics from sold garments."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-        WITH sold_garments AS (
-            SELECT gi.id, gi.type_id, gi.co2eq
-            FROM garments_inventory gi
-            WHERE gi.sold = 1
-        ),
-        total_recipe AS (
-            SELECT sg.id AS garment_id,
-                   COALESCE(SUM(fbt.sqm * grfb.amount), 0) AS total_recipe_sqm,
-                   COALESCE(SUM(grfb.amount), 0) AS total_recipe_blocks
-            FROM sold_garments sg
-            LEFT JOIN garment_recipe_fabric_blocks grfb
-                ON grfb.garment_type = sg.type_id
-            LEFT JOIN fabric_block_types fbt
-                ON fbt.id = grfb.fabric_block_id
-            GROUP BY sg.id
-        ),
-        second_life AS (
-            SELECT sg.id AS garment_id,
-                   COALESCE(COUNT(fbi.id), 0) AS second_life_blocks,
-                   COALESCE(SUM(fbt.sqm), 0) AS second_life_sqm
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            WITH sold_garments AS (
+                SELECT gi.id, gi.type_id, gi.co2eq, gi.co2_stale
+                FROM garments_inventory gi
+                WHERE gi.sold = 1
+            ),
+            total_recipe AS (
+                SELECT sg.id AS garment_id,
+                       COALESCE(SUM(fbt.sqm * grfb.amount), 0) AS total_recipe_sqm,
+                       COALESCE(SUM(grfb.amount), 0) AS total_recipe_blocks
+                FROM sold_garments sg
+                LEFT JOIN garment_recipe_fabric_blocks grfb
+                    ON grfb.garment_type = sg.type_id
+                LEFT JOIN fabric_block_types fbt
+                    ON fbt.id = grfb.fabric_block_id
+                GROUP BY sg.id
+            ),
+            second_life AS (
+                SELECT sg.id AS garment_id,
+                       COALESCE(COUNT(fbi.id), 0) AS second_life_blocks,
+                       COALESCE(SUM(fbt.sqm), 0) AS second_life_sqm
+                FROM sold_garments sg
+                LEFT JOIN fabric_blocks_inventory fbi
+                    ON fbi.garment_id = sg.id
+                   AND fbi.second_life = 1
+                LEFT JOIN fabric_block_types fbt
+                    ON fbt.id = fbi.type_id
+                GROUP BY sg.id
+            )
+            SELECT sg.id,
+                   gt.name,
+                   sg.co2eq,
+                   sg.co2_stale,
+                   tr.total_recipe_blocks,
+                   sl.second_life_blocks,
+                   tr.total_recipe_sqm,
+                   sl.second_life_sqm
             FROM sold_garments sg
-            LEFT JOIN fabric_blocks_inventory fbi
-                ON fbi.garment_id = sg.id
-               AND fbi.second_life = 1
-            LEFT JOIN fabric_block_types fbt
-                ON fbt.id = fbi.type_id
-            GROUP BY sg.id
-        )
-        SELECT sg.id,
-               gt.name,
-               sg.co2eq,
-               tr.total_recipe_blocks,
-               sl.second_life_blocks,
-               tr.total_recipe_sqm,
-               sl.second_life_sqm
-        FROM sold_garments sg
-        JOIN garment_types gt ON gt.id = sg.type_id
-        LEFT JOIN total_recipe tr ON tr.garment_id = sg.id
-        LEFT JOIN second_life sl ON sl.garment_id = sg.id
-        ORDER BY sg.id
-        """)
-    sold_garment_rows = cursor.fetchall()
-    conn.close()
+            JOIN garment_types gt ON gt.id = sg.type_id
+            LEFT JOIN total_recipe tr ON tr.garment_id = sg.id
+            LEFT JOIN second_life sl ON sl.garment_id = sg.id
+            ORDER BY sg.id
+            """)
+        sold_garment_rows = cursor.fetchall()
 
     sold_garments = []
     total_recipe_blocks = 0
@@ -142,12 +136,14 @@ def db_get_strategy_progress() -> dict:
     total_recipe_sqm = 0.0
     total_second_life_sqm = 0.0
     total_co2 = 0.0
+    co2_pending_garments = 0
 
     for row in sold_garment_rows:
         (
             garment_id,
             garment_name,
             co2eq,
+            co2_stale,
             recipe_blocks,
             second_life_blocks,
             recipe_sqm,
@@ -157,6 +153,8 @@ def db_get_strategy_progress() -> dict:
         second_life_blocks = int(second_life_blocks or 0)
         recipe_sqm = float(recipe_sqm or 0)
         second_life_sqm = float(second_life_sqm or 0)
+        if co2eq is None or co2_stale:
+            co2_pending_garments += 1
         co2eq = float(co2eq or 0)
 
         total_recipe_blocks += recipe_blocks
@@ -210,35 +208,77 @@ def db_get_strategy_progress() -> dict:
             "environmental_cost_co2eq": round(total_co2, 2),
             "second_life_fabric_blocks_sold": total_second_life_blocks,
             "recipe_fabric_blocks_sold": total_recipe_blocks,
+            # Sold garments whose CO2 the background job has not (re)computed yet.
+            "co2_pending_garments": co2_pending_garments,
         },
         "sold_garments": sold_garments,
     }
 
 
-def db_get_sold_garments_for_co2() -> list[dict]:
-    """Return sold garments that are still missing persisted CO2 values."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT gi.id, gi.type_id, gt.name
-        FROM garments_inventory gi
-        JOIN garment_types gt ON gt.id = gi.type_id
-        WHERE gi.sold = 1
-          AND gi.co2eq IS NULL
-        ORDER BY gi.id
-        """)
-    rows = cursor.fetchall()
-    conn.close()
-    return [{"id": row[0], "type_id": row[1], "name": row[2]} for row in rows]
+def db_get_sold_garments_for_co2(
+    *, after_id: int | None = None, limit: int | None = None
+) -> list[dict]:
+    """Return sold garments whose CO2 value is missing or stale.
+
+    ``after_id`` and ``limit`` page through them by garment ID.
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT gi.id, gi.type_id, gt.name, gi.co2_stale
+            FROM garments_inventory gi
+            JOIN garment_types gt ON gt.id = gi.type_id
+            WHERE gi.sold = 1
+              AND (gi.co2eq IS NULL OR gi.co2_stale > 0)
+              AND (:after_id IS NULL OR gi.id > :after_id)
+            ORDER BY gi.id
+            LIMIT :limit
+            """,
+            {"after_id": after_id, "limit": -1 if limit is None else limit},
+        )
+        rows = cursor.fetchall()
+    return [
+        {"id": row[0], "type_id": row[1], "name": row[2], "co2_stale": row[3]}
+        for row in rows
+    ]
+
+
+def _load_inventory_fabric_blocks(
+    cursor: sqlite3.Cursor, garment_ids: list[int]
+) -> dict[int, list[dict]]:
+    """Fabric blocks linked to the given garments, with their processes.
 
+    Two queries regardless of the number of garments and blocks.
+    """
+    fabric_blocks_by_garment: dict[int, list[dict]] = {
+        garment_id: [] for garment_id in garment_ids
+    }
+    if not garment_ids:
+        return fabric_blocks_by_garment
+
+    placeholders = ", ".join("?" for _ in garment_ids)
+    cursor.execute(
+        f"""
+        SELECT pfbi.fabric_block_id, pt.name, pfbi.amount, pt.activity_id
+        FROM processes_fabric_blocks_inventory pfbi
+        JOIN fabric_blocks_inventory fbi ON fbi.id = pfbi.fabric_block_id
+        JOIN process_types pt ON pt.id = pfbi.process_id
+        WHERE fbi.garment_id IN ({placeholders})
+        ORDER BY pfbi.id
+        """,
+        garment_ids,
+    )
+    processes_by_block: dict[int, list[Process]] = {}
+    for block_id, process_name, amount, activity_id in cursor.fetchall():
+        processes_by_block.setdefault(block_id, []).append(
+            Process(name=process_name, amount=amount, activity_id=activity_id)
+        )
 
-def db_get_inventory_fabric_blocks_for_garment(garment_id: int) -> list[dict]:
-    """Return actual fabric blocks linked to a garment inventory record."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
     cursor.execute(
-        """
-        SELECT fbi.id,
+        f"""
+        SELECT fbi.garment_id,
+               fbi.id,
                fbt.id,
                fbt.name,
                fbt.sqm,
@@ -254,16 +294,14 @@ def db_get_inventory_fabric_blocks_for_garment(garment_id: int) -> list[dict]:
         JOIN fabric_block_types fbt ON fbt.id = fbi.type_id
         LEFT JOIN locations l ON l.id = fbi.location_id
         LEFT JOIN materials m ON m.id = fbi.material_id
-        WHERE fbi.garment_id = ?
+        WHERE fbi.garment_id IN ({placeholders})
         ORDER BY fbi.id
         """,
-        (garment_id,),
+        garment_ids,
     )
-    rows = cursor.fetchall()
-
-    fabric_blocks = []
-    for row in rows:
+    for row in cursor.fetchall():
         (
+            garment_id,
             inventory_id,
             type_id,
             type_name,
@@ -277,24 +315,7 @@ def db_get_inventory_fabric_blocks_for_garment(garment_id: int) -> list[dict]:
             kg_per_sqm,
             activity_id,
         ) = row
-
-        cursor.execute(
-            """
-            SELECT pt.name, pfbi.amount, pt.activity_id
-            FROM processes_fabric_blocks_inventory pfbi
-            JOIN process_types pt ON pt.id = pfbi.process_id
-            WHERE pfbi.fabric_block_id = ?
-            ORDER BY pfbi.id
-            """,
-            (inventory_id,),
-        )
-        process_rows = cursor.fetchall()
-        processes = [
-            Process(name=process_name, amount=amount, activity_id=process_activity_id)
-            for process_name, amount, process_activity_id in process_rows
-        ]
-
-        fabric_blocks.append(
+        fabric_blocks_by_garment[garment_id].append(
             {
                 "inventory_id": inventory_id,
                 "type_id": type_id,
@@ -308,30 +329,129 @@ def db_get_inventory_fabric_blocks_for_garment(garment_id: int) -> list[dict]:
                 "material_name": material_name,
                 "kg_per_sqm": float(kg_per_sqm or 0),
                 "activity_id": activity_id,
-                "processes": processes,
+                "processes": processes_by_block.get(inventory_id, []),
             }
         )
+    return fabric_blocks_by_garment
 
-    conn.close()
-    return fabric_blocks
+
+def db_get_inventory_fabric_blocks_for_garment(garment_id: int) -> list[dict]:
+    """Return actual fabric blocks linked to a garment inventory record."""
+    with get_connection() as conn:
+        return _load_inventory_fabric_blocks(conn.cursor(), [garment_id])[garment_id]
+
+
+def db_get_sold_garment_co2_inputs(garments: list[dict]) -> dict[int, dict]:
+    """Load everything the CO2 of the given sold garments is computed from.
+
+    ``garments`` are ``{"id", "type_id"}`` dicts as returned by
+    ``db_get_sold_garments_for_co2``. Returns, per garment ID, its linked
+    fabric blocks (each with the ``recipe_processes`` of its block type),
+    the recipe processes of its garment type and its own inventory
+    processes, in a fixed number of grouped queries.
+    """
+    garment_ids = [garment["id"] for garment in garments]
+    type_ids = list({garment["type_id"] for garment in garments})
+    if not garment_ids:
+        return {}
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        fabric_blocks_by_garment = _load_inventory_fabric_blocks(cursor, garment_ids)
+
+        block_type_ids = list(
+            {
+                block["type_id"]
+                for blocks in fabric_blocks_by_garment.values()
+                for block in blocks
+            }
+        )
+        recipe_processes_by_block_type: dict[int, list[Process]] = {}
+        if block_type_ids:
+            placeholders = ", ".join("?" for _ in block_type_ids)
+            cursor.execute(
+                f"""
+                SELECT fbrp.fabric_block_type, pt.name, fbrp.amount, pt.activity_id
+                FROM fabric_block_recipe_processes fbrp
+                JOIN process_types pt ON fbrp.process_id = pt.id
+                WHERE fbrp.fabric_block_type IN ({placeholders})
+                ORDER BY fbrp.id
+                """,
+                block_type_ids,
+            )
+            for type_id, process_name, amount, activity_id in cursor.fetchall():
+                recipe_processes_by_block_type.setdefault(type_id, []).append(
+                    Process(name=process_name, amount=amount, activity_id=activity_id)
+                )
+
+        placeholders = ", ".join("?" for _ in type_ids)
+        cursor.execute(
+            f"""
+            SELECT grp.garment_type, pt.name, grp.amount, pt.activity_id
+            FROM garment_recipe_processes grp
+            JOIN process_types pt ON pt.id = grp.process_id
+            WHERE grp.garment_type IN ({placeholders})
+            ORDER BY grp.id
+            """,
+            type_ids,
+        )
+        recipe_processes_by_garment_type: dict[int, list[Process]] = {}
+        for type_id, process_name, amount, activity_id in cursor.fetchall():
+            recipe_processes_by_garment_type.setdefault(type_id, []).append(
+                Process(name=process_name, amount=amount, activity_id=activity_id)
+            )
+
+        placeholders = ", ".join("?" for _ in garment_ids)
+        cursor.execute(
+            f"""
+            SELECT pgi.garment_id, pt.name, pgi.amount, pt.activity_id
+            FROM processes_garments_inventory pgi
+            JOIN process_types pt ON pt.id = pgi.process_id
+            WHERE pgi.garment_id IN ({placeholders})
+            ORDER BY pgi.id
+            """,
+            garment_ids,
+        )
+        inventory_processes_by_garment: dict[int, list[Process]] = {}
+        for garment_id, process_name, amount, activity_id in cursor.fetchall():
+            inventory_processes_by_garment.setdefault(garment_id, []).append(
+                Process(name=process_name, amount=amount, activity_id=activity_id)
+            )
+
+    for blocks in fabric_blocks_by_garment.values():
+        for block in blocks:
+            block["recipe_processes"] = recipe_processes_by_block_type.get(
+                block["type_id"], []
+            )
+    return {
+        garment["id"]: {
+            "fabric_blocks": fabric_blocks_by_garment[garment["id"]],
+            "recipe_processes": recipe_processes_by_garment_type.get(
+                garment["type_id"], []
+            ),
+            "inventory_processes": inventory_processes_by_garment.get(
+                garment["id"], []
+            ),
+        }
+        for garment in garments
+    }
 
 
 def db_get_garment_processes(garment_type_id: int) -> list[Process]:
     """Return recipe-level assembly processes for a garment type."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT pt.name, grp.amount, pt.activity_id
-        FROM garment_recipe_processes grp
-        JOIN process_types pt ON pt.id = grp.process_id
-        WHERE grp.garment_type = ?
-        ORDER BY grp.id
-        """,
-        (garment_type_id,),
-    )
-    rows = cursor.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT pt.name, grp.amount, pt.activity_id
+            FROM garment_recipe_processes grp
+            JOIN process_types pt ON pt.id = grp.process_id
+            WHERE grp.garment_type = ?
+            ORDER BY grp.id
+            """,
+            (garment_type_id,),
+        )
+        rows = cursor.fetchall()
     return [
         Process(name=process_name, amount=amount, activity_id=activity_id)
         for process_name, amount, activity_id in rows
@@ -340,20 +460,19 @@ def db_get_garment_processes(garment_type_id: int) -> list[Process]:
 
 def db_get_garment_inventory_processes(garment_id: int) -> list[Process]:
     """Return garment-inventory-specific processes for a garment record."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT pt.name, pgi.amount, pt.activity_id
-        FROM processes_garments_inventory pgi
-        JOIN process_types pt ON pt.id = pgi.process_id
-        WHERE pgi.garment_id = ?
-        ORDER BY pgi.id
-        """,
-        (garment_id,),
-    )
-    rows = cursor.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT pt.name, pgi.amount, pt.activity_id
+            FROM processes_garments_inventory pgi
+            JOIN process_types pt ON pt.id = pgi.process_id
+            WHERE pgi.garment_id = ?
+            ORDER BY pgi.id
+            """,
+            (garment_id,),
+        )
+        rows = cursor.fetchall()
     return [
         Process(name=process_name, amount=amount, activity_id=activity_id)
         for process_name, amount, activity_id in rows
@@ -362,32 +481,57 @@ def db_get_garment_inventory_processes(garment_id: int) -> list[Process]:
 
 def db_update_garment_inventory_co2(garment_id: int, co2eq: float) -> None:
     """Persist the computed CO2 value for a garment inventory record."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE garments_inventory SET co2eq = ? WHERE id = ?",
-        (round(co2eq, 6), garment_id),
-    )
-    conn.commit()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE garments_inventory SET co2eq = ? WHERE id = ?",
+            (round(co2eq, 6), garment_id),
+        )
+        conn.commit()
+
+
+def db_update_garments_inventory_co2(
+    co2eq_by_garment: dict[int, float],
+    stale_by_garment: dict[int, int] | None = None,
+) -> None:
+    """Persist computed CO2 values for many garment inventory records at once.
+
+    ``stale_by_garment`` holds the ``co2_stale`` counter each value was
+    computed at; a garment marked stale again since then keeps its flag, and
+    is recomputed on the next run.
+    """
+    stale_by_garment = stale_by_garment or {}
+    with get_connection() as conn:
+        conn.executemany(
+            """
+            UPDATE garments_inventory
+            SET co2eq = ?,
+                co2_stale = co2_stale - ?
+            WHERE id = ?
+            """,
+            [
+                (round(co2eq, 6), stale_by_garment.get(garment_id, 0), garment_id)
+                for garment_id, co2eq in co2eq_by_garment.items()
+            ],
+        )
+        conn.commit()
 
 
 def db_get_materials_for_garment(garment_type_id: int) -> list[dict]:
     """Get materials associated with a specific garment recipe."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT m.id, m.name, m.kg_per_sqm, m.activity_id
-        FROM garment_recipe_materials grm
-        JOIN materials m ON m.id = grm.material_id
-        WHERE grm.garment_type = ?
-        ORDER BY grm.id
-        """,
-        (garment_type_id,),
-    )
-    materials = cursor.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT m.id, m.name, m.kg_per_sqm, m.activity_id
+            FROM garment_recipe_materials grm
+            JOIN materials m ON m.id = grm.material_id
+            WHERE grm.garment_type = ?
+            ORDER BY grm.id
+            """,
+            (garment_type_id,),
+        )
+        materials = cursor.fetchall()
     return [
         {
             "id": row[0],
@@ -401,20 +545,19 @@ def db_get_materials_for_garment(garment_type_id: int) -> list[dict]:
 
 def db_get_recipe_fabric_blocks(garment_type_id: int) -> list[dict]:
     """Get fabric blocks associated with a specific garment recipe."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT ft.id, ft.name, grfb.amount
-        FROM garment_recipe_fabric_blocks grfb
-        JOIN fabric_block_types ft ON ft.id = grfb.fabric_block_id
-        WHERE grfb.garment_type = ?
-        ORDER BY grfb.id
-        """,
-        (garment_type_id,),
-    )
-    fabric_blocks = cursor.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT ft.id, ft.name, grfb.amount
+            FROM garment_recipe_fabric_blocks grfb
+            JOIN fabric_block_types ft ON ft.id = grfb.fabric_block_id
+            WHERE grfb.garment_type = ?
+            ORDER BY grfb.id
+            """,
+            (garment_type_id,),
+        )
+        fabric_blocks = cursor.fetchall()
     return [
         {
             "fabric_block_id": row[0],
@@ -437,9 +580,8 @@ def db_upsert_material(name: str, kg_per_sqm: float, activity_id: int) -> dict:
             status_code=400, detail="activity_id must be greater than 0"
         )
 
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    try:
+    with get_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute("SELECT id FROM materials WHERE name = ?", (normalized_name,))
         existing = cursor.fetchone()
         action = "updated" if existing else "created"
@@ -460,6 +602,9 @@ def db_upsert_material(name: str, kg_per_sqm: float, activity_id: int) -> dict:
         )
         row = cursor.fetchone()
         conn.commit()
+        if existing:
+            co2_result_cache.invalidate("materials", [row[0]])
+        designer_reference_cache.invalidate("materials", [row[0]])
         return {
             "id": row[0],
             "name": row[1],
@@ -467,15 +612,12 @@ def db_upsert_material(name: str, kg_per_sqm: float, activity_id: int) -> dict:
             "activity_id": row[3],
             "action": action,
         }
-    finally:
-        conn.close()
 
 
 def db_delete_garment_recipe(garment_type_id: int) -> dict:
     """Delete a garment recipe by garment type ID."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    try:
+    with get_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute(
             "SELECT id FROM garment_types WHERE id = ?",
             (garment_type_id,),
@@ -502,92 +644,95 @@ def db_delete_garment_recipe(garment_type_id: int) -> dict:
             raise HTTPException(status_code=404, detail="Garment recipe not found")
 
         conn.commit()
+        co2_result_cache.invalidate("garment_types", [garment_type_id])
+        designer_reference_cache.invalidate_catalog()
         return {"message": "Garment recipe deleted"}
-    finally:
-        conn.close()
 
 
 def db_create_fabric_block_type(name: str, sqm: float, processes: list) -> dict:
     """Create a new fabric block type in the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    try:
-        if sqm <= 0:
-            raise HTTPException(status_code=400, detail="sqm must be greater than 0")
-
-        if processes:
-            process_ids = [proc.process_id for proc in processes]
-            cursor.execute(
-                f"SELECT COUNT(*) FROM process_types WHERE id IN ({','.join('?' * len(process_ids))})",
-                process_ids,
-            )
-            if cursor.fetchone()[0] != len(set(process_ids)):
-                raise HTTPException(status_code=400, detail="Invalid process type")
-
-        for proc in processes:
-            if proc.amount <= 0:
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            if sqm <= 0:
                 raise HTTPException(
-                    status_code=400,
-                    detail="Process amount must be greater than 0",
+                    status_code=400, detail="sqm must be greater than 0"
                 )
 
-        cursor.execute(
-            """
-            INSERT INTO fabric_block_types (name, sqm)
-            VALUES (?, ?)
-            """,
-            (name, sqm),
-        )
-        fabric_block_type_id = cursor.lastrowid
+            if processes:
+                process_ids = [proc.process_id for proc in processes]
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM process_types WHERE id IN ({','.join('?' * len(process_ids))})",
+                    process_ids,
+                )
+                if cursor.fetchone()[0] != len(set(process_ids)):
+                    raise HTTPException(status_code=400, detail="Invalid process type")
 
-        if processes:
-            cursor.executemany(
+            for proc in processes:
+                if proc.amount <= 0:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Process amount must be greater than 0",
+                    )
+
+            cursor.execute(
                 """
-                INSERT INTO fabric_block_recipe_processes
-                (fabric_block_type, process_id, amount)
-                VALUES (?, ?, ?)
+                INSERT INTO fabric_block_types (name, sqm)
+                VALUES (?, ?)
                 """,
-                [
-                    (fabric_block_type_id, proc.process_id, proc.amount)
-                    for proc in processes
-                ],
+                (name, sqm),
             )
+            fabric_block_type_id = cursor.lastrowid
+
+            if processes:
+                cursor.executemany(
+                    """
+                    INSERT INTO fabric_block_recipe_processes
+                    (fabric_block_type, process_id, amount)
+                    VALUES (?, ?, ?)
+                    """,
+                    [
+                        (fabric_block_type_id, proc.process_id, proc.amount)
+                        for proc in processes
+                    ],
+                )
 
-        conn.commit()
-        return {"id": fabric_block_type_id, "name": name}
-    except sqlite3.IntegrityError:
-        raise HTTPException(status_code=409, detail="Fabric block type already exists")
-    finally:
-        conn.close()
+            conn.commit()
+            designer_reference_cache.invalidate(
+                "fabric_block_types", [fabric_block_type_id]
+            )
+            return {"id": fabric_block_type_id, "name": name}
+        except sqlite3.IntegrityError:
+            raise HTTPException(
+                status_code=409, detail="Fabric block type already exists"
+            )
 
 
 def db_create_process_type(name: str, unit: str | None, activity_id: int) -> dict:
     """Create a new process type in the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            """
-            INSERT INTO process_types (name, unit, activity_id)
-            VALUES (?, ?, ?)
-            """,
-            (name, unit, activity_id),
-        )
-        conn.commit()
-        return {"id": cursor.lastrowid, "name": name}
-    except sqlite3.IntegrityError:
-        raise HTTPException(status_code=409, detail="Process type already exists")
-    finally:
-        conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                INSERT INTO process_types (name, unit, activity_id)
+                VALUES (?, ?, ?)
+                """,
+                (name, unit, activity_id),
+            )
+            conn.commit()
+            designer_reference_cache.invalidate("process_types", [cursor.lastrowid])
+            return {"id": cursor.lastrowid, "name": name}
+        except sqlite3.IntegrityError:
+            raise HTTPException(status_code=409, detail="Process type already exists")
 
 
 def db_get_fabric_block_types() -> list[dict]:
     """Get all fabric block types from the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name, sqm FROM fabric_block_types")
-    fabric_block_types = cursor.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, name, sqm FROM fabric_block_types")
+        fabric_block_types = cursor.fetchall()
     return [
         {"id": fb_type[0], "name": fb_type[1], "sqm": fb_type[2]}
         for fb_type in fabric_block_types
@@ -596,9 +741,8 @@ def db_get_fabric_block_types() -> list[dict]:
 
 def db_delete_fabric_block_type(type_id: int) -> dict:
     """Delete a fabric block type by ID."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    try:
+    with get_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute(
             "SELECT id FROM fabric_block_types WHERE id = ?",
             (type_id,),
@@ -623,18 +767,18 @@ def db_delete_fabric_block_type(type_id: int) -> dict:
             (type_id,),
         )
         conn.commit()
+        co2_result_cache.invalidate("fabric_block_types", [type_id])
+        designer_reference_cache.invalidate("fabric_block_types", [type_id])
+        second_life_allocator.invalidate([type_id])
         return {"message": "Fabric block type deleted"}
-    finally:
-        conn.close()
 
 
 def db_get_process_types() -> list[dict]:
     """Get all process types from the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name, unit, activity_id FROM process_types")
-    process_types = cursor.fetchall()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, name, unit, activity_id FROM process_types")
+        process_types = cursor.fetchall()
     return [
         {
             "id": pt[0],
@@ -646,11 +790,88 @@ def db_get_process_types() -> list[dict]:
     ]
 
 
+def db_get_designer_reference_rows(
+    material_ids: list[int] | None = None,
+    process_type_ids: list[int] | None = None,
+    fabric_block_type_ids: list[int] | None = None,
+) -> dict:
+    """Catalog rows behind the designer reference; all of a table if IDs are None."""
+
+    def where_ids(column: str, ids: list[int] | None) -> tuple[str, list[int]]:
+        if ids is None:
+            return "", []
+        return f"WHERE {column} IN ({','.join('?' * len(ids))})", list(ids)
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        materials = []
+        if material_ids is None or material_ids:
+            where, params = where_ids("id", material_ids)
+            cursor.execute(
+                f"SELECT id, name, kg_per_sqm, activity_id FROM materials {where}",
+                params,
+            )
+            materials = [
+                {
+                    "id": row[0],
+                    "name": row[1],
+                    "kg_per_sqm": row[2],
+                    "activity_id": row[3],
+                }
+                for row in cursor.fetchall()
+            ]
+
+        process_types = []
+        if process_type_ids is None or process_type_ids:
+            where, params = where_ids("id", process_type_ids)
+            cursor.execute(
+                f"SELECT id, name, unit, activity_id FROM process_types {where}",
+                params,
+            )
+            process_types = [
+                {"id": row[0], "name": row[1], "unit": row[2], "activity_id": row[3]}
+                for row in cursor.fetchall()
+            ]
+
+        fabric_block_types = []
+        block_processes: dict[int, list[tuple[int, str, float, int]]] = {}
+        if fabric_block_type_ids is None or fabric_block_type_ids:
+            where, params = where_ids("id", fabric_block_type_ids)
+            cursor.execute(
+                f"SELECT id, name, sqm FROM fabric_block_types {where}", params
+            )
+            fabric_block_types = [
+                {"id": row[0], "name": row[1], "sqm": row[2]}
+                for row in cursor.fetchall()
+            ]
+            where, params = where_ids("fbrp.fabric_block_type", fabric_block_type_ids)
+            cursor.execute(
+                f"""
+                SELECT fbrp.fabric_block_type, pt.id, pt.name, fbrp.amount, pt.activity_id
+                FROM fabric_block_recipe_processes fbrp
+                JOIN process_types pt ON fbrp.process_id = pt.id
+                {where}
+                ORDER BY fbrp.id
+                """,
+                params,
+            )
+            for type_id, process_id, name, amount, activity_id in cursor.fetchall():
+                block_processes.setdefault(type_id, []).append(
+                    (process_id, name, amount, activity_id)
+                )
+
+    return {
+        "materials": materials,
+        "process_types": process_types,
+        "fabric_block_types": fabric_block_types,
+        "block_processes": block_processes,
+    }
+
+
 def db_delete_process_type(type_id: int) -> dict:
     """Delete a process type by ID."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    try:
+    with get_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute(
             "SELECT id FROM process_types WHERE id = ?",
             (type_id,),
@@ -675,9 +896,11 @@ def db_delete_process_type(type_id: int) -> dict:
             (type_id,),
         )
         conn.commit()
+        co2_result_cache.invalidate("process_types", [type_id])
+        designer_reference_cache.invalidate("process_types", [type_id])
+        # Indexed blocks carry their preparation processes.
+        second_life_allocator.invalidate()
         return {"message": "Process type deleted"}
-    finally:
-        conn.close()
 
 
 def db_create_garment_recipe(
@@ -690,10 +913,8 @@ def db_create_garment_recipe(
             detail="Garment recipe must include at least one fabric block",
         )
 
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    try:
+    with get_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute(
             "SELECT id FROM garment_types WHERE name = ?",
             (garment_type_name,),
@@ -794,13 +1015,13 @@ def db_create_garment_recipe(
             )
 
         conn.commit()
+        co2_result_cache.invalidate("garment_types", [garment_type_id])
+        designer_reference_cache.invalidate_catalog()
         return {
             "message": "Garment recipe saved",
             "garment_type_id": garment_type_id,
             "garment_type_name": garment_type_name,
         }
-    finally:
-        conn.close()
 
 
 def db_create_fabric_block(
@@ -815,107 +1036,166 @@ def db_create_fabric_block(
         raise HTTPException(status_code=400, detail="quality must be between 0 and 100")
 
     co2eq = None  # Placeholder
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        cursor = conn.cursor()
 
-    if material_id is not None:
-        cursor.execute("SELECT 1 FROM materials WHERE id = ?", (material_id,))
-        if cursor.fetchone() is None:
-            conn.close()
-            raise HTTPException(status_code=400, detail="Invalid material")
+        if material_id is not None:
+            cursor.execute("SELECT 1 FROM materials WHERE id = ?", (material_id,))
+            if cursor.fetchone() is None:
+                raise HTTPException(status_code=400, detail="Invalid material")
 
-    cursor.execute(
-        """
-        INSERT INTO fabric_blocks_inventory (type_id, co2eq, location_id, material_id, quality, second_life)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
-        (type_id, co2eq, location_id, material_id, quality, 1),
-    )
-    fabric_block_id = cursor.lastrowid
-    if not fabric_block_id:
-        conn.close()
-        return {"error": "Invalid fabric block type"}
-
-    if processes:
-        cursor.executemany(
+        cursor.execute(
             """
-            INSERT INTO processes_fabric_blocks_inventory (process_id, amount, fabric_block_id)
-            VALUES (?, ?, ?)
+            INSERT INTO fabric_blocks_inventory (type_id, co2eq, location_id, material_id, quality, second_life)
+            VALUES (?, ?, ?, ?, ?, ?)
             """,
-            [
-                (process.process_id, process.amount, fabric_block_id)
-                for process in processes
-            ],
+            (type_id, co2eq, location_id, material_id, quality, 1),
         )
+        fabric_block_id = cursor.lastrowid
+        if not fabric_block_id:
+            return {"error": "Invalid fabric block type"}
+
+        if processes:
+            cursor.executemany(
+                """
+                INSERT INTO processes_fabric_blocks_inventory (process_id, amount, fabric_block_id)
+                VALUES (?, ?, ?)
+                """,
+                [
+                    (process.process_id, process.amount, fabric_block_id)
+                    for process in processes
+                ],
+            )
 
-    conn.commit()
-    conn.close()
+        conn.commit()
+    co2_result_cache.invalidate("fabric_blocks_inventory", [type_id])
+    second_life_allocator.invalidate([type_id])
     return {"message": "Fabric block created successfully", "id": fabric_block_id}
 
 
-def db_get_fabric_blocks(type_filter: str | None = None) -> list[dict]:
-    """Get all fabric blocks from inventory, optionally filtered by type."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-                   SELECT fbi.id, fbi.type_id, fbi.co2eq, fbi.garment_id, l.name as location_name, m.name as material_name, fbi.quality
-                   FROM fabric_blocks_inventory fbi
-                   LEFT JOIN locations l ON fbi.location_id = l.id
-                   LEFT JOIN materials m ON fbi.material_id = m.id
-                   WHERE (? IS NULL OR fbi.type_id = ?)
-                     AND fbi.garment_id IS NULL
-                   """,
-        (type_filter, type_filter),
-    )
-    fabric_blocks_data = cursor.fetchall()
+def db_get_fabric_blocks(
+    type_filter: str | None = None,
+    *,
+    material_id: int | None = None,
+    location_id: int | None = None,
+    min_quality: float | None = None,
+    max_quality: float | None = None,
+    after_id: int | None = None,
+    limit: int | None = None,
+) -> list[dict]:
+    """Get unassigned fabric blocks from inventory, ordered by ID.
+
+    Blocks can be filtered by type, material, location and quality range.
+    ``after_id`` and ``limit`` page through the result by block ID, so a page
+    costs the same regardless of how deep into the inventory it starts.
+    """
+    if limit is not None and limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be greater than 0")
+    if (
+        min_quality is not None
+        and max_quality is not None
+        and min_quality > max_quality
+    ):
+        raise HTTPException(
+            status_code=400, detail="min_quality must not exceed max_quality"
+        )
 
-    fabric_blocks = []
-    for fb in fabric_blocks_data:
-        fb_id, fb_type, fb_co2eq, garment_id, location_name, material_name, quality = fb
+    page_query = """
+        SELECT fbi.id
+        FROM fabric_blocks_inventory fbi
+        WHERE fbi.garment_id IS NULL
+          AND (:type_id IS NULL OR fbi.type_id = :type_id)
+          AND (:material_id IS NULL OR fbi.material_id = :material_id)
+          AND (:location_id IS NULL OR fbi.location_id = :location_id)
+          AND (:min_quality IS NULL OR fbi.quality >= :min_quality)
+          AND (:max_quality IS NULL OR fbi.quality <= :max_quality)
+          AND (:after_id IS NULL OR fbi.id > :after_id)
+        ORDER BY fbi.id
+        LIMIT :limit
+    """
+    params = {
+        "type_id": type_filter,
+        "material_id": material_id,
+        "location_id": location_id,
+        "min_quality": min_quality,
+        "max_quality": max_quality,
+        "after_id": after_id,
+        # SQLite treats a negative LIMIT as "no limit".
+        "limit": -1 if limit is None else limit,
+    }
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute(
-            "SELECT name FROM fabric_block_types WHERE id = ?",
-            (fb_type,),
+            f"""
+            WITH page AS ({page_query})
+            SELECT fbi.id, fbt.name, fbi.co2eq, fbi.garment_id,
+                   l.name AS location_name, m.name AS material_name, fbi.quality
+            FROM page
+            JOIN fabric_blocks_inventory fbi ON fbi.id = page.id
+            LEFT JOIN fabric_block_types fbt ON fbi.type_id = fbt.id
+            LEFT JOIN locations l ON fbi.location_id = l.id
+            LEFT JOIN materials m ON fbi.material_id = m.id
+            ORDER BY fbi.id
+            """,
+            params,
         )
-        fb_type_name = cursor.fetchone()
-        fb_type_name = fb_type_name[0] if fb_type_name else None
+        fabric_blocks_data = cursor.fetchall()
+        if not fabric_blocks_data:
+            return []
+
+        # Load the processes of the whole page in one go instead of per block.
         cursor.execute(
-            """
-            SELECT pt.name, pfbi.amount
-            FROM processes_fabric_blocks_inventory pfbi
+            f"""
+            WITH page AS ({page_query})
+            SELECT pfbi.fabric_block_id, pt.name, pfbi.amount
+            FROM page
+            JOIN processes_fabric_blocks_inventory pfbi
+              ON pfbi.fabric_block_id = page.id
             JOIN process_types pt ON pfbi.process_id = pt.id
-            WHERE pfbi.fabric_block_id = ?
+            ORDER BY pfbi.fabric_block_id, pfbi.id
             """,
-            (fb_id,),
-        )
-        inventory_processes_data = cursor.fetchall()
-        processes = [{"type": p[0], "amount": p[1]} for p in inventory_processes_data]
-        fabric_blocks.append(
-            {
-                "id": fb_id,
-                "type": fb_type_name,
-                "co2eq": fb_co2eq,
-                "garment_id": garment_id,
-                "location": location_name,
-                "material": material_name,
-                "quality": quality,
-                "processes": processes,
-            }
+            params,
         )
-    conn.close()
-    return fabric_blocks
+        processes_by_block: dict[int, list[dict]] = {}
+        for fb_id, process_name, amount in cursor.fetchall():
+            processes_by_block.setdefault(fb_id, []).append(
+                {"type": process_name, "amount": amount}
+            )
+
+    return [
+        {
+            "id": fb_id,
+            "type": fb_type_name,
+            "co2eq": fb_co2eq,
+            "garment_id": garment_id,
+            "location": location_name,
+            "material": material_name,
+            "quality": quality,
+            "processes": processes_by_block.get(fb_id, []),
+        }
+        for (
+            fb_id,
+            fb_type_name,
+            fb_co2eq,
+            garment_id,
+            location_name,
+            material_name,
+            quality,
+        ) in fabric_blocks_data
+    ]
 
 
 def db_delete_fabric_block(fabric_block_id: int) -> dict:
     """Delete a fabric block from inventory by ID."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    try:
+    with get_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute(
-            "SELECT id FROM fabric_blocks_inventory WHERE id = ?",
+            "SELECT type_id FROM fabric_blocks_inventory WHERE id = ?",
             (fabric_block_id,),
         )
-        if cursor.fetchone() is None:
+        fabric_block_row = cursor.fetchone()
+        if fabric_block_row is None:
             raise HTTPException(status_code=404, detail="Fabric block not found")
 
         cursor.execute(
@@ -927,221 +1207,277 @@ def db_delete_fabric_block(fabric_block_id: int) -> dict:
             (fabric_block_id,),
         )
         conn.commit()
+        co2_result_cache.invalidate("fabric_blocks_inventory", [fabric_block_row[0]])
+        second_life_allocator.invalidate([fabric_block_row[0]])
         return {"message": "Fabric block deleted"}
-    finally:
-        conn.close()
 
 
-def get_fabric_block_recipe(
-    fabric_block_name: str, material_id: int
-) -> FabricBlock | None:
-    """Get a fabric block recipe with all its processes for a specific material."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    # Get fabric block type details
-    cursor.execute(
-        "SELECT id, sqm FROM fabric_block_types WHERE name = ?",
-        (fabric_block_name,),
-    )
-    result = cursor.fetchone()
-    if not result:
-        conn.close()
-        return None
-
-    fabric_block_type_id = result[0]
-    fabric_block_sqm = result[1]
-
-    cursor.execute(
-        "SELECT name, kg_per_sqm, activity_id FROM materials WHERE id = ?",
-        (material_id,),
-    )
-    material_row = cursor.fetchone()
-    if not material_row:
-        conn.close()
-        raise HTTPException(status_code=400, detail="Invalid material")
-
-    selected_material_name = material_row[0]
-    selected_kg_per_sqm = material_row[1]
-    selected_activity_id = material_row[2]
-
-    # Get processes for this fabric block type
+def _load_fabric_block_processes(
+    cursor: sqlite3.Cursor, type_ids: list[int]
+) -> dict[int, list[Process]]:
+    """Recipe processes of the given fabric block types, in one query."""
+    if not type_ids:
+        return {}
+    placeholders = ", ".join("?" for _ in type_ids)
     cursor.execute(
-        """
-        SELECT pt.name, fbrp.amount, pt.activity_id
+        f"""
+        SELECT fbrp.fabric_block_type, pt.name, fbrp.amount, pt.activity_id
         FROM fabric_block_recipe_processes fbrp
         JOIN process_types pt ON fbrp.process_id = pt.id
-        WHERE fbrp.fabric_block_type = ?
+        WHERE fbrp.fabric_block_type IN ({placeholders})
+        ORDER BY fbrp.id
         """,
-        (fabric_block_type_id,),
+        type_ids,
     )
-    processes_data = cursor.fetchall()
-    processes: list[Process] = []
-    for proc_name, proc_amount, activity_id_process in processes_data:
-        processes.append(
-            Process(name=proc_name, amount=proc_amount, activity_id=activity_id_process)
+    processes_by_type: dict[int, list[Process]] = {}
+    for type_id, proc_name, proc_amount, activity_id in cursor.fetchall():
+        processes_by_type.setdefault(type_id, []).append(
+            Process(name=proc_name, amount=proc_amount, activity_id=activity_id)
         )
+    return processes_by_type
 
-    conn.close()
-    return FabricBlock(
-        id=fabric_block_type_id,
-        name=fabric_block_name,
-        material=selected_material_name,
-        weight_kg=selected_kg_per_sqm * fabric_block_sqm,
-        activity_id=selected_activity_id,
-        processes=processes,
-    )
 
+def _build_fabric_block_recipes(
+    fabric_block_types: list[tuple[int, str, float]],
+    material_row: tuple[str, float, int],
+    processes_by_type: dict[int, list[Process]],
+) -> dict[int, FabricBlock]:
+    material_name, kg_per_sqm, material_activity_id = material_row
+    return {
+        type_id: FabricBlock(
+            id=type_id,
+            name=type_name,
+            material=material_name,
+            weight_kg=kg_per_sqm * sqm,
+            activity_id=material_activity_id,
+            processes=processes_by_type.get(type_id, []),
+        )
+        for type_id, type_name, sqm in fabric_block_types
+    }
 
-def get_full_garment_recipe(
-    garment_type_id: int, material_id: int
-) -> GarmentRecipe | None:
-    """Get a complete garment recipe including all fabric blocks and processes."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
 
-    cursor.execute("SELECT id FROM garment_types WHERE id = ?", (garment_type_id,))
-    if not cursor.fetchone():
-        return None
+def _load_fabric_block_recipes(
+    cursor: sqlite3.Cursor,
+    fabric_block_types: list[tuple[int, str, float]],
+    material_row: tuple[str, float, int],
+) -> dict[int, FabricBlock]:
+    """Build FabricBlock recipes for the given (id, name, sqm) types at once."""
+    if not fabric_block_types:
+        return {}
 
-    cursor.execute(
-        """
-        SELECT ft.name, grfb.amount
-        FROM garment_recipe_fabric_blocks grfb
-        JOIN fabric_block_types ft ON grfb.fabric_block_id = ft.id
-        WHERE grfb.garment_type = ?
-    """,
-        (garment_type_id,),
+    processes_by_type = _load_fabric_block_processes(
+        cursor, list({type_id for type_id, _, _ in fabric_block_types})
+    )
+    return _build_fabric_block_recipes(
+        fabric_block_types, material_row, processes_by_type
     )
 
-    fabric_blocks_data = cursor.fetchall()
 
-    cursor.execute(
-        "SELECT id FROM materials WHERE id = ?",
-        (material_id,),
-    )
-    material_row = cursor.fetchone()
-    if not material_row:
-        conn.close()
-        raise HTTPException(status_code=400, detail="Invalid material")
-    selected_material_id = material_row[0]
+def get_fabric_block_recipe(
+    fabric_block_name: str, material_id: int
+) -> FabricBlock | None:
+    """Get a fabric block recipe with all its processes for a specific material."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute(
-        """
-        SELECT 1
-        FROM garment_recipe_materials
-        WHERE garment_type = ? AND material_id = ?
-        LIMIT 1
-        """,
-        (garment_type_id, selected_material_id),
-    )
-    if not cursor.fetchone():
-        conn.close()
-        raise HTTPException(
-            status_code=400,
-            detail="Material is not associated with this garment recipe",
+        cursor.execute(
+            "SELECT id, name, sqm FROM fabric_block_types WHERE name = ?",
+            (fabric_block_name,),
         )
+        fabric_block_type = cursor.fetchone()
+        if not fabric_block_type:
+            return None
 
-    fabric_blocks: list[FabricBlock] = []
-    for fb in fabric_blocks_data:
-        fb_name, fb_amount = fb
-        # Get full fabric block details
-        fabric_block = get_fabric_block_recipe(fb_name, selected_material_id)
-        if fabric_block:
-            # Add the fabric block multiple times based on amount
-            fabric_blocks.extend([fabric_block] * fb_amount)
+        cursor.execute(
+            "SELECT name, kg_per_sqm, activity_id FROM materials WHERE id = ?",
+            (material_id,),
+        )
+        material_row = cursor.fetchone()
+        if not material_row:
+            raise HTTPException(status_code=400, detail="Invalid material")
 
-    cursor.execute(
-        """
-        SELECT pt.name, grp.amount, pt.activity_id FROM garment_recipe_processes grp
-        JOIN process_types pt ON grp.process_id = pt.id
-        WHERE grp.garment_type = ?
-    """,
-        (garment_type_id,),
-    )
+        recipes = _load_fabric_block_recipes(cursor, [fabric_block_type], material_row)
+    return recipes[fabric_block_type[0]]
 
-    processes_data = cursor.fetchall()
 
-    processes: list[Process] = []
-    for proc in processes_data:
-        proc_name, proc_amount, activity_id = proc
-        processes.append(
-            Process(name=proc_name, amount=proc_amount, activity_id=activity_id)
-        )
+def compile_garment_recipe(
+    garment_type_id: int, material_id: int
+) -> CompiledGarmentRecipe | None:
+    """Load a garment recipe in a fixed number of queries.
+
+    Each recipe row becomes one RecipeFabricBlock that carries its quantity,
+    so callers can evaluate every distinct block once and scale the result.
+    """
+    key = (garment_type_id, material_id)
+    recipes, errors = compile_garment_recipes([key])
+    error = errors.get(key)
+    if error is not None:
+        if error.status_code == 404:
+            return None
+        raise error
+    return recipes[key]
+
+
+def compile_garment_recipes(
+    pairs: list[tuple[int, int]],
+) -> tuple[
+    dict[tuple[int, int], CompiledGarmentRecipe],
+    dict[tuple[int, int], HTTPException],
+]:
+    """Load the recipes of many (garment type, material) pairs at once.
+
+    Uses the same four queries as a single recipe, however many pairs are
+    requested. Returns the recipes and, for pairs without one, the
+    HTTPException compile_garment_recipe would raise (404 for an unknown
+    garment type).
+    """
+    pairs = list(dict.fromkeys(pairs))
+    recipes: dict[tuple[int, int], CompiledGarmentRecipe] = {}
+    errors: dict[tuple[int, int], HTTPException] = {}
+    if not pairs:
+        return recipes, errors
 
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
 
-    recipe = GarmentRecipe(fabric_blocks=fabric_blocks, processes=processes)
-    return recipe
+        values = ", ".join("(?, ?)" for _ in pairs)
+        cursor.execute(
+            f"""
+            SELECT p.column1, p.column2, gt.id,
+                   m.id, m.name, m.kg_per_sqm, m.activity_id,
+                   EXISTS (
+                       SELECT 1
+                       FROM garment_recipe_materials grm
+                       WHERE grm.garment_type = gt.id AND grm.material_id = m.id
+                   )
+            FROM (VALUES {values}) p
+            LEFT JOIN garment_types gt ON gt.id = p.column1
+            LEFT JOIN materials m ON m.id = p.column2
+            """,
+            [value for pair in pairs for value in pair],
+        )
+        material_rows: dict[tuple[int, int], tuple[str, float, int]] = {}
+        for (
+            garment_type_id,
+            material_id,
+            found_garment_type_id,
+            selected_material_id,
+            *material_row,
+            is_recipe_material,
+        ) in cursor.fetchall():
+            key = (garment_type_id, material_id)
+            if found_garment_type_id is None:
+                errors[key] = HTTPException(
+                    status_code=404,
+                    detail=(
+                        "Garment recipe not found for garment type ID: "
+                        f"{garment_type_id}"
+                    ),
+                )
+            elif selected_material_id is None:
+                errors[key] = HTTPException(status_code=400, detail="Invalid material")
+            elif not is_recipe_material:
+                errors[key] = HTTPException(
+                    status_code=400,
+                    detail="Material is not associated with this garment recipe",
+                )
+            else:
+                material_rows[key] = tuple(material_row)
 
+        garment_type_ids = list(
+            {garment_type_id for garment_type_id, _ in material_rows}
+        )
+        if not garment_type_ids:
+            return recipes, errors
 
-def get_manufacturer_distance_km(
-    source_company: str, destination_company: str
-) -> float | None:
-    """Return the stored transport distance between two manufacturers."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    try:
+        placeholders = ", ".join("?" for _ in garment_type_ids)
         cursor.execute(
-            """
-            SELECT distance_km
-            FROM manufacturer_distances
-            WHERE source_company = ? AND destination_company = ?
-            LIMIT 1
+            f"""
+            SELECT grfb.garment_type, ft.id, ft.name, ft.sqm, grfb.amount
+            FROM garment_recipe_fabric_blocks grfb
+            JOIN fabric_block_types ft ON grfb.fabric_block_id = ft.id
+            WHERE grfb.garment_type IN ({placeholders})
+            ORDER BY grfb.id
             """,
-            (source_company, destination_company),
+            garment_type_ids,
         )
-        row = cursor.fetchone()
-        if not row:
-            return None
-        return float(row[0])
-    finally:
-        conn.close()
-
-
-def db_get_manufacturer_distance_row(
-    source_company: str, destination_company: str
-) -> dict | None:
-    """Return the stored transport row between two manufacturers."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    try:
+        fabric_blocks_by_garment_type: dict[int, list[tuple]] = {}
+        for garment_type_id, *fabric_block_row in cursor.fetchall():
+            fabric_blocks_by_garment_type.setdefault(garment_type_id, []).append(
+                tuple(fabric_block_row)
+            )
+        processes_by_block_type = _load_fabric_block_processes(
+            cursor,
+            list(
+                {
+                    fb_id
+                    for rows in fabric_blocks_by_garment_type.values()
+                    for fb_id, _, _, _ in rows
+                }
+            ),
+        )
+
         cursor.execute(
-            """
-            SELECT source_company,
-                   source_role_group,
-                   source_location,
-                   destination_company,
-                   destination_role_group,
-                   destination_location,
-                   distance_km
-            FROM manufacturer_distances
-            WHERE source_company = ? AND destination_company = ?
-            LIMIT 1
+            f"""
+            SELECT grp.garment_type, pt.name, grp.amount, pt.activity_id
+            FROM garment_recipe_processes grp
+            JOIN process_types pt ON grp.process_id = pt.id
+            WHERE grp.garment_type IN ({placeholders})
+            ORDER BY grp.id
             """,
-            (source_company, destination_company),
+            garment_type_ids,
         )
-        row = cursor.fetchone()
-        if not row:
-            return None
-        return {
-            "source_company": row[0],
-            "source_role_group": row[1],
-            "source_location": row[2],
-            "destination_company": row[3],
-            "destination_role_group": row[4],
-            "destination_location": row[5],
-            "distance_km": float(row[6]),
-        }
-    finally:
-        conn.close()
+        processes_by_garment_type: dict[int, list[Process]] = {}
+        for garment_type_id, proc_name, proc_amount, activity_id in cursor.fetchall():
+            processes_by_garment_type.setdefault(garment_type_id, []).append(
+                Process(name=proc_name, amount=proc_amount, activity_id=activity_id)
+            )
+
+    for key, material_row in material_rows.items():
+        garment_type_id = key[0]
+        fabric_blocks_data = fabric_blocks_by_garment_type.get(garment_type_id, [])
+        fabric_block_recipes = _build_fabric_block_recipes(
+            [
+                (fb_id, fb_name, fb_sqm)
+                for fb_id, fb_name, fb_sqm, _ in fabric_blocks_data
+            ],
+            material_row,
+            processes_by_block_type,
+        )
+        recipes[key] = CompiledGarmentRecipe(
+            fabric_blocks=[
+                RecipeFabricBlock(
+                    fabric_block=fabric_block_recipes[fb_id], quantity=fb_amount
+                )
+                for fb_id, _, _, fb_amount in fabric_blocks_data
+                if fb_amount
+            ],
+            processes=list(processes_by_garment_type.get(garment_type_id, [])),
+        )
+    return recipes, errors
+
+
+def get_full_garment_recipe(
+    garment_type_id: int, material_id: int
+) -> GarmentRecipe | None:
+    """Get a complete garment recipe with one FabricBlock entry per block copy."""
+    recipe = compile_garment_recipe(garment_type_id, material_id)
+    if recipe is None:
+        return None
+    return GarmentRecipe(
+        fabric_blocks=[
+            entry.fabric_block
+            for entry in recipe.fabric_blocks
+            for _ in range(entry.quantity)
+        ],
+        processes=recipe.processes,
+    )
 
 
 def db_get_manufacturers(role_group: str | None = None) -> list[dict]:
     """Return manufacturers, optionally filtered by role group."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    try:
+    with get_connection() as conn:
+        cursor = conn.cursor()
         if role_group is None:
             cursor.execute("""
                 SELECT company, role, role_group, location
@@ -1168,94 +1504,6 @@ def db_get_manufacturers(role_group: str | None = None) -> list[dict]:
             }
             for row in rows
         ]
-    finally:
-        conn.close()
-
-
-def get_used_fabric_block(
-    fabric_block_name: str,
-    already_used_ids: list[int],
-    preferred_material: str | None = None,
-) -> SecondLifeFabricBlock | None:
-    """Get a fabric block from inventory, excluding already-used IDs."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    base_query = """
-        SELECT fbi.id, fbi.type_id, fbi.co2eq, fbi.location_id, l.name as location_name,
-    """
-    base_query += "fbi.quality"
-    base_query += ", "
-    base_query += "m.name"
-    base_query += """
-        FROM fabric_blocks_inventory fbi
-        JOIN fabric_block_types fbt ON fbi.type_id = fbt.id
-        LEFT JOIN locations l ON fbi.location_id = l.id
-    """
-    base_query += "LEFT JOIN materials m ON fbi.material_id = m.id"
-    base_query += """
-        WHERE fbt.name = ?
-          AND fbi.garment_id IS NULL
-    """
-
-    params = [fabric_block_name]
-
-    if already_used_ids:
-        placeholders = ",".join("?" * len(already_used_ids))
-        base_query += f" AND fbi.id NOT IN ({placeholders})"
-        params.extend(str(id) for id in already_used_ids)
-
-    if preferred_material:
-        base_query += " ORDER BY CASE WHEN m.name = ? THEN 0 ELSE 1 END, fbi.id"
-        params.append(preferred_material)
-    else:
-        base_query += " ORDER BY fbi.id"
-
-    base_query += " LIMIT 1"
-
-    cursor.execute(base_query, params)
-    result = cursor.fetchone()
-
-    if not result:
-        conn.close()
-        return None
-
-    (
-        fb_id,
-        fb_type_id,
-        fb_co2eq,
-        fb_location_id,
-        fb_location_name,
-        fb_quality,
-        fb_material,
-    ) = result
-    cursor.execute(
-        """
-        SELECT pt.name, pfbi.amount, pt.activity_id
-        FROM processes_fabric_blocks_inventory pfbi
-        JOIN process_types pt ON pfbi.process_id = pt.id
-        WHERE pfbi.fabric_block_id = ?
-        """,
-        (fb_id,),
-    )
-    inventory_processes_data = cursor.fetchall()
-    processes: list[Process] = []
-    for process in inventory_processes_data:
-        process_name, process_amount, activity_id = process
-        processes.append(
-            Process(name=process_name, amount=process_amount, activity_id=activity_id)
-        )
-    conn.close()
-    return SecondLifeFabricBlock(
-        id=fb_id,
-        type_id=fb_type_id,
-        co2eq=fb_co2eq,
-        processes=processes,
-        location_id=fb_location_id,
-        location_name=fb_location_name,
-        material=fb_material,
-        quality=float(fb_quality),
-    )
 
 
 def get_fabric_block_type_for_emission(
@@ -1265,9 +1513,8 @@ def get_fabric_block_type_for_emission(
 
     Returns FabricBlockType or None if not found.
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    try:
+    with get_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute(
             """
             SELECT id, sqm
@@ -1282,8 +1529,6 @@ def get_fabric_block_type_for_emission(
             return None
         fb_type_id, fb_sqm = row
         return FabricBlockType(id=fb_type_id, name=fabric_block_name, sqm=fb_sqm)
-    finally:
-        conn.close()
 
 
 def get_fabric_block_processes_for_emission(
@@ -1293,9 +1538,8 @@ def get_fabric_block_processes_for_emission(
 
     Returns list of tuples (process_name, process_amount, process_activity_id).
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    try:
+    with get_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute(
             """
             SELECT pt.name, fbrp.amount, pt.activity_id
@@ -1306,5 +1550,3 @@ def get_fabric_block_processes_for_emission(
             (fabric_block_type_id,),
         )
         return cursor.fetchall()
-    finally:
-        conn.close()
@@ -0,0 +1,247 @@
+"""In-memory index of second-life fabric blocks for garment recipes.
+
+The unassigned blocks of ``fabric_blocks_inventory`` are loaded once per
+block type, with their preparation processes, and indexed by (type,
+material). ``block_matching.py`` assigns them to the block copies of a
+garment, or of many garments at once for production planning, from this
+index instead of one query per copy. The write paths in ``queries.py`` drop
+the types they change; those are reloaded on next use.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Iterable
+
+import numpy as np
+
+from ceis_backend.config import DB_PATH
+from ceis_backend.data.location_details import DISTANCES_TO_MANUFACTURER
+from ceis_backend.db_connection import get_connection
+from ceis_backend.models import Process, SecondLifeFabricBlock
+
+
+@dataclass(frozen=True, eq=False)
+class TypeInventory:
+    """Unassigned blocks of one type, by ascending ID; shared, read-only.
+
+    Blocks are stored as columns, so large inventories index quickly and
+    can be scored with NumPy (see ``block_matching.py``). ``block`` builds
+    the model of a block that is handed out.
+    """
+
+    type_id: int
+    ids: tuple[int, ...]
+    # Block indices per material, ascending.
+    by_material: dict[str | None, tuple[int, ...]]
+    # Material of each block as an index into ``materials``.
+    materials: tuple[str | None, ...]
+    material_index: np.ndarray
+    co2eq: tuple[int | None, ...]
+    location_ids: tuple[int | None, ...]
+    location_names: tuple[str | None, ...]
+    quality: np.ndarray
+    # Distance of the block's location to the manufacturer, 0 when unknown.
+    distance_km: np.ndarray
+    # Preparation processes, grouped by block: those of block ``i`` are
+    # ``process_offsets[i]:process_offsets[i + 1]``.
+    process_offsets: np.ndarray
+    process_block_index: np.ndarray
+    process_names: tuple[str, ...]
+    # Activity of each process as an index into ``activity_ids``.
+    process_activity_index: np.ndarray
+    process_amounts: np.ndarray
+    # Distinct activities of the preparation processes, ascending.
+    activity_ids: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def block(self, index: int) -> SecondLifeFabricBlock:
+        start, end = self.process_offsets[index], self.process_offsets[index + 1]
+        return SecondLifeFabricBlock(
+            id=self.ids[index],
+            type_id=self.type_id,
+            co2eq=self.co2eq[index],
+            processes=[
+                Process(
+                    name=self.process_names[position],
+                    amount=float(self.process_amounts[position]),
+                    activity_id=int(
+                        self.activity_ids[self.process_activity_index[position]]
+                    ),
+                )
+                for position in range(start, end)
+            ],
+            location_id=self.location_ids[index],
+            location_name=self.location_names[index],
+            material=self.materials[self.material_index[index]],
+            quality=float(self.quality[index]),
+        )
+
+
+class SecondLifeBlockAllocator:
+    def __init__(self) -> None:
+        self._inventories: dict[tuple[str, int], TypeInventory] = {}
+        self._lock = Lock()
+        self._generation = 0
+        self.loads = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _db_key() -> str:
+        # Indexes are per database, like the CO2 result cache.
+        return str(Path(DB_PATH).resolve())
+
+    def inventories(self, type_ids: Iterable[int]) -> dict[int, TypeInventory]:
+        """The indexed unassigned inventory of each type, loading missing ones."""
+        db_key = self._db_key()
+        type_ids = {int(type_id) for type_id in type_ids}
+        with self._lock:
+            inventories = {
+                type_id: self._inventories[(db_key, type_id)]
+                for type_id in type_ids
+                if (db_key, type_id) in self._inventories
+            }
+            generation = self._generation
+        missing = type_ids - inventories.keys()
+        if not missing:
+            return inventories
+
+        loaded = _load_type_inventories(missing)
+        with self._lock:
+            self.loads += 1
+            # Not kept if a write invalidated anything while loading.
+            if generation == self._generation:
+                for type_id, inventory in loaded.items():
+                    self._inventories[(db_key, type_id)] = inventory
+        inventories.update(loaded)
+        return inventories
+
+    def invalidate(self, type_ids: Iterable[int] | None = None) -> None:
+        """Drop the given block types, or everything, after inventory writes."""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if type_ids is None:
+                self._inventories.clear()
+                return
+            type_ids = {int(type_id) for type_id in type_ids}
+            for key in [key for key in self._inventories if key[1] in type_ids]:
+                del self._inventories[key]
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "indexed_types": len(self._inventories),
+                "indexed_blocks": sum(
+                    len(inventory) for inventory in self._inventories.values()
+                ),
+                "loads": self.loads,
+                "invalidations": self.invalidations,
+            }
+
+
+def _load_type_inventories(type_ids: set[int]) -> dict[int, TypeInventory]:
+    """Load the unassigned blocks of the given types in two queries."""
+    type_ids = sorted(type_ids)
+    placeholders = ", ".join("?" * len(type_ids))
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            SELECT fbi.type_id, fbi.id, fbi.co2eq, fbi.location_id,
+                   l.name, fbi.quality, m.name
+            FROM fabric_blocks_inventory fbi
+            LEFT JOIN locations l ON fbi.location_id = l.id
+            LEFT JOIN materials m ON fbi.material_id = m.id
+            WHERE fbi.type_id IN ({placeholders})
+              AND fbi.garment_id IS NULL
+            ORDER BY fbi.id
+            """,
+            type_ids,
+        )
+        block_rows = cursor.fetchall()
+        cursor.execute(
+            f"""
+            SELECT fbi.type_id, pfbi.fabric_block_id, pt.name, pfbi.amount,
+                   pt.activity_id
+            FROM processes_fabric_blocks_inventory pfbi
+            JOIN fabric_blocks_inventory fbi ON fbi.id = pfbi.fabric_block_id
+            JOIN process_types pt ON pfbi.process_id = pt.id
+            WHERE fbi.type_id IN ({placeholders})
+              AND fbi.garment_id IS NULL
+            ORDER BY fbi.id, pfbi.id
+            """,
+            type_ids,
+        )
+        process_rows = cursor.fetchall()
+
+    block_rows_by_type: dict[int, list[tuple]] = {type_id: [] for type_id in type_ids}
+    for row in block_rows:
+        block_rows_by_type[row[0]].append(row[1:])
+    process_rows_by_type: dict[int, list[tuple]] = {type_id: [] for type_id in type_ids}
+    for row in process_rows:
+        process_rows_by_type[row[0]].append(row[1:])
+
+    return {
+        type_id: _build_type_inventory(
+            type_id, block_rows_by_type[type_id], process_rows_by_type[type_id]
+        )
+        for type_id in type_ids
+    }
+
+
+def _build_type_inventory(
+    type_id: int, block_rows: list[tuple], process_rows: list[tuple]
+) -> TypeInventory:
+    ids, co2eq, location_ids, location_names, quality, materials = (
+        zip(*block_rows) if block_rows else ((),) * 6
+    )
+    material_codes: dict[str | None, int] = {}
+    by_material: dict[str | None, list[int]] = {}
+    for index, material in enumerate(materials):
+        material_codes.setdefault(material, len(material_codes))
+        by_material.setdefault(material, []).append(index)
+
+    index_by_id = {block_id: index for index, block_id in enumerate(ids)}
+    block_ids, process_names, amounts, activity_ids = (
+        zip(*process_rows) if process_rows else ((),) * 4
+    )
+    process_block_index = np.array(
+        [index_by_id[block_id] for block_id in block_ids], dtype=np.int64
+    )
+    unique_activity_ids, process_activity_index = np.unique(
+        np.array(activity_ids, dtype=np.int64), return_inverse=True
+    )
+
+    return TypeInventory(
+        type_id=type_id,
+        ids=ids,
+        by_material={
+            material: tuple(indices) for material, indices in by_material.items()
+        },
+        materials=tuple(material_codes),
+        material_index=np.array(
+            [material_codes[material] for material in materials], dtype=np.int64
+        ),
+        co2eq=co2eq,
+        location_ids=location_ids,
+        location_names=location_names,
+        quality=np.array(quality, dtype=float),
+        distance_km=np.array(
+            [DISTANCES_TO_MANUFACTURER.get(name, 0) for name in location_names],
+            dtype=float,
+        ),
+        process_offsets=np.searchsorted(process_block_index, np.arange(len(ids) + 1)),
+        process_block_index=process_block_index,
+        process_names=process_names,
+        process_activity_index=process_activity_index,
+        process_amounts=np.array([amount or 0.0 for amount in amounts], dtype=float),
+        activity_ids=unique_activity_ids,
+    )
+
+
+second_life_allocator = SecondLifeBlockAllocator()
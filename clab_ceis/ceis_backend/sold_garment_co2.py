@@ -0,0 +1,129 @@
+"""Background job persisting the CO2 of sold garments.
+
+``GET /strategy-progress`` only reads persisted values. Sold garments still
+missing one are picked up here in batches, off the request path, whenever
+the endpoint sees pending garments and every ``interval_seconds`` otherwise.
+"""
+
+from __future__ import annotations
+
+from threading import Condition, Lock, Thread
+from time import time
+from typing import TYPE_CHECKING, Callable
+
+from ceis_backend.queries import db_get_sold_garments_for_co2
+from ceis_backend.utils import refresh_sold_garment_co2_values
+
+if TYPE_CHECKING:
+    from ceis_backend.wiser_bridge import WiserClient
+
+
+class SoldGarmentCo2Runner:
+    def __init__(
+        self,
+        get_wiser_client: Callable[[], WiserClient],
+        *,
+        interval_seconds: float,
+        batch_size: int,
+    ) -> None:
+        # Resolved per batch, so the client can be swapped while running.
+        self._get_wiser_client = get_wiser_client
+        self.interval_seconds = interval_seconds
+        self.batch_size = max(int(batch_size), 1)
+        self._condition = Condition()
+        self._run_lock = Lock()
+        self._thread: Thread | None = None
+        self._triggered = False
+        self._stopping = False
+        self.running = False
+        self.processed = 0
+        self.failures = 0
+        self.last_error: str | None = None
+        self.last_run_started_at: float | None = None
+        self.last_run_finished_at: float | None = None
+
+    def trigger(self) -> None:
+        """Process pending garments in the background as soon as possible."""
+        with self._condition:
+            self._triggered = True
+            self._condition.notify()
+        self.start()
+
+    def start(self) -> None:
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = Thread(
+                target=self._run, name="sold-garment-co2", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def run_pending(self) -> int:
+        """Persist the CO2 of every pending sold garment; returns how many.
+
+        Garments that fail are skipped until the next run, so one of them
+        cannot hold up the rest.
+        """
+        with self._run_lock:
+            with self._condition:
+                self.running = True
+                self.last_run_started_at = time()
+            persisted = 0
+            after_id = None
+            try:
+                while not self._stopping:
+                    garments = db_get_sold_garments_for_co2(
+                        after_id=after_id, limit=self.batch_size
+                    )
+                    if not garments:
+                        break
+                    errors = refresh_sold_garment_co2_values(
+                        self._get_wiser_client(), garments
+                    )
+                    persisted += len(garments) - len(errors)
+                    with self._condition:
+                        self.processed += len(garments) - len(errors)
+                        self.failures += len(errors)
+                        if errors:
+                            self.last_error = str(next(iter(errors.values())))
+                    after_id = garments[-1]["id"]
+            finally:
+                with self._condition:
+                    self.running = False
+                    self.last_run_finished_at = time()
+            return persisted
+
+    def stats(self) -> dict[str, bool | int | float | str | None]:
+        with self._condition:
+            return {
+                "running": self.running,
+                "processed": self.processed,
+                "failures": self.failures,
+                "last_error": self.last_error,
+                "last_run_started_at": self.last_run_started_at,
+                "last_run_finished_at": self.last_run_finished_at,
+            }
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._triggered and not self._stopping:
+                    self._condition.wait(self.interval_seconds)
+                if self._stopping:
+                    return
+                self._triggered = False
+            try:
+                self.run_pending()
+            except Exception as error:
+                # E.g. the database being unavailable; retried on the next run.
+                with self._condition:
+                    self.last_error = str(error)
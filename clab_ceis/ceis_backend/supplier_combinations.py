@@ -0,0 +1,136 @@
+"""Pareto search over fabric x garment x finishing supplier combinations.
+
+A designer balance scenario depends on its suppliers only through two
+transport legs, fabric -> garment and garment -> finishing. Each objective
+of a combination ``(f, g, h)`` is a constant plus ``first_leg[f, g]`` plus
+``second_leg[g, h]``, given as ``(suppliers, suppliers, objectives)``
+arrays with NaN for legs without a known distance.
+
+Neither search enumerates all combinations:
+
+* a combination on the Pareto front needs both legs on the front of their
+  garment supplier's legs (a dominated leg gives a dominated sum), so only
+  pairs of those leg fronts are filtered;
+* the ``k`` lowest sums of one garment supplier come from the ``k`` lowest
+  first legs and the ``k`` lowest second legs.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+# Points compared at once when filtering; bounds the pairwise arrays.
+_CHUNK = 128
+
+
+def _dominated_by(dominators: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """Whether some row of ``dominators`` dominates each row of ``points``."""
+    if not len(dominators) or not len(points):
+        return np.zeros(len(points), dtype=bool)
+    # Column by column, so that only 2-D arrays are allocated.
+    no_worse = np.ones((len(dominators), len(points)), dtype=bool)
+    equal = np.ones_like(no_worse)
+    for column in range(points.shape[1]):
+        dominator, point = dominators[:, column, None], points[None, :, column]
+        no_worse &= dominator <= point
+        equal &= dominator == point
+    return (no_worse & ~equal).any(axis=0)
+
+
+def pareto_mask(points: np.ndarray) -> np.ndarray:
+    """Rows of ``points`` that no other row dominates, minimizing every column.
+
+    Equal rows do not dominate each other, so all of them are kept.
+    """
+    # In lexicographic order a point can only be dominated by earlier ones,
+    # so each chunk is checked against the front so far and itself.
+    order = np.lexsort(points.T[::-1])
+    keep = np.zeros(len(points), dtype=bool)
+    front = points[:0]
+    for start in range(0, len(order), _CHUNK):
+        indices = order[start : start + _CHUNK]
+        block = points[indices]
+        survivors = ~_dominated_by(front, block)
+        indices, block = indices[survivors], block[survivors]
+        survivors = ~_dominated_by(block, block)
+        keep[indices[survivors]] = True
+        front = np.concatenate([front, block[survivors]])
+    return keep
+
+
+def combination_objectives(
+    first_leg: np.ndarray, second_leg: np.ndarray, combinations: np.ndarray
+) -> np.ndarray:
+    """Summed leg objectives of ``(f, g, h)`` rows."""
+    fabric, garment, finishing = combinations.T
+    return first_leg[fabric, garment] + second_leg[garment, finishing]
+
+
+def count_combinations(first_leg: np.ndarray, second_leg: np.ndarray) -> int:
+    """Number of combinations with both legs known."""
+    first_known = np.isfinite(first_leg).all(axis=-1).sum(axis=0)
+    second_known = np.isfinite(second_leg).all(axis=-1).sum(axis=1)
+    return int(first_known @ second_known)
+
+
+def pareto_front(first_leg: np.ndarray, second_leg: np.ndarray) -> np.ndarray:
+    """``(f, g, h)`` rows of every Pareto-optimal combination."""
+    candidates = []
+    for garment in range(first_leg.shape[1]):
+        first = first_leg[:, garment]
+        second = second_leg[garment]
+        fabrics = np.flatnonzero(np.isfinite(first).all(axis=-1))
+        finishings = np.flatnonzero(np.isfinite(second).all(axis=-1))
+        if not len(fabrics) or not len(finishings):
+            continue
+        fabrics = fabrics[pareto_mask(first[fabrics])]
+        finishings = finishings[pareto_mask(second[finishings])]
+        candidates.append(
+            np.column_stack(
+                [
+                    np.repeat(fabrics, len(finishings)),
+                    np.full(len(fabrics) * len(finishings), garment),
+                    np.tile(finishings, len(fabrics)),
+                ]
+            )
+        )
+    if not candidates:
+        return np.empty((0, 3), dtype=np.int64)
+    candidates = np.concatenate(candidates)
+    return candidates[
+        pareto_mask(combination_objectives(first_leg, second_leg, candidates))
+    ]
+
+
+def top_combinations(
+    first_leg: np.ndarray, second_leg: np.ndarray, objective: int, k: int
+) -> np.ndarray:
+    """``(f, g, h)`` rows of the ``k`` lowest combinations in one objective.
+
+    Ties are broken by supplier order.
+    """
+    first = np.where(
+        np.isfinite(first_leg).all(axis=-1), first_leg[..., objective], np.inf
+    )
+    second = np.where(
+        np.isfinite(second_leg).all(axis=-1), second_leg[..., objective], np.inf
+    )
+    # (k, garments) best fabrics and (garments, k) best finishings.
+    fabrics = np.argsort(first, axis=0, kind="stable")[:k]
+    finishings = np.argsort(second, axis=1, kind="stable")[:, :k]
+    garments = np.arange(first.shape[1])
+    totals = (
+        first[fabrics, garments].T[:, :, None]
+        + np.take_along_axis(second, finishings, axis=1)[:, None, :]
+    )
+    candidates = np.column_stack(
+        [
+            np.broadcast_to(fabrics.T[:, :, None], totals.shape).ravel(),
+            np.broadcast_to(garments[:, None, None], totals.shape).ravel(),
+            np.broadcast_to(finishings[:, None, :], totals.shape).ravel(),
+        ]
+    )
+    totals = totals.ravel()
+    order = np.lexsort((candidates[:, 2], candidates[:, 1], candidates[:, 0], totals))
+    order = order[np.isfinite(totals[order])][:k]
+    return candidates[order]
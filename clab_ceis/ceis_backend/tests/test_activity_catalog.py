@@ -0,0 +1,135 @@
+import json
+import sqlite3
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ceis_backend.activity_catalog import (
+    import_activity_catalog,
+    record_activities,
+    search_activities,
+    search_local_activities,
+)
+from ceis_backend.db_connection import close_all_connections
+from ceis_backend.db_init import apply_schema_migrations, create_tables
+from ceis_backend.main import app
+from ceis_backend.wiser_bridge import WiserClientError
+
+WISER_COTTON = {
+    "id": 11,
+    "name": "textile production, cotton, woven",
+    "reference_product": "textile, woven cotton",
+    "location": {"code": "GLO"},
+}
+WISER_HEMP = {
+    "id": 12,
+    "name": "fibre production, hemp",
+    "reference_product": "hemp fibre",
+    "location": {"code": "RER"},
+}
+
+
+@pytest.fixture
+def catalog_db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conn = sqlite3.connect("ceis_backend.db")
+    cursor = conn.cursor()
+    create_tables(cursor)
+    apply_schema_migrations(cursor)
+    conn.commit()
+    conn.close()
+    yield tmp_path
+    close_all_connections()
+
+
+def test_local_search_ranks_name_matches_and_matches_prefixes(catalog_db):
+    record_activities(
+        [
+            {"id": 1, "name": "market for yarn", "reference_product": "cotton"},
+            {"id": 2, "name": "cotton spinning", "reference_product": "yarn"},
+            {"id": 3, "name": "polyester spinning", "reference_product": "yarn"},
+        ]
+    )
+
+    assert [r["id"] for r in search_local_activities("cott")] == [2, 1]
+    assert [r["id"] for r in search_local_activities("spin yar")] == [2, 3]
+    assert search_local_activities('"* OR') == []
+
+
+def test_search_falls_back_to_wiser_once_and_records_results(catalog_db):
+    wiser_client = MagicMock()
+    wiser_client.search_activities.return_value = [WISER_COTTON]
+
+    first = search_activities(wiser_client, "cotton")
+    second = search_activities(wiser_client, "Cotton ")
+
+    wiser_client.search_activities.assert_called_once_with("cotton")
+    expected = {
+        "id": 11,
+        "location": "GLO",
+        "name": "textile production, cotton, woven",
+        "reference_product": "textile, woven cotton",
+    }
+    assert first == [expected]
+    assert second == [expected]
+
+
+def test_search_skips_wiser_when_enough_local_results(catalog_db, monkeypatch):
+    monkeypatch.setattr(
+        "ceis_backend.activity_catalog.ACTIVITY_SEARCH_MIN_LOCAL_RESULTS", 1
+    )
+    record_activities([{"id": 12, "name": "fibre production, hemp"}])
+    wiser_client = MagicMock()
+
+    results = search_activities(wiser_client, "hemp")
+
+    wiser_client.search_activities.assert_not_called()
+    assert [r["id"] for r in results] == [12]
+
+
+def test_search_serves_local_results_when_wiser_is_offline(catalog_db):
+    record_activities([{"id": 12, "name": "fibre production, hemp"}])
+    wiser_client = MagicMock()
+    wiser_client.search_activities.side_effect = WiserClientError("offline")
+
+    assert [r["id"] for r in search_activities(wiser_client, "hemp")] == [12]
+    with pytest.raises(WiserClientError):
+        search_activities(wiser_client, "wool")
+
+
+def test_bulk_import_reads_csv_and_wiser_json(catalog_db):
+    csv_path = catalog_db / "activities.csv"
+    csv_path.write_text(
+        "Activity ID,Activity Name,Geography,Reference Product Name\n"
+        "21,wool production,AU,sheep fleece\n"
+        ",missing id,CH,ignored\n"
+    )
+    json_path = catalog_db / "activities.json"
+    json_path.write_text(json.dumps([WISER_HEMP]))
+
+    assert import_activity_catalog(csv_path) == 1
+    assert import_activity_catalog(json_path) == 1
+    assert search_local_activities("wool") == [
+        {
+            "id": 21,
+            "location": "AU",
+            "name": "wool production",
+            "reference_product": "sheep fleece",
+        }
+    ]
+    assert search_local_activities("hemp")[0]["location"] == "RER"
+
+
+def test_activity_search_endpoint_answers_from_catalog(catalog_db):
+    record_activities([{"id": 12, "name": "fibre production, hemp"}])
+    app.state.wiser_client = MagicMock()
+    app.state.wiser_client.search_activities.side_effect = WiserClientError("down")
+    client = TestClient(app)
+
+    response = client.post("/activity-search", json={"query": "hemp"})
+    failed = client.post("/activity-search", json={"query": "wool"})
+
+    assert response.status_code == 200
+    assert response.json()["results"][0]["id"] == 12
+    assert failed.status_code == 502
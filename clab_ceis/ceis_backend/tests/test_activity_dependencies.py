@@ -0,0 +1,120 @@
+import sqlite3
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ceis_backend.activity_dependencies import mark_sold_garments_stale
+from ceis_backend.db_connection import close_all_connections
+from ceis_backend.db_init import init_sqlite_db
+from ceis_backend.main import app
+from ceis_backend.queries import db_get_sold_garments_for_co2
+from ceis_backend.sold_garment_co2 import SoldGarmentCo2Runner
+from ceis_backend.utils import refresh_sold_garment_co2_values
+from ceis_backend.wiser_bridge import WiserClient
+
+
+@pytest.fixture
+def seeded_db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CEIS_DISABLE_DISTANCE_SYNC", "1")
+    init_sqlite_db()
+    conn = sqlite3.connect("ceis_backend.db")
+    activity_ids = dict(conn.execute("SELECT name, activity_id FROM materials"))
+    conn.close()
+    yield activity_ids
+    close_all_connections()
+
+
+def _sold_garments() -> dict[int, tuple[float | None, int]]:
+    conn = sqlite3.connect("ceis_backend.db")
+    rows = conn.execute(
+        "SELECT id, co2eq, co2_stale FROM garments_inventory WHERE sold = 1"
+    ).fetchall()
+    conn.close()
+    return {garment_id: (co2eq, stale) for garment_id, co2eq, stale in rows}
+
+
+def _sold_garments_using(material_name: str) -> set[int]:
+    conn = sqlite3.connect("ceis_backend.db")
+    rows = conn.execute(
+        """
+        SELECT DISTINCT fbi.garment_id
+        FROM fabric_blocks_inventory fbi
+        JOIN garments_inventory gi ON gi.id = fbi.garment_id
+        JOIN materials m ON m.id = fbi.material_id
+        WHERE gi.sold = 1 AND m.name = ?
+        """,
+        (material_name,),
+    ).fetchall()
+    conn.close()
+    return {row[0] for row in rows}
+
+
+def test_dependents_endpoint_lists_everything_using_an_activity(seeded_db):
+    client = TestClient(app)
+
+    cotton = client.get(f"/activities/{seeded_db['cotton']}/dependents").json()
+    unused = client.get("/activities/424242/dependents").json()
+
+    assert len(cotton["materials"]) == 1
+    assert cotton["process_types"] == []
+    assert cotton["garment_types"]
+    assert set(cotton["sold_garments"]) == _sold_garments_using("cotton")
+    assert unused == {
+        "materials": [],
+        "process_types": [],
+        "fabric_block_types": [],
+        "garment_types": [],
+        "sold_garments": [],
+    }
+
+
+def test_factor_change_only_recomputes_affected_sold_garments(seeded_db):
+    wiser_client = MagicMock()
+    wiser_client.get_emission_per_unit.side_effect = lambda activity_id: 0.5
+    runner = SoldGarmentCo2Runner(
+        lambda: wiser_client, interval_seconds=60, batch_size=10
+    )
+    runner.run_pending()
+    cotton_garments = _sold_garments_using("cotton")
+    before = _sold_garments()
+    assert cotton_garments and set(before) - cotton_garments
+
+    client = WiserClient(auth_url="https://auth.example", api_base_url="https://x")
+    client._cache_emission_per_unit(seeded_db["cotton"], 9.0)
+    client._cache_emission_per_unit(seeded_db["cotton"], 9.0)
+
+    stale = {garment_id for garment_id, (_, flag) in _sold_garments().items() if flag}
+    assert stale == cotton_garments
+
+    wiser_client.get_emission_per_unit.side_effect = lambda activity_id: 0.75
+    assert runner.run_pending() == len(cotton_garments)
+
+    after = _sold_garments()
+    assert all(stale == 0 for _, stale in after.values())
+    for garment_id in set(before) - cotton_garments:
+        assert after[garment_id] == before[garment_id]
+    for garment_id in cotton_garments:
+        assert after[garment_id][0] > before[garment_id][0]
+
+
+def test_change_during_recomputation_keeps_garment_stale(seeded_db):
+    cotton_garments = _sold_garments_using("cotton")
+    mark_sold_garments_stale([seeded_db["cotton"]])
+    wiser_client = MagicMock()
+
+    def _factor_changes_mid_run(activity_id):
+        mark_sold_garments_stale([seeded_db["cotton"]])
+        return 0.5
+
+    wiser_client.get_emission_per_unit.side_effect = _factor_changes_mid_run
+    pending = [
+        garment
+        for garment in db_get_sold_garments_for_co2()
+        if garment["id"] in cotton_garments
+    ]
+
+    assert refresh_sold_garment_co2_values(wiser_client, pending) == {}
+
+    assert all(_sold_garments()[garment_id][1] > 0 for garment_id in cotton_garments)
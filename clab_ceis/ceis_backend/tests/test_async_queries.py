@@ -0,0 +1,106 @@
+import asyncio
+from threading import Event
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from ceis_backend.async_queries import async_db
+from ceis_backend.db_connection import close_all_connections, get_connection
+from ceis_backend.db_init import init_sqlite_db
+from ceis_backend.main import app
+
+
+@pytest.fixture
+def seeded_db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CEIS_DISABLE_DISTANCE_SYNC", "1")
+    init_sqlite_db()
+    yield
+    async_db.close()
+    close_all_connections()
+
+
+def test_reads_are_served_while_a_write_holds_the_writer(seeded_db):
+    inserted, release = Event(), Event()
+
+    def slow_write():
+        with get_connection() as conn:
+            conn.execute("INSERT INTO locations (name) VALUES ('Depot')")
+            inserted.set()
+            release.wait(5)
+            conn.commit()
+
+    async def scenario():
+        write = asyncio.create_task(async_db.run_write(slow_write))
+        await asyncio.to_thread(inserted.wait, 5)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            responses = await asyncio.gather(
+                *(client.get("/locations") for _ in range(8)),
+                client.get("/fabric-blocks", params={"limit": 5}),
+            )
+            # Still open: the reads neither waited for it nor blocked the loop.
+            write_pending = not write.done()
+            release.set()
+            await write
+            after = await client.get("/locations")
+        return responses, write_pending, after
+
+    responses, write_pending, after = asyncio.run(scenario())
+
+    assert write_pending
+    assert all(response.status_code == 200 for response in responses)
+    assert "Depot" not in {location["name"] for location in responses[0].json()}
+    assert "Depot" in {location["name"] for location in after.json()}
+
+
+def test_fabric_block_endpoints_round_trip(seeded_db):
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            created = await client.post(
+                "/fabric-blocks",
+                json={
+                    "type_id": 1,
+                    "location_id": 1,
+                    "material_id": 1,
+                    "quality": 90,
+                    "processes": [],
+                },
+            )
+            listed = await client.get(
+                "/fabric-blocks", params={"after_id": created.json()["id"] - 1}
+            )
+            deleted = await client.delete(f"/fabric-blocks/{created.json()['id']}")
+            missing = await client.delete(f"/fabric-blocks/{created.json()['id']}")
+        return created, listed, deleted, missing
+
+    created, listed, deleted, missing = asyncio.run(scenario())
+
+    assert created.status_code == 200
+    assert [block["id"] for block in listed.json()] == [created.json()["id"]]
+    assert deleted.status_code == 200
+    assert missing.status_code == 404
+
+
+def test_scenarios_endpoint_reads_materials_synchronously(seeded_db):
+    wiser_client = MagicMock()
+    wiser_client.get_emission_per_unit.return_value = 0.5
+    app.state.wiser_client = wiser_client
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            return await client.get("/scenarios")
+
+    response = asyncio.run(scenario())
+
+    assert response.status_code == 200
+    assert response.json()
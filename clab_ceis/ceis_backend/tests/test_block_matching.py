@@ -0,0 +1,232 @@
+import itertools
+import random
+import sqlite3
+from unittest.mock import MagicMock
+
+import pytest
+
+from ceis_backend.block_matching import RecipeSlot, match_blocks, match_blocks_batch
+from ceis_backend.co2_result_cache import co2_result_cache
+from ceis_backend.db_connection import close_all_connections
+from ceis_backend.db_init import create_tables, init_sqlite_db
+from ceis_backend.queries import compile_garment_recipe
+from ceis_backend.second_life_allocator import second_life_allocator
+from ceis_backend.utils import (
+    calculate_used_fabric_block_alternative,
+    garment_recipe_slots,
+    get_co2_for_garment,
+)
+
+FACTORS = {7309: 100.0, 2001: 2.0, 2002: 0.25}
+
+
+def _wiser_client() -> MagicMock:
+    wiser_client = MagicMock()
+    wiser_client.get_emission_per_unit.side_effect = FACTORS.get
+    return wiser_client
+
+
+@pytest.fixture
+def inventory_db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conn = sqlite3.connect("ceis_backend.db")
+    cursor = conn.cursor()
+    create_tables(cursor)
+    cursor.executemany(
+        "INSERT INTO locations (name) VALUES (?)",
+        [("St. Gallen",), ("Sigmaringen",), ("Nowhere",)],
+    )
+    cursor.executemany(
+        "INSERT INTO materials (name, kg_per_sqm, activity_id) VALUES (?, ?, ?)",
+        [("hemp", 1.0, 1001), ("cotton", 1.0, 1002)],
+    )
+    cursor.executemany(
+        "INSERT INTO process_types (name, unit, activity_id) VALUES (?, ?, ?)",
+        [("washing", "kg", 2001), ("cutting", "kg", 2002)],
+    )
+    cursor.execute("INSERT INTO fabric_block_types (name, sqm) VALUES ('Block', 1)")
+    conn.commit()
+    second_life_allocator.invalidate()
+    yield conn
+    conn.close()
+    second_life_allocator.invalidate()
+    close_all_connections()
+
+
+def _insert_blocks(conn, blocks: list[tuple[int, int, float, list[tuple]]]) -> None:
+    """(location ID, material ID, quality, [(process ID, amount)]) per block."""
+    for location_id, material_id, quality, processes in blocks:
+        cursor = conn.execute(
+            """
+            INSERT INTO fabric_blocks_inventory (type_id, location_id, material_id, quality)
+            VALUES (1, ?, ?, ?)
+            """,
+            (location_id, material_id, quality),
+        )
+        conn.executemany(
+            """
+            INSERT INTO processes_fabric_blocks_inventory (process_id, amount, fabric_block_id)
+            VALUES (?, ?, ?)
+            """,
+            [
+                (process_id, amount, cursor.lastrowid)
+                for process_id, amount in processes
+            ],
+        )
+    conn.commit()
+
+
+def _ids(blocks) -> list[int | None]:
+    return [block.id if block else None for block in blocks]
+
+
+def test_garment_takes_the_lowest_emission_blocks_of_its_material(inventory_db):
+    _insert_blocks(
+        inventory_db,
+        [
+            (2, 1, 90, []),  # hemp from 112 km: 5.6 kg CO2eq at 0.5 kg
+            (1, 1, 90, [(1, 1.0)]),  # hemp from 10 km, washed: 2.5
+            (1, 1, 50, []),  # hemp from 10 km but below the quality: 0.5
+            (1, 2, 90, []),  # cotton from 10 km: 0.5
+            (1, 1, 95, []),  # hemp from 10 km: 0.5
+        ],
+    )
+    slot = RecipeSlot(type_id=1, weight_kg=0.5, material="hemp", min_quality=80)
+    wiser_client = _wiser_client()
+
+    assert _ids(match_blocks([slot] * 2, wiser_client)) == [5, 2]
+    assert _ids(match_blocks([slot] * 5, wiser_client)) == [5, 2, 1, 4, None]
+    assert _ids(match_blocks([RecipeSlot(1, 0.5, "hemp")] * 2, wiser_client)) == [3, 5]
+
+
+def _assignment_key(assignment, slots, blocks, wiser_client) -> tuple:
+    """Matched slots, then slots of their material, then less CO2."""
+    matched = materials = emission = 0
+    for slot, index in zip(slots, assignment):
+        if index is None:
+            continue
+        block = blocks[index]
+        assert block.quality >= slot.min_quality
+        matched += 1
+        materials += block.material == slot.material
+        emission += calculate_used_fabric_block_alternative(
+            wiser_client, block, slot.weight_kg
+        )["emission"]
+    return (matched, materials, -round(emission, 9))
+
+
+def test_batch_assignment_is_optimal_across_competing_garments(inventory_db):
+    rng = random.Random(18)
+    _insert_blocks(
+        inventory_db,
+        [
+            (
+                rng.choice([1, 2, 3]),
+                rng.choice([1, 2]),
+                rng.choice([60, 80, 100]),
+                [(rng.choice([1, 2]), rng.random()) for _ in range(rng.randint(0, 2))],
+            )
+            for _ in range(6)
+        ],
+    )
+    wiser_client = _wiser_client()
+    blocks = second_life_allocator.inventories([1])[1]
+    blocks = [blocks.block(index) for index in range(len(blocks))]
+
+    for _ in range(20):
+        garments = [
+            [
+                RecipeSlot(
+                    type_id=1,
+                    weight_kg=rng.choice([0.2, 1.5]),
+                    material=rng.choice(["hemp", "cotton"]),
+                    min_quality=rng.choice([0, 70, 90]),
+                )
+            ]
+            * rng.randint(1, 2)
+            for _ in range(rng.randint(2, 3))
+        ]
+        slots = [slot for garment in garments for slot in garment]
+        matched = [
+            block
+            for garment in match_blocks_batch(garments, wiser_client)
+            for block in garment
+        ]
+        matched_ids = [block.id for block in matched if block]
+        assert len(set(matched_ids)) == len(matched_ids)
+
+        best = max(
+            _assignment_key(assignment, slots, blocks, wiser_client)
+            for assignment in itertools.product(
+                [None, *range(len(blocks))], repeat=len(slots)
+            )
+            if len({index for index in assignment if index is not None})
+            == len([index for index in assignment if index is not None])
+            and all(
+                index is None or blocks[index].quality >= slot.min_quality
+                for slot, index in zip(slots, assignment)
+            )
+        )
+        found = [None if block is None else block.id - 1 for block in matched]
+        assert _assignment_key(found, slots, blocks, wiser_client) == best
+
+
+def _lowest_id_blocks(slots: list[RecipeSlot]) -> list:
+    """The former policy: the slot's material first, then the lowest free ID."""
+    inventories = second_life_allocator.inventories(slot.type_id for slot in slots)
+    used = set()
+    blocks = []
+    for slot in slots:
+        inventory = inventories[slot.type_id]
+        candidates = [
+            *inventory.by_material.get(slot.material, ()),
+            *range(len(inventory)),
+        ]
+        index = next((index for index in candidates if index not in used), None)
+        if index is not None:
+            used.add(index)
+        blocks.append(None if index is None else inventory.block(index))
+    return blocks
+
+
+def test_get_co2_for_garment_never_proposes_more_than_lowest_id_blocks(
+    tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CEIS_DISABLE_DISTANCE_SYNC", "1")
+    init_sqlite_db()
+    co2_result_cache.clear()
+    second_life_allocator.invalidate()
+    conn = sqlite3.connect("ceis_backend.db")
+    pairs = conn.execute(
+        "SELECT garment_type, material_id FROM garment_recipe_materials"
+    ).fetchall()
+    conn.close()
+    wiser_client = MagicMock()
+    wiser_client.get_emission_per_unit.side_effect = (
+        lambda activity_id: (activity_id % 7 + 1) / 10
+    )
+
+    try:
+        for garment_type_id, material_id in pairs:
+            recipe = compile_garment_recipe(garment_type_id, material_id)
+            slots = garment_recipe_slots(recipe)
+            result = get_co2_for_garment(garment_type_id, wiser_client, material_id)
+            lowest_id = _lowest_id_blocks(slots)
+
+            matched = sum(
+                detail["alternative"].get("emission", 0)
+                for detail in result.fabric_blocks.details
+            )
+            baseline = sum(
+                calculate_used_fabric_block_alternative(
+                    wiser_client, block, slot.weight_kg
+                )["emission"]
+                for slot, block in zip(slots, lowest_id)
+                if block is not None
+            )
+            assert matched <= baseline + 1e-9
+    finally:
+        co2_result_cache.clear()
+        second_life_allocator.invalidate()
+        close_all_connections()
@@ -0,0 +1,141 @@
+import sqlite3
+from unittest.mock import MagicMock
+
+import pytest
+
+from ceis_backend.co2_result_cache import Co2ResultCache, co2_result_cache
+from ceis_backend.db_connection import close_all_connections
+from ceis_backend.db_init import init_sqlite_db
+from ceis_backend.queries import (
+    db_create_fabric_block,
+    db_delete_fabric_block,
+    db_upsert_material,
+)
+from ceis_backend.utils import get_co2_for_garment
+from ceis_backend.wiser_bridge import WiserClient
+
+
+@pytest.fixture
+def trousers(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CEIS_DISABLE_DISTANCE_SYNC", "1")
+    init_sqlite_db()
+    conn = sqlite3.connect("ceis_backend.db")
+    garment_type_id, material_id, material_name = conn.execute(
+        """
+        SELECT gt.id, m.id, m.name
+        FROM garment_types gt
+        JOIN garment_recipe_materials grm ON grm.garment_type = gt.id
+        JOIN materials m ON m.id = grm.material_id
+        WHERE gt.name = 'Basic Trousers'
+        ORDER BY m.id
+        LIMIT 1
+        """
+    ).fetchone()
+    block_type_ids = {
+        name: type_id
+        for type_id, name in conn.execute("SELECT id, name FROM fabric_block_types")
+    }
+    conn.close()
+    co2_result_cache.clear()
+    yield {
+        "garment_type_id": garment_type_id,
+        "material_id": material_id,
+        "material_name": material_name,
+        "block_type_ids": block_type_ids,
+    }
+    co2_result_cache.clear()
+    close_all_connections()
+
+
+def _wiser_client() -> MagicMock:
+    wiser_client = MagicMock()
+    wiser_client.get_emission_per_unit.side_effect = lambda activity_id: 0.5
+    return wiser_client
+
+
+def test_repeated_calls_are_served_from_cache(trousers):
+    wiser_client = _wiser_client()
+    args = (trousers["garment_type_id"], wiser_client, trousers["material_id"])
+
+    first = get_co2_for_garment(*args)
+    lookups = wiser_client.get_emission_per_unit.call_count
+    second = get_co2_for_garment(*args)
+    second.fabric_blocks.details.clear()
+    third = get_co2_for_garment(*args)
+
+    assert wiser_client.get_emission_per_unit.call_count == lookups
+    assert third == first
+    assert get_co2_for_garment(args[0], _wiser_client(), args[2]) == first
+    stats = co2_result_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 2, 1)
+
+
+def test_inventory_writes_only_invalidate_garments_using_that_block_type(trousers):
+    wiser_client = _wiser_client()
+    args = (trousers["garment_type_id"], wiser_client, trousers["material_id"])
+    get_co2_for_garment(*args)
+
+    unused_type_id = trousers["block_type_ids"]["80x64"]
+    unused_block = db_create_fabric_block(unused_type_id, None, None, 90, [])
+    db_delete_fabric_block(unused_block["id"])
+    assert co2_result_cache.stats()["size"] == 1
+
+    db_create_fabric_block(
+        trousers["block_type_ids"]["20x15"], None, trousers["material_id"], 90, []
+    )
+    result = get_co2_for_garment(*args)
+
+    stats = co2_result_cache.stats()
+    assert stats["invalidations"] == 3
+    assert stats["invalidated_entries_by_source"] == {"fabric_blocks_inventory": 1}
+    assert any(detail["alternative"] for detail in result.fabric_blocks.details)
+
+
+def test_material_updates_and_emission_refreshes_invalidate(trousers):
+    wiser_client = _wiser_client()
+    args = (trousers["garment_type_id"], wiser_client, trousers["material_id"])
+    get_co2_for_garment(*args)
+
+    db_upsert_material("unrelated linen", 0.3, 4242)
+    assert co2_result_cache.stats()["size"] == 1
+    db_upsert_material(trousers["material_name"], 0.9, 4242)
+    assert co2_result_cache.stats()["size"] == 0
+
+    get_co2_for_garment(*args)
+    co2_result_cache.invalidate_activities([999999])
+    assert co2_result_cache.stats()["size"] == 1
+    client = WiserClient(auth_url="https://auth.example", api_base_url="https://x")
+    client._cache_emission_per_unit(4242, 1.0)
+    assert co2_result_cache.stats()["size"] == 1
+    client._cache_emission_per_unit(4242, 1.25)
+
+    assert co2_result_cache.stats()["invalidated_entries_by_source"] == {
+        "materials": 1,
+        "emission_factors": 1,
+    }
+
+
+def test_results_computed_across_an_invalidation_are_not_stored():
+    cache = Co2ResultCache(max_entries=1)
+    version = cache.version()
+    cache.invalidate("materials", [1])
+
+    assert not cache.put(1, 1, None, "stale", [("materials", 1)], [], version)
+    assert cache.put(1, 1, None, "fresh", [("materials", 1)], [], cache.version())
+    assert cache.put(
+        2, 1, None, "newer", [("process_types", None)], [], cache.version()
+    )
+    assert cache.get(1, 1, None) is None
+    assert cache.invalidate("process_types", [7]) == 1
+
+
+def test_activity_invalidations_without_entries_keep_concurrent_puts():
+    cache = Co2ResultCache(max_entries=4)
+    version = cache.version()
+    assert cache.invalidate_activities([4242]) == 0
+
+    assert cache.put(1, 1, None, "cold", [], [4242], version)
+    version = cache.version()
+    assert cache.invalidate_activities([4242]) == 1
+    assert not cache.put(2, 1, None, "stale", [], [4242], version)
@@ -0,0 +1,85 @@
+import sqlite3
+from threading import Thread
+
+import pytest
+
+from ceis_backend.db_connection import (
+    close_all_connections,
+    get_connection,
+    open_connection_count,
+)
+from ceis_backend.db_init import create_tables
+
+
+def test_reuses_connection_per_thread_with_wal_enabled(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    with get_connection() as first_conn:
+        journal_mode = first_conn.execute("PRAGMA journal_mode").fetchone()[0]
+    with get_connection() as second_conn:
+        pass
+
+    other_thread_conns = []
+
+    def _capture_connection() -> None:
+        with get_connection() as conn:
+            other_thread_conns.append(conn)
+
+    worker = Thread(target=_capture_connection)
+    worker.start()
+    worker.join()
+
+    assert journal_mode == "wal"
+    assert first_conn is second_conn
+    assert other_thread_conns[0] is not first_conn
+    close_all_connections()
+
+
+def test_rolls_back_uncommitted_writes_only_at_outermost_block(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with get_connection() as conn:
+        create_tables(conn.cursor())
+        conn.commit()
+
+    with get_connection() as conn:
+        conn.execute("INSERT INTO locations (name) VALUES ('Kept')")
+        with get_connection() as nested_conn:
+            nested_conn.execute("SELECT COUNT(*) FROM locations").fetchone()
+        assert conn.in_transaction
+        conn.commit()
+
+    try:
+        with get_connection() as conn:
+            conn.execute("INSERT INTO locations (name) VALUES ('Discarded')")
+            raise RuntimeError("abort before commit")
+    except RuntimeError:
+        pass
+
+    close_all_connections()
+    check_conn = sqlite3.connect("ceis_backend.db")
+    names = [row[0] for row in check_conn.execute("SELECT name FROM locations")]
+    check_conn.close()
+
+    assert names == ["Kept"]
+
+
+def test_closes_a_thread_connections_when_the_thread_ends(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with get_connection():
+        pass
+    open_before = open_connection_count()
+    worker_conns = []
+
+    def _capture_connection() -> None:
+        with get_connection() as conn:
+            worker_conns.append(conn)
+
+    for _ in range(20):
+        worker = Thread(target=_capture_connection)
+        worker.start()
+        worker.join()
+
+    assert open_connection_count() == open_before
+    with pytest.raises(sqlite3.ProgrammingError):
+        worker_conns[0].execute("SELECT 1")
+    close_all_connections()
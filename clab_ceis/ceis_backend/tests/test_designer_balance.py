@@ -4,6 +4,8 @@ from unittest.mock import MagicMock
 from fastapi.testclient import TestClient
 
 from ceis_backend.db_init import init_sqlite_db
+from ceis_backend.designer_balance import _scenario_context
+from ceis_backend.designer_reference_cache import designer_reference_cache
 from ceis_backend.main import app
 
 
@@ -212,6 +214,120 @@ def test_designer_balance_supplier_switch_changes_transport_balance(
     )
 
 
+def test_supplier_combinations_match_single_scenarios(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CEIS_DISABLE_DISTANCE_SYNC", "1")
+    init_sqlite_db()
+    _insert_manufacturer_data()
+    conn = sqlite3.connect("ceis_backend.db")
+    conn.executemany(
+        """
+        INSERT INTO manufacturers (company, role, role_group, location)
+        VALUES (?, ?, ?, ?)
+        """,
+        [
+            ("Stitch Co", "garment manufacturer", "garment", "Konstanz"),
+            ("Finish Two", "finishing", "finishing", "Lindau"),
+        ],
+    )
+    # Garment Works -> Finish Two stays unknown.
+    conn.executemany(
+        """
+        INSERT INTO manufacturer_distances (
+            source_company, source_role_group, source_location,
+            destination_company, destination_role_group, destination_location,
+            distance_km
+        )
+        VALUES (?, ?, '', ?, ?, '', ?)
+        """,
+        [
+            ("Fabric Alpha", "fabric", "Stitch Co", "garment", 40.0),
+            ("Fabric Beta", "fabric", "Stitch Co", "garment", 90.0),
+            ("Stitch Co", "garment", "Finish Lab", "finishing", 200.0),
+            ("Stitch Co", "garment", "Finish Two", "finishing", 10.0),
+        ],
+    )
+    conn.commit()
+    conn.close()
+    objectives = ("economic_total_chf", "co2eq_total_kg", "total_delay_days")
+
+    with TestClient(app) as client:
+        client.app.state.wiser_client = _build_mock_wiser_client(
+            {
+                276186: 8.0,
+                6756: 6.0,
+                6566: 1.0,
+                21893: 2.0,
+                7309: 0.2,
+                17901: 0.1,
+            }
+        )
+        basic_trousers = next(
+            garment
+            for garment in client.get("/garment-types").json()
+            if garment["name"] == "Basic Trousers"
+        )
+        response = client.get(
+            f"/designer-balance/{basic_trousers['id']}/supplier-combinations",
+            params={"top_k": 3},
+        )
+        rejected_top_k = [
+            client.get(
+                f"/designer-balance/{basic_trousers['id']}/supplier-combinations",
+                params={"top_k": top_k},
+            ).status_code
+            for top_k in (0, 51)
+        ]
+        scenarios = {}
+        for combination in [
+            ("Fabric Alpha", "Garment Works", "Finish Lab"),
+            ("Fabric Beta", "Garment Works", "Finish Lab"),
+            ("Fabric Alpha", "Stitch Co", "Finish Lab"),
+            ("Fabric Alpha", "Stitch Co", "Finish Two"),
+            ("Fabric Beta", "Stitch Co", "Finish Lab"),
+            ("Fabric Beta", "Stitch Co", "Finish Two"),
+        ]:
+            summary = client.get(
+                f"/designer-balance/{basic_trousers['id']}",
+                params=dict(
+                    zip(
+                        ["fabric_supplier", "garment_supplier", "finishing_supplier"],
+                        combination,
+                    )
+                ),
+            ).json()["summary"]
+            scenarios[combination] = tuple(summary[name] for name in objectives)
+
+    assert response.status_code == 200
+    assert rejected_top_k == [422, 422]
+    payload = response.json()
+    assert payload["evaluated_combinations"] == len(scenarios)
+
+    def combination(row):
+        return (
+            row["fabric_supplier"],
+            row["garment_supplier"],
+            row["finishing_supplier"],
+        )
+
+    for row in payload["pareto_front"] + [
+        row for rows in payload["top_k"].values() for row in rows
+    ]:
+        assert tuple(row[name] for name in objectives) == scenarios[combination(row)]
+    assert {combination(row) for row in payload["pareto_front"]} == {
+        key
+        for key, values in scenarios.items()
+        if not any(
+            all(a <= b for a, b in zip(other, values)) and other != values
+            for other in scenarios.values()
+        )
+    }
+    for index, name in enumerate(objectives):
+        assert [row[name] for row in payload["top_k"][name]] == sorted(
+            values[index] for values in scenarios.values()
+        )[:3]
+
+
 def test_designer_garment_reference_endpoint_returns_design_inputs(
     tmp_path, monkeypatch
 ):
@@ -258,3 +374,143 @@ def test_designer_garment_reference_endpoint_returns_design_inputs(
     assert hemp_block["block_process_cost_chf"] == 0.09
     assert hemp_block["co2eq_kg"] == 0.929
     assert hemp_block["processes"]
+
+
+def test_designer_garment_reference_is_versioned_and_refreshed_incrementally(
+    tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CEIS_DISABLE_DISTANCE_SYNC", "1")
+    init_sqlite_db()
+    emissions = {276186: 8.0, 6756: 6.0, 20936: 10.0, 6566: 1.0, 17901: 0.1}
+
+    def rebuilt() -> dict:
+        designer_reference_cache.clear()
+        return client.get("/designer-garment/reference").json()
+
+    with TestClient(app) as client:
+        client.app.state.wiser_client = _build_mock_wiser_client(emissions)
+        designer_reference_cache.clear()
+        first = client.get("/designer-garment/reference")
+        etag = first.headers["etag"]
+
+        unchanged = client.get(
+            "/designer-garment/reference", headers={"If-None-Match": etag}
+        )
+        assert unchanged.status_code == 304
+        assert unchanged.headers["etag"] == etag
+
+        client.post(
+            "/materials",
+            json={"name": "hemp", "kg_per_sqm": 0.5, "activity_id": 276186},
+        )
+        block_process = first.json()["fabric_block_types"][0]["processes"][0]
+        process_type = next(
+            row
+            for row in first.json()["process_types"]
+            if row["name"] == block_process["process"]
+        )
+        client.delete(f"/process-types/{process_type['id']}")
+        emissions[6756] = 3.0
+        designer_reference_cache.invalidate_activities([6756])
+
+        refreshed = client.get(
+            "/designer-garment/reference", headers={"If-None-Match": etag}
+        )
+        assert refreshed.status_code == 200
+        assert refreshed.headers["etag"] != etag
+        assert designer_reference_cache.stats()["builds"] == 1
+        assert designer_reference_cache.stats()["refreshes"] == 1
+        assert refreshed.json() == rebuilt()
+        assert refreshed.json() != first.json()
+
+
+def test_designer_balance_scenario_context_follows_catalog_changes(
+    tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CEIS_DISABLE_DISTANCE_SYNC", "1")
+    init_sqlite_db()
+    _insert_manufacturer_data()
+
+    with TestClient(app) as client:
+        client.app.state.wiser_client = _build_mock_wiser_client(
+            {276186: 8.0, 6756: 6.0, 6566: 1.0, 21893: 2.0}
+        )
+        garment_types = client.get("/garment-types").json()
+        url = f"/designer-balance/{garment_types[0]['id']}"
+
+        first = client.get(url).json()
+        context = _scenario_context()
+        assert client.get(url).json() == first
+        assert _scenario_context() is context
+
+        client.post(
+            "/process-types",
+            json={"name": "embroidery", "unit": "min", "activity_id": 6566},
+        )
+        second = client.get(url).json()
+
+    assert _scenario_context() is not context
+    assert [row["process_type"] for row in second["process_table"]] == [
+        row["process_type"] for row in first["process_table"]
+    ] + ["embroidery"]
+
+
+def test_material_sweep_matches_single_scenarios(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CEIS_DISABLE_DISTANCE_SYNC", "1")
+    init_sqlite_db()
+    _insert_manufacturer_data()
+    suppliers = {
+        "fabric_supplier": "Fabric Beta",
+        "garment_supplier": "Garment Works",
+        "finishing_supplier": "Finish Lab",
+    }
+
+    with TestClient(app) as client:
+        client.app.state.wiser_client = _build_mock_wiser_client(
+            {
+                276186: 8.0,
+                6756: 6.0,
+                20936: 10.0,
+                6566: 1.0,
+                21893: 2.0,
+                7309: 0.2,
+                17901: 0.1,
+            }
+        )
+        basic_trousers = next(
+            garment
+            for garment in client.get("/garment-types").json()
+            if garment["name"] == "Basic Trousers"
+        )
+        url = f"/designer-balance/{basic_trousers['id']}"
+        materials = client.get(
+            f"/garment-types/{basic_trousers['id']}/materials"
+        ).json()
+        assert len(materials) > 1
+
+        sweep = client.get(f"{url}/material-sweep", params=suppliers).json()
+        scenarios = [
+            client.get(url, params={**suppliers, "material_id": material["id"]}).json()
+            for material in materials
+        ]
+        reversed_ids = [material["id"] for material in reversed(materials)]
+        explicit = client.get(
+            f"{url}/material-sweep", params={"material_id": reversed_ids}
+        ).json()
+        unknown = client.get(f"{url}/material-sweep", params={"material_id": [-1]})
+
+    assert sweep["selection"] == scenarios[0]["selection"]
+    assert [leg["distance_km"] for leg in sweep["supply_chain"]["legs"]] == [
+        leg["distance_km"] for leg in scenarios[0]["supply_chain"]["legs"]
+    ]
+    assert [row["material"] for row in sweep["materials"]] == [
+        scenario["material"] for scenario in scenarios
+    ]
+    for row, scenario in zip(sweep["materials"], scenarios):
+        assert row["summary"] == scenario["summary"]
+        assert row["process_table"] == scenario["process_table"]
+    assert [row["material"]["id"] for row in explicit["materials"]] == reversed_ids
+    assert unknown.status_code == 400
@@ -0,0 +1,57 @@
+import sqlite3
+
+import numpy as np
+
+from ceis_backend.db_connection import close_all_connections
+from ceis_backend.db_init import create_tables
+from ceis_backend.distance_matrix import manufacturer_distance_matrix
+
+
+def _insert_distances(db_path: str, distances: list[tuple[str, str, float]]) -> None:
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO manufacturer_distances (
+            source_company, source_role_group, source_location,
+            destination_company, destination_role_group, destination_location,
+            distance_km
+        )
+        VALUES (?, 'fabric', '', ?, 'garment', '', ?)
+        """,
+        distances,
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_matrix_answers_single_and_vectorized_lookups_from_one_load(tmp_path):
+    db_path = str(tmp_path / "ceis_backend.db")
+    conn = sqlite3.connect(db_path)
+    create_tables(conn.cursor())
+    conn.commit()
+    conn.close()
+    _insert_distances(db_path, [("A", "B", 10.0), ("A", "C", 20.0), ("B", "C", 5.5)])
+
+    try:
+        loads = manufacturer_distance_matrix.loads
+        matrix = manufacturer_distance_matrix.matrix(db_path)
+        assert manufacturer_distance_matrix.matrix(db_path) is matrix
+        assert manufacturer_distance_matrix.loads == loads + 1
+
+        assert matrix.get("A", "C") == 20.0
+        assert matrix.get("C", "A") is None
+        assert matrix.get("A", "Nowhere") is None
+        np.testing.assert_array_equal(
+            matrix.grid(["A", "X", "B"], ["B", "C", "Y"]),
+            [[10.0, 20.0, np.nan], [np.nan] * 3, [np.nan, 5.5, np.nan]],
+        )
+
+        # Rows written behind the matrix's back only show up after a reload.
+        _insert_distances(db_path, [("C", "A", 7.0)])
+        assert manufacturer_distance_matrix.matrix(db_path).get("C", "A") is None
+        reloaded = manufacturer_distance_matrix.reload(db_path)
+        assert manufacturer_distance_matrix.matrix(db_path) is reloaded
+        assert reloaded.get("C", "A") == 7.0
+        assert matrix.get("C", "A") is None
+    finally:
+        close_all_connections()
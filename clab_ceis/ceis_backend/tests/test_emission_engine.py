@@ -0,0 +1,114 @@
+import sqlite3
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ceis_backend.db_connection import close_all_connections
+from ceis_backend.db_init import init_sqlite_db
+from ceis_backend.emission_engine import (
+    GARMENT_CATEGORIES,
+    compile_emission_engine,
+    get_emission_engine,
+)
+from ceis_backend.main import app
+from ceis_backend.utils import get_co2_for_garment
+
+EMISSIONS_BY_ACTIVITY = {
+    276186: 8.123,
+    6756: 6.7,
+    20936: 10.01,
+    6566: 1.3,
+    21893: None,
+    17901: 0.1111,
+    7309: 0.077,
+}
+
+
+def _build_mock_wiser_client() -> MagicMock:
+    wiser_client = MagicMock()
+    wiser_client.get_emission_per_unit.side_effect = (
+        lambda activity_id: EMISSIONS_BY_ACTIVITY.get(activity_id, 0.37)
+    )
+    return wiser_client
+
+
+@pytest.fixture
+def seeded_db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CEIS_DISABLE_DISTANCE_SYNC", "1")
+    init_sqlite_db()
+    conn = sqlite3.connect("ceis_backend.db")
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO manufacturer_distances (
+            source_company, source_role_group, source_location,
+            destination_company, destination_role_group, destination_location,
+            distance_km
+        )
+        VALUES ('Okutex', 'fabric', 'Okutex', 'Takli Textil', 'garment', 'Takli', 412.5)
+        """
+    )
+    conn.commit()
+    conn.close()
+    close_all_connections()
+    yield tmp_path
+    close_all_connections()
+
+
+def test_engine_matches_per_garment_calculation_for_every_pair(seeded_db):
+    wiser_client = _build_mock_wiser_client()
+    engine = compile_emission_engine()
+    factors, missing = engine.resolve_factors(wiser_client)
+
+    totals = engine.garment_totals(factors)
+
+    assert len(totals) == len(engine.garment_keys) > 1
+    assert missing.any()
+    for row in totals:
+        expected = get_co2_for_garment(
+            row["garment_type_id"], wiser_client, row["material_id"]
+        )
+        assert row["fabric_blocks_emission"] == pytest.approx(
+            expected.fabric_blocks.total_emission, rel=1e-12
+        )
+        assert row["processes_emission"] == pytest.approx(
+            expected.processes.total_emission, rel=1e-12
+        )
+        assert set(row["categories"]) == set(GARMENT_CATEGORIES)
+        assert row["categories"]["supply_chain_transport"] > 0
+
+
+def test_leaderboard_and_totals_endpoints_are_served_from_engine(seeded_db):
+    app.state.wiser_client = _build_mock_wiser_client()
+    client = TestClient(app)
+
+    leaderboard = client.get("/co2/leaderboard").json()
+    top_two = client.get("/co2/leaderboard", params={"limit": 2}).json()
+    garment_type_id = leaderboard[0]["garment_type_id"]
+    garment_totals = client.get(f"/co2/{garment_type_id}/totals").json()
+
+    emissions = [row["total_emission"] for row in leaderboard]
+    assert emissions == sorted(emissions)
+    assert top_two == leaderboard[:2]
+    assert garment_totals
+    assert {row["garment_type_id"] for row in garment_totals} == {garment_type_id}
+    assert client.get("/co2/9999/totals").status_code == 404
+    assert client.get("/co2/leaderboard", params={"limit": 0}).status_code == 400
+
+
+def test_engine_is_compiled_once_per_catalog_version(seeded_db):
+    app.state.wiser_client = _build_mock_wiser_client()
+    client = TestClient(app)
+
+    leaderboard = client.get("/co2/leaderboard").json()
+    engine = get_emission_engine()
+    assert client.get("/co2/leaderboard").json() == leaderboard
+    assert get_emission_engine() is engine
+
+    garment_type_id = leaderboard[0]["garment_type_id"]
+    assert client.delete(f"/garment-recipes/{garment_type_id}").status_code == 200
+    rebuilt = client.get("/co2/leaderboard").json()
+
+    assert get_emission_engine() is not engine
+    assert garment_type_id not in {row["garment_type_id"] for row in rebuilt}
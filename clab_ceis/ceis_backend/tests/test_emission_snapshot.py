@@ -0,0 +1,129 @@
+import json
+import sqlite3
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ceis_backend.co2_result_cache import co2_result_cache
+from ceis_backend.data.location_details import (
+    ACTIVITY_ID_LONG_DISTANCE_TRANSPORT,
+    ACTIVITY_ID_TRANSPORT,
+)
+from ceis_backend.db_connection import close_all_connections
+from ceis_backend.db_init import apply_schema_migrations, create_tables
+from ceis_backend.emission_snapshot import (
+    ecoinvent_version,
+    main,
+    warm_emission_cache,
+)
+from ceis_backend.main import app
+
+
+@pytest.fixture
+def cache_db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conn = sqlite3.connect("ceis_backend.db")
+    cursor = conn.cursor()
+    create_tables(cursor)
+    apply_schema_migrations(cursor)
+    conn.executemany(
+        """
+        INSERT INTO activity_emission_cache
+            (activity_id, emission_per_unit, cached_at)
+        VALUES (?, ?, ?)
+        """,
+        [(1001, 2.5, 100.0), (1002, None, 200.0)],
+    )
+    conn.execute(
+        "INSERT INTO materials (name, kg_per_sqm, activity_id) VALUES ('hemp', 0.2, 3001)"
+    )
+    conn.commit()
+    conn.close()
+    yield tmp_path
+    close_all_connections()
+
+
+def _cached_rows() -> list[tuple]:
+    close_all_connections()
+    conn = sqlite3.connect("ceis_backend.db")
+    rows = conn.execute(
+        "SELECT activity_id, emission_per_unit, cached_at FROM activity_emission_cache"
+        " ORDER BY activity_id"
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+def test_cli_round_trips_snapshot_into_fresh_database(cache_db, tmp_path, monkeypatch):
+    snapshot_path = tmp_path / "snapshot.json"
+    main(["export", str(snapshot_path)])
+    snapshot = json.loads(snapshot_path.read_text())
+
+    fresh_dir = tmp_path / "fresh"
+    fresh_dir.mkdir()
+    monkeypatch.chdir(fresh_dir)
+    main(["import", str(snapshot_path)])
+
+    assert snapshot["ecoinvent_version"] == ecoinvent_version()
+    assert _cached_rows() == [(1001, 2.5, 100.0), (1002, None, 200.0)]
+
+
+def test_api_import_keeps_newer_entries_and_rejects_other_versions(
+    cache_db, monkeypatch
+):
+    client = TestClient(app)
+    app.state.wiser_client = MagicMock()
+    # The in-memory factors must be gone before CO2 results are recomputed.
+    calls = []
+    app.state.wiser_client.clear_emission_memory_cache.side_effect = (
+        lambda: calls.append("memory factors")
+    )
+    monkeypatch.setattr(
+        co2_result_cache,
+        "invalidate_activities",
+        lambda activity_ids: calls.append("co2 results"),
+    )
+
+    exported = client.get("/emission-snapshot").json()
+    exported["emissions"] = [[1001, 9.0, 50.0], [1003, 1.5, 300.0]]
+    response = client.post("/emission-snapshot", json=exported)
+
+    other_version = {**exported, "ecoinvent_version": "3.9-cutoff"}
+    rejected = client.post("/emission-snapshot", json=other_version)
+
+    assert response.status_code == 200
+    assert response.json() == {"imported": 2}
+    assert rejected.status_code == 409
+    assert calls == ["memory factors", "co2 results"]
+    assert _cached_rows() == [
+        (1001, 2.5, 100.0),
+        (1002, None, 200.0),
+        (1003, 1.5, 300.0),
+    ]
+
+
+def test_warm_up_loads_snapshot_and_prefetches_referenced_activities(
+    cache_db, tmp_path, monkeypatch
+):
+    snapshot_path = tmp_path / "snapshot.json"
+    snapshot_path.write_text(
+        json.dumps(
+            {
+                "format_version": 1,
+                "ecoinvent_version": ecoinvent_version(),
+                "exported_at": 0,
+                "emissions": [[1004, 0.5, 400.0]],
+            }
+        )
+    )
+    monkeypatch.delenv("PYTEST_CURRENT_TEST", raising=False)
+    wiser_client = MagicMock()
+
+    warm_emission_cache(wiser_client, snapshot_path)
+
+    (activity_ids,) = wiser_client.get_emissions_per_unit.call_args.args
+    assert activity_ids == sorted(
+        {3001, ACTIVITY_ID_TRANSPORT, ACTIVITY_ID_LONG_DISTANCE_TRANSPORT}
+    )
+    assert (1004, 0.5, 400.0) in _cached_rows()
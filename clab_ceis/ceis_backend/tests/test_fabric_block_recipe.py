@@ -3,13 +3,19 @@ from unittest.mock import MagicMock
 
 import pytest
 
+from ceis_backend.db_connection import get_connection
 from ceis_backend.db_init import init_sqlite_db, create_tables
 from ceis_backend.utils import get_co2_for_garment, get_co2_for_sold_garment
-from ceis_backend.queries import get_fabric_block_recipe, get_used_fabric_block
+from ceis_backend.queries import (
+    compile_garment_recipe,
+    get_fabric_block_recipe,
+)
+from ceis_backend.block_matching import RecipeSlot, match_blocks
 from ceis_backend.models import Process
 from ceis_backend.main import delete_fabric_block_type
 from fastapi.testclient import TestClient
 from ceis_backend.main import app
+from ceis_backend.wiser_bridge import WiserClientError
 
 
 @pytest.fixture
@@ -151,8 +157,13 @@ class TestStrategistProgress:
                 }
             )
 
+            pending_response = client.get("/strategy-progress")
+            client.app.state.sold_garment_co2_runner.run_pending()
             response = client.get("/strategy-progress")
 
+            pending = pending_response.json()["co2_refresh"]
+            assert pending["pending_garments"] >= 3
+            assert pending["status"] == f"{pending['pending_garments']} garments pending"
             assert response.status_code == 200
             payload = response.json()
             assert payload["thresholds"]["circularity_pct"] == 30.0
@@ -161,6 +172,8 @@ class TestStrategistProgress:
             assert payload["aggregates"]["fabric_saved_pct"] > 0
             assert payload["aggregates"]["environmental_cost_co2eq"] > 0
             assert payload["aggregates"]["second_life_fabric_blocks_sold"] == 4
+            assert payload["aggregates"]["co2_pending_garments"] == 0
+            assert payload["co2_refresh"]["failures"] == 0
             assert len(payload["sold_garments"]) >= 3
 
         conn = sqlite3.connect("ceis_backend.db")
@@ -185,6 +198,9 @@ class TestStrategistProgress:
             )
             first_response = client.get("/strategy-progress")
             assert first_response.status_code == 200
+            runner = client.app.state.sold_garment_co2_runner
+            runner.run_pending()
+            assert runner.processed >= 3
 
             def _fail_if_called(_activity_id):
                 raise AssertionError("CO2 should not be recalculated once persisted")
@@ -195,6 +211,8 @@ class TestStrategistProgress:
 
             second_response = client.get("/strategy-progress")
             assert second_response.status_code == 200
+            assert runner.run_pending() == 0
+            assert runner.stats()["failures"] == 0
 
     def test_sold_garment_co2_includes_recipe_and_inventory_processes(self, clean_db):
         conn = sqlite3.connect("ceis_backend.db")
@@ -376,8 +394,9 @@ class TestUsedFabricBlockSelection:
         conn.commit()
         conn.close()
 
-        selected = get_used_fabric_block(
-            "PriorityBlock", already_used_ids=[], preferred_material="hemp"
+        (selected,) = match_blocks(
+            [RecipeSlot(fabric_block_type_id, 1.0, "hemp")],
+            _build_mock_wiser_client({}),
         )
 
         assert selected is not None
@@ -443,8 +462,9 @@ class TestUsedFabricBlockSelection:
         conn.commit()
         conn.close()
 
-        selected = get_used_fabric_block(
-            "AssignedBlock", already_used_ids=[], preferred_material="cotton"
+        (selected,) = match_blocks(
+            [RecipeSlot(fabric_block_type_id, 1.0, "cotton")],
+            _build_mock_wiser_client({}),
         )
 
         assert selected is not None
@@ -855,6 +875,109 @@ class TestGetFabricBlocksWithLocation:
         assert block_without_location["location"] is None
 
 
+class TestGetFabricBlocksPagingAndFilters:
+    """Test case: get_fabric_blocks pages by ID and filters in SQL."""
+
+    @pytest.fixture
+    def inventory(self, clean_db):
+        conn = sqlite3.connect("ceis_backend.db")
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO fabric_block_types (name, sqm) VALUES ('80x64', 0.5)")
+        type_id = cursor.lastrowid
+        cursor.execute("INSERT INTO materials (name, kg_per_sqm, activity_id) VALUES ('cotton', 0.2, 1)")
+        cotton_id = cursor.lastrowid
+        cursor.execute("INSERT INTO materials (name, kg_per_sqm, activity_id) VALUES ('wool', 0.3, 2)")
+        wool_id = cursor.lastrowid
+        cursor.execute("INSERT INTO locations (name) VALUES ('Dornbirn')")
+        location_id = cursor.lastrowid
+        cursor.execute("INSERT INTO process_types (name, activity_id) VALUES ('sewing', 3)")
+        sewing_id = cursor.lastrowid
+        cursor.execute("INSERT INTO process_types (name, activity_id) VALUES ('cutting', 4)")
+        cutting_id = cursor.lastrowid
+
+        block_ids = []
+        for material_id, quality in [
+            (cotton_id, 1.0),
+            (wool_id, 0.5),
+            (cotton_id, 0.8),
+            (cotton_id, 0.2),
+        ]:
+            cursor.execute(
+                """
+                INSERT INTO fabric_blocks_inventory
+                    (type_id, material_id, location_id, quality)
+                VALUES (?, ?, ?, ?)
+                """,
+                (type_id, material_id, location_id, quality),
+            )
+            block_ids.append(cursor.lastrowid)
+        cursor.executemany(
+            """
+            INSERT INTO processes_fabric_blocks_inventory
+                (fabric_block_id, process_id, amount)
+            VALUES (?, ?, ?)
+            """,
+            [
+                (block_ids[0], sewing_id, 0.5),
+                (block_ids[0], cutting_id, 1.0),
+                (block_ids[2], sewing_id, 0.25),
+            ],
+        )
+        conn.commit()
+        conn.close()
+        return {"block_ids": block_ids, "cotton_id": cotton_id}
+
+    def test_pages_through_inventory_by_id(self, inventory):
+        client = TestClient(app)
+        block_ids = inventory["block_ids"]
+
+        first_page = client.get("/fabric-blocks", params={"limit": 2}).json()
+        second_page = client.get(
+            "/fabric-blocks",
+            params={"limit": 2, "after_id": first_page[-1]["id"]},
+        ).json()
+
+        assert [fb["id"] for fb in first_page] == block_ids[:2]
+        assert [fb["id"] for fb in second_page] == block_ids[2:]
+        assert first_page[0]["processes"] == [
+            {"type": "sewing", "amount": 0.5},
+            {"type": "cutting", "amount": 1.0},
+        ]
+        assert first_page[1]["processes"] == []
+        assert second_page[0]["processes"] == [{"type": "sewing", "amount": 0.25}]
+
+    def test_filters_by_material_and_quality_range(self, inventory):
+        client = TestClient(app)
+        block_ids = inventory["block_ids"]
+
+        response = client.get(
+            "/fabric-blocks",
+            params={
+                "material_id": inventory["cotton_id"],
+                "min_quality": 0.5,
+                "max_quality": 0.9,
+            },
+        )
+
+        assert response.status_code == 200
+        fabric_blocks = response.json()
+        assert [fb["id"] for fb in fabric_blocks] == [block_ids[2]]
+        assert fabric_blocks[0]["material"] == "cotton"
+        assert fabric_blocks[0]["location"] == "Dornbirn"
+        assert fabric_blocks[0]["type"] == "80x64"
+
+    def test_rejects_invalid_page_and_quality_range(self, inventory):
+        client = TestClient(app)
+
+        assert client.get("/fabric-blocks", params={"limit": 0}).status_code == 400
+        assert (
+            client.get(
+                "/fabric-blocks", params={"min_quality": 0.9, "max_quality": 0.1}
+            ).status_code
+            == 400
+        )
+
+
 class TestGetCo2TransportEmissions:
     """Test case: get_co2 calculates transport_emission based on location."""
 
@@ -1618,3 +1741,200 @@ class TestGetCo2FabricBlockProductionEmissions:
         fb_details = result.fabric_blocks.details[0]
         expected_production_emission = (0.4 * 2.0) + (0.1 * 5.0)
         assert fb_details["production_emission"] == expected_production_emission
+
+
+class TestCompiledGarmentRecipe:
+    """Test case: garment recipes are compiled once and scaled by quantity."""
+
+    @pytest.fixture
+    def recipe_db(self, clean_db):
+        conn = sqlite3.connect(clean_db)
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO garment_types (name, price_chf) VALUES ('Shirt', 10.0)"
+        )
+        garment_id = cursor.lastrowid
+        cursor.execute(
+            "INSERT INTO materials (name, kg_per_sqm, activity_id) VALUES ('cotton', 0.5, 1001)"
+        )
+        material_id = cursor.lastrowid
+        cursor.execute(
+            "INSERT INTO garment_recipe_materials (garment_type, material_id) VALUES (?, ?)",
+            (garment_id, material_id),
+        )
+        cursor.execute(
+            "INSERT INTO process_types (name, unit, activity_id) VALUES ('dyeing', 'L', 2001)"
+        )
+        process_id = cursor.lastrowid
+        fb_type_ids = []
+        for name, sqm, amount in [("Front", 1.0, 2), ("Sleeve", 0.5, 3)]:
+            cursor.execute(
+                "INSERT INTO fabric_block_types (name, sqm) VALUES (?, ?)",
+                (name, sqm),
+            )
+            fb_type_ids.append(cursor.lastrowid)
+            cursor.execute(
+                "INSERT INTO garment_recipe_fabric_blocks (garment_type, fabric_block_id, amount) VALUES (?, ?, ?)",
+                (garment_id, cursor.lastrowid, amount),
+            )
+            cursor.execute(
+                "INSERT INTO fabric_block_recipe_processes (fabric_block_type, process_id, amount) VALUES (?, ?, ?)",
+                (fb_type_ids[-1], process_id, 2.0),
+            )
+        # Two second-life Front blocks, one for each copy in the recipe.
+        cursor.executemany(
+            "INSERT INTO fabric_blocks_inventory (type_id, material_id) VALUES (?, ?)",
+            [(fb_type_ids[0], material_id), (fb_type_ids[0], material_id)],
+        )
+        conn.commit()
+        conn.close()
+        return {"garment_id": garment_id, "material_id": material_id}
+
+    def test_compiles_recipe_with_quantities_in_fixed_queries(self, recipe_db):
+        statements = []
+        with get_connection() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                recipe = compile_garment_recipe(
+                    recipe_db["garment_id"], recipe_db["material_id"]
+                )
+            finally:
+                conn.set_trace_callback(None)
+
+        assert [
+            (entry.fabric_block.name, entry.quantity) for entry in recipe.fabric_blocks
+        ] == [("Front", 2), ("Sleeve", 3)]
+        assert recipe.fabric_blocks[1].fabric_block.weight_kg == 0.25
+        assert recipe.fabric_blocks[1].fabric_block.processes[0].name == "dyeing"
+        assert len([s for s in statements if s.lstrip().startswith("SELECT")]) == 4
+
+    def test_co2_computes_each_block_once_and_scales_by_quantity(self, recipe_db):
+        wiser_client = _build_mock_wiser_client({1001: 2.0, 2001: 0.5})
+
+        result = get_co2_for_garment(
+            recipe_db["garment_id"], wiser_client, recipe_db["material_id"]
+        )
+
+        material_calls = [
+            call
+            for call in wiser_client.get_emission_per_unit.call_args_list
+            if call.args == (1001,)
+        ]
+        assert len(material_calls) == 2
+        details = result.fabric_blocks.details
+        assert [detail["fabric_block"] for detail in details] == [
+            "Front",
+            "Front",
+            "Sleeve",
+            "Sleeve",
+            "Sleeve",
+        ]
+        assert details[0]["alternative"]["id"] != details[1]["alternative"]["id"]
+        assert details[2]["alternative"] == {}
+        assert result.fabric_blocks.total_emission == pytest.approx(
+            sum(detail["emission"] for detail in details)
+        )
+
+    def test_co2_prefetches_all_recipe_activities_in_one_batch(self, recipe_db):
+        wiser_client = _build_mock_wiser_client({1001: 2.0, 2001: 0.5})
+
+        get_co2_for_garment(
+            recipe_db["garment_id"], wiser_client, recipe_db["material_id"]
+        )
+
+        wiser_client.get_emissions_per_unit.assert_called_once()
+        (activity_ids,) = wiser_client.get_emissions_per_unit.call_args.args
+        assert {1001, 2001, 7309, 17901} <= set(activity_ids)
+
+    def test_co2_batch_shares_one_prefetch_and_reports_per_item_errors(self, recipe_db):
+        wiser_client = _build_mock_wiser_client({1001: 2.0, 2001: 0.5})
+        app.state.wiser_client = wiser_client
+        garment_id, material_id = recipe_db["garment_id"], recipe_db["material_id"]
+
+        response = TestClient(app).post(
+            "/co2/batch",
+            json={
+                "items": [
+                    {"garment_type_id": garment_id, "material_id": material_id},
+                    {"garment_type_id": garment_id, "material_id": 9999},
+                    {"garment_type_id": 9999, "material_id": material_id},
+                ]
+            },
+        )
+
+        assert response.status_code == 200
+        ok, invalid_material, unknown_garment = response.json()
+        wiser_client.get_emissions_per_unit.assert_called_once()
+        expected = get_co2_for_garment(
+            garment_id,
+            _build_mock_wiser_client({1001: 2.0, 2001: 0.5}),
+            material_id,
+        )
+        assert ok["error"] is None
+        assert ok["result"] == expected.model_dump()
+        assert invalid_material == {
+            "garment_type_id": garment_id,
+            "material_id": 9999,
+            "result": None,
+            "error": {"status_code": 400, "detail": "Invalid material"},
+        }
+        assert unknown_garment["error"]["status_code"] == 404
+        assert TestClient(app).post("/co2/batch", json={"items": []}).status_code == 400
+
+    def test_co2_batch_reports_a_failing_factor_only_for_its_pair(self, recipe_db):
+        conn = sqlite3.connect("ceis_backend.db")
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO materials (name, kg_per_sqm, activity_id) VALUES ('silk', 0.2, 1002)"
+        )
+        silk_id = cursor.lastrowid
+        cursor.execute(
+            "INSERT INTO garment_recipe_materials (garment_type, material_id) VALUES (?, ?)",
+            (recipe_db["garment_id"], silk_id),
+        )
+        conn.commit()
+        conn.close()
+        emissions = {1001: 2.0, 2001: 0.5}
+
+        def get_emission_per_unit(activity_id):
+            if activity_id == 1002:
+                raise WiserClientError("activity 1002 unavailable")
+            return emissions.get(activity_id)
+
+        wiser_client = MagicMock()
+        wiser_client.get_emission_per_unit.side_effect = get_emission_per_unit
+        wiser_client.get_emissions_per_unit.side_effect = WiserClientError(
+            "activity 1002 unavailable"
+        )
+        app.state.wiser_client = wiser_client
+        garment_id = recipe_db["garment_id"]
+
+        response = TestClient(app).post(
+            "/co2/batch",
+            json={
+                "items": [
+                    {"garment_type_id": garment_id, "material_id": silk_id},
+                    {
+                        "garment_type_id": garment_id,
+                        "material_id": recipe_db["material_id"],
+                    },
+                ]
+            },
+        )
+
+        assert response.status_code == 200
+        silk, cotton = response.json()
+        assert silk["result"] is None
+        assert silk["error"] == {
+            "status_code": 502,
+            "detail": "activity 1002 unavailable",
+        }
+        assert cotton["error"] is None
+        assert (
+            cotton["result"]
+            == get_co2_for_garment(
+                garment_id,
+                _build_mock_wiser_client(emissions),
+                recipe_db["material_id"],
+            ).model_dump()
+        )
@@ -1,8 +1,11 @@
 import sqlite3
 from unittest.mock import MagicMock, patch
 
+import pytest
+
 from ceis_backend.db_init import create_tables
 from ceis_backend import manufacturer_distance_sync as sync
+from ceis_backend.distance_matrix import manufacturer_distance_matrix
 
 
 def _init_db(db_path: str) -> None:
@@ -27,6 +30,7 @@ def test_sync_populates_distances_when_csv_changed(tmp_path, monkeypatch):
     )
 
     _init_db(str(db_path))
+    before = manufacturer_distance_matrix.matrix(str(db_path))
 
     monkeypatch.setattr(sync, "DB_PATH", str(db_path))
     monkeypatch.setattr(sync, "CSV_PATH", csv_path)
@@ -63,6 +67,12 @@ def test_sync_populates_distances_when_csv_changed(tmp_path, monkeypatch):
     assert cursor.fetchone()[0] == 2
     conn.close()
 
+    # The matrix was swapped for the synced rows; the old one is untouched.
+    after = manufacturer_distance_matrix.matrix(str(db_path))
+    assert before.get("Fabric A", "Garment A") is None
+    assert after.get("Fabric A", "Garment A") == pytest.approx(12.345, abs=0.01)
+    assert after.get("Garment A", "Finish A") == pytest.approx(12.345, abs=0.01)
+
 
 def test_sync_skips_when_csv_unchanged(tmp_path, monkeypatch):
     db_path = tmp_path / "ceis_backend.db"
@@ -0,0 +1,162 @@
+import sqlite3
+
+import pytest
+
+from ceis_backend import db_init
+from ceis_backend.db_connection import close_all_connections
+from ceis_backend.db_init import (
+    LATEST_SCHEMA_VERSION,
+    apply_schema_migrations,
+    create_tables,
+    get_schema_version,
+    init_sqlite_db,
+)
+
+
+@pytest.fixture
+def migrated_db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    init_sqlite_db()
+    close_all_connections()
+    conn = sqlite3.connect("ceis_backend.db")
+    yield conn
+    conn.close()
+
+
+def _query_plan(conn: sqlite3.Connection, sql: str, params: tuple) -> str:
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+
+def test_init_records_latest_schema_version(migrated_db):
+    cursor = migrated_db.cursor()
+
+    assert get_schema_version(cursor) == LATEST_SCHEMA_VERSION
+    assert apply_schema_migrations(cursor) == LATEST_SCHEMA_VERSION
+    cursor.execute("SELECT COUNT(*) FROM schema_migrations")
+    assert cursor.fetchone()[0] == LATEST_SCHEMA_VERSION
+
+
+def test_upgrades_existing_database_in_place(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conn = sqlite3.connect("ceis_backend.db")
+    create_tables(conn.cursor())
+    conn.execute("INSERT INTO locations (name) VALUES ('Dornbirn')")
+    conn.commit()
+    conn.close()
+
+    init_sqlite_db()
+    close_all_connections()
+
+    conn = sqlite3.connect("ceis_backend.db")
+    cursor = conn.cursor()
+    version = get_schema_version(cursor)
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'"
+    )
+    index_names = {row[0] for row in cursor.fetchall()}
+    cursor.execute("SELECT COUNT(*) FROM locations WHERE name = 'Dornbirn'")
+    kept_locations = cursor.fetchone()[0]
+    conn.close()
+
+    assert version == LATEST_SCHEMA_VERSION
+    assert "idx_fabric_blocks_inventory_garment" in index_names
+    assert "idx_garment_recipe_fabric_blocks_garment" in index_names
+    assert kept_locations == 1
+
+
+@pytest.mark.parametrize(
+    ("sql", "params", "expected"),
+    [
+        (
+            "SELECT id FROM fabric_blocks_inventory WHERE garment_id = ?",
+            (1,),
+            "idx_fabric_blocks_inventory_garment",
+        ),
+        (
+            "SELECT id FROM fabric_blocks_inventory "
+            "WHERE type_id = ? AND garment_id IS NULL",
+            (1,),
+            "idx_fabric_blocks_inventory_type",
+        ),
+        (
+            "SELECT process_id, amount FROM processes_fabric_blocks_inventory "
+            "WHERE fabric_block_id = ?",
+            (1,),
+            "COVERING INDEX idx_processes_fabric_blocks_inventory_block",
+        ),
+        (
+            "SELECT process_id, amount FROM processes_garments_inventory "
+            "WHERE garment_id = ?",
+            (1,),
+            "COVERING INDEX idx_processes_garments_inventory_garment",
+        ),
+        (
+            "SELECT fabric_block_id, amount FROM garment_recipe_fabric_blocks "
+            "WHERE garment_type = ?",
+            (1,),
+            "COVERING INDEX idx_garment_recipe_fabric_blocks_garment",
+        ),
+        (
+            "SELECT process_id, amount FROM garment_recipe_processes "
+            "WHERE garment_type = ?",
+            (1,),
+            "COVERING INDEX idx_garment_recipe_processes_garment",
+        ),
+        (
+            "SELECT process_id, amount FROM fabric_block_recipe_processes "
+            "WHERE fabric_block_type = ?",
+            (1,),
+            "COVERING INDEX idx_fabric_block_recipe_processes_type",
+        ),
+        (
+            "SELECT distance_km FROM manufacturer_distances "
+            "WHERE source_company = ? AND destination_company = ?",
+            ("Okutex", "Takli Textil"),
+            "sqlite_autoindex_manufacturer_distances_1",
+        ),
+    ],
+)
+def test_hot_lookups_use_indexes(migrated_db, sql, params, expected):
+    plan = _query_plan(migrated_db, sql, params)
+
+    assert expected in plan
+    assert "SCAN" not in plan
+
+
+def test_failed_migration_leaves_no_partial_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conn = sqlite3.connect("ceis_backend.db")
+    cursor = conn.cursor()
+    create_tables(cursor)
+    apply_schema_migrations(cursor)
+    conn.commit()
+    migrations = db_init.SCHEMA_MIGRATIONS
+
+    def add_note_column(second_statement: str) -> None:
+        monkeypatch.setattr(
+            db_init,
+            "SCHEMA_MIGRATIONS",
+            migrations
+            + (
+                db_init.SchemaMigration(
+                    version=LATEST_SCHEMA_VERSION + 1,
+                    description="Add location notes",
+                    statements=(
+                        "ALTER TABLE locations ADD COLUMN note TEXT",
+                        second_statement,
+                    ),
+                ),
+            ),
+        )
+
+    add_note_column("UPDATE missing_table SET note = ''")
+    with pytest.raises(sqlite3.OperationalError):
+        apply_schema_migrations(cursor)
+    cursor.execute("SELECT name FROM pragma_table_info('locations')")
+    assert "note" not in {row[0] for row in cursor.fetchall()}
+    assert get_schema_version(cursor) == LATEST_SCHEMA_VERSION
+
+    add_note_column("UPDATE locations SET note = ''")
+    assert apply_schema_migrations(cursor) == LATEST_SCHEMA_VERSION + 1
+    conn.close()
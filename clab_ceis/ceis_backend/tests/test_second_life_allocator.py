@@ -0,0 +1,102 @@
+import sqlite3
+
+import pytest
+
+from ceis_backend.db_connection import close_all_connections, get_connection
+from ceis_backend.db_init import create_tables
+from ceis_backend.models import InventoryProcessInfo
+from ceis_backend.queries import db_create_fabric_block, db_delete_fabric_block
+from ceis_backend.second_life_allocator import second_life_allocator
+
+
+@pytest.fixture
+def inventory(tmp_path, monkeypatch):
+    """Two block types with unassigned cotton, hemp and material-less blocks."""
+    monkeypatch.chdir(tmp_path)
+    conn = sqlite3.connect("ceis_backend.db")
+    cursor = conn.cursor()
+    create_tables(cursor)
+    cursor.executemany(
+        "INSERT INTO materials (name, kg_per_sqm, activity_id) VALUES (?, ?, ?)",
+        [("cotton", 1.0, 1001), ("hemp", 1.0, 1002)],
+    )
+    cursor.executemany(
+        "INSERT INTO fabric_block_types (name, sqm) VALUES (?, ?)",
+        [("Large", 1.0), ("Small", 0.5)],
+    )
+    cursor.execute(
+        "INSERT INTO process_types (name, unit, activity_id) VALUES (?, ?, ?)",
+        ("washing", "kg", 2001),
+    )
+    cursor.execute("INSERT INTO garment_types (name, price_chf) VALUES ('Coat', 1)")
+    cursor.execute(
+        "INSERT INTO garments_inventory (type_id, price, sold) VALUES (1, 1, 0)"
+    )
+    # (type, garment, material): Large gets hemp, cotton, none, hemp, and a
+    # cotton block already assigned to a garment; Small gets one cotton block.
+    cursor.executemany(
+        """
+        INSERT INTO fabric_blocks_inventory (type_id, co2eq, garment_id, location_id, material_id, quality)
+        VALUES (?, NULL, ?, NULL, ?, 90)
+        """,
+        [
+            (1, None, 2),
+            (1, None, 1),
+            (1, None, None),
+            (1, None, 2),
+            (1, 1, 1),
+            (2, None, 1),
+        ],
+    )
+    cursor.execute(
+        """
+        INSERT INTO processes_fabric_blocks_inventory (process_id, amount, fabric_block_id)
+        VALUES (1, 0.2, 2)
+        """
+    )
+    conn.commit()
+    conn.close()
+    second_life_allocator.invalidate()
+    yield
+    second_life_allocator.invalidate()
+    close_all_connections()
+
+
+def test_indexes_the_unassigned_blocks_of_several_types_in_one_load(inventory):
+    statements = []
+    with get_connection() as conn:
+        conn.set_trace_callback(statements.append)
+        try:
+            inventories = second_life_allocator.inventories([1, 2])
+            again = second_life_allocator.inventories([2])
+        finally:
+            conn.set_trace_callback(None)
+
+    large, small = inventories[1], inventories[2]
+    # The block already assigned to a garment (ID 5) is not a candidate.
+    assert large.ids == (1, 2, 3, 4)
+    assert small.ids == (6,)
+    assert again[2] is small
+    assert {
+        material: [large.ids[index] for index in indices]
+        for material, indices in large.by_material.items()
+    } == {"hemp": [1, 4], "cotton": [2], None: [3]}
+    block = large.block(1)
+    assert block.material == "cotton"
+    assert [(p.name, p.amount) for p in block.processes] == [("washing", 0.2)]
+    assert large.block(0).processes == []
+    assert len([sql for sql in statements if "SELECT" in sql]) == 2
+
+
+def test_follows_inventory_inserts_and_deletes(inventory):
+    assert second_life_allocator.inventories([2])[2].ids == (6,)
+
+    created = db_create_fabric_block(
+        2, None, 1, 80, [InventoryProcessInfo(process_id=1, amount=1.0)]
+    )
+    assert second_life_allocator.inventories([2])[2].ids == (6, created["id"])
+
+    db_delete_fabric_block(6)
+    small = second_life_allocator.inventories([2])[2]
+    assert small.ids == (created["id"],)
+    assert small.block(0).processes[0].amount == 1.0
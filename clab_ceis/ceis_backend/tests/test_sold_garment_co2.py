@@ -0,0 +1,130 @@
+import sqlite3
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ceis_backend import utils
+from ceis_backend.db_connection import close_all_connections, get_connection
+from ceis_backend.db_init import init_sqlite_db
+from ceis_backend.main import app
+from ceis_backend.queries import db_get_sold_garments_for_co2
+from ceis_backend.sold_garment_co2 import SoldGarmentCo2Runner
+
+
+@pytest.fixture
+def sold_garments_db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CEIS_DISABLE_DISTANCE_SYNC", "1")
+    init_sqlite_db()
+    yield tmp_path
+    close_all_connections()
+
+
+def _sold_garment_co2() -> dict[int, float | None]:
+    conn = sqlite3.connect("ceis_backend.db")
+    rows = conn.execute(
+        "SELECT id, co2eq FROM garments_inventory WHERE sold = 1 ORDER BY id"
+    ).fetchall()
+    conn.close()
+    return dict(rows)
+
+
+def test_strategy_progress_reports_pending_garments_without_calculating(
+    sold_garments_db,
+):
+    wiser_client = MagicMock()
+    app.state.wiser_client = wiser_client
+    runner = MagicMock()
+    app.state.sold_garment_co2_runner = runner
+    try:
+        payload = TestClient(app).get("/strategy-progress").json()
+    finally:
+        del app.state.sold_garment_co2_runner
+
+    pending = len(_sold_garment_co2())
+    assert payload["co2_refresh"]["pending_garments"] == pending
+    assert payload["co2_refresh"]["status"] == f"{pending} garments pending"
+    runner.trigger.assert_called_once_with()
+    wiser_client.get_emission_per_unit.assert_not_called()
+
+
+def _execute(sql: str, params: tuple = ()) -> list[tuple]:
+    conn = sqlite3.connect("ceis_backend.db")
+    rows = conn.execute(sql, params).fetchall()
+    conn.commit()
+    conn.close()
+    return rows
+
+
+def _wiser_client() -> MagicMock:
+    wiser_client = MagicMock()
+    wiser_client.get_emission_per_unit.side_effect = lambda activity_id: 0.5
+    return wiser_client
+
+
+def test_runner_persists_in_batches_and_skips_failing_garments(sold_garments_db):
+    failing_garment_id = min(_sold_garment_co2())
+    block_ids = [
+        row[0]
+        for row in _execute(
+            "SELECT id FROM fabric_blocks_inventory WHERE garment_id = ?",
+            (failing_garment_id,),
+        )
+    ]
+    _execute(
+        "UPDATE fabric_blocks_inventory SET garment_id = NULL WHERE garment_id = ?",
+        (failing_garment_id,),
+    )
+    runner = SoldGarmentCo2Runner(_wiser_client, interval_seconds=60, batch_size=1)
+
+    persisted = runner.run_pending()
+
+    co2_by_garment = _sold_garment_co2()
+    assert persisted == len(co2_by_garment) - 1
+    assert co2_by_garment.pop(failing_garment_id) is None
+    assert all(co2 is not None for co2 in co2_by_garment.values())
+    assert runner.stats()["failures"] == 1
+    assert runner.stats()["last_error"] == (
+        f"400: Sold garment {failing_garment_id} has no linked fabric blocks"
+    )
+
+    for block_id in block_ids:
+        _execute(
+            "UPDATE fabric_blocks_inventory SET garment_id = ? WHERE id = ?",
+            (failing_garment_id, block_id),
+        )
+    assert runner.run_pending() == 1
+    assert runner.stats()["running"] is False
+
+
+def test_batch_matches_per_garment_calculation_in_grouped_queries(sold_garments_db):
+    sold_garments = db_get_sold_garments_for_co2()
+    wiser_client = _wiser_client()
+    expected = {
+        garment["id"]: utils.get_co2_for_sold_garment(
+            garment["id"], garment["type_id"], wiser_client
+        )
+        for garment in sold_garments
+    }
+    statements = []
+    with get_connection() as conn:
+        conn.set_trace_callback(statements.append)
+        try:
+            errors = utils.refresh_sold_garment_co2_values(wiser_client, sold_garments)
+        finally:
+            conn.set_trace_callback(None)
+
+    assert errors == {}
+    assert len(sold_garments) >= 3
+    assert len([sql for sql in statements if "SELECT" in sql]) == 5
+    assert len([sql for sql in statements if sql.lstrip().startswith("UPDATE")]) == len(
+        sold_garments
+    )
+    co2_by_garment = _sold_garment_co2()
+    for garment_id, emission_details in expected.items():
+        assert co2_by_garment[garment_id] == pytest.approx(
+            emission_details.fabric_blocks.total_emission
+            + emission_details.processes.total_emission,
+            abs=1e-6,
+        )
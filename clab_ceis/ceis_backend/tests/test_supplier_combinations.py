@@ -0,0 +1,77 @@
+import itertools
+
+import numpy as np
+
+from ceis_backend.supplier_combinations import (
+    count_combinations,
+    pareto_front,
+    pareto_mask,
+    top_combinations,
+)
+
+
+def _random_legs(rng, fabrics, garments, finishings):
+    # Rounded so that ties between combinations occur.
+    first_leg = rng.integers(0, 6, (fabrics, garments, 3)).astype(float)
+    second_leg = rng.integers(0, 6, (garments, finishings, 3)).astype(float)
+    first_leg[rng.random((fabrics, garments)) < 0.2] = np.nan
+    second_leg[rng.random((garments, finishings)) < 0.2] = np.nan
+    return first_leg, second_leg
+
+
+def _all_combinations(first_leg, second_leg):
+    combinations = np.array(
+        [
+            combination
+            for combination in itertools.product(
+                range(first_leg.shape[0]),
+                range(first_leg.shape[1]),
+                range(second_leg.shape[1]),
+            )
+            if np.isfinite(first_leg[combination[:2]]).all()
+            and np.isfinite(second_leg[combination[1:]]).all()
+        ],
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    fabric, garment, finishing = combinations.T
+    return combinations, first_leg[fabric, garment] + second_leg[garment, finishing]
+
+
+def test_pareto_mask_keeps_exactly_the_non_dominated_rows():
+    rng = np.random.default_rng(3)
+    points = rng.integers(0, 8, (700, 3)).astype(float)
+
+    expected = [
+        not any((other <= point).all() and (other < point).any() for other in points)
+        for point in points
+    ]
+
+    assert pareto_mask(points).tolist() == expected
+
+
+def test_front_and_top_k_match_exhaustive_search():
+    rng = np.random.default_rng(21)
+    for _ in range(25):
+        first_leg, second_leg = _random_legs(
+            rng, rng.integers(1, 7), rng.integers(1, 5), rng.integers(1, 7)
+        )
+        combinations, objectives = _all_combinations(first_leg, second_leg)
+
+        assert count_combinations(first_leg, second_leg) == len(combinations)
+        expected_front = {
+            tuple(row) for row in combinations[pareto_mask(objectives)].tolist()
+        }
+        assert {
+            tuple(row) for row in pareto_front(first_leg, second_leg).tolist()
+        } == expected_front
+        for objective in range(3):
+            top = top_combinations(first_leg, second_leg, objective, 4)
+            order = np.lexsort(
+                (
+                    combinations[:, 2],
+                    combinations[:, 1],
+                    combinations[:, 0],
+                    objectives[:, objective],
+                )
+            )
+            assert top.tolist() == combinations[order[:4]].tolist()
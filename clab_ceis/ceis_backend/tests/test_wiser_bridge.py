@@ -1,7 +1,14 @@
 import sqlite3
+from threading import Barrier, Thread, current_thread
+from time import monotonic, sleep
 from unittest.mock import MagicMock, patch
 
-from ceis_backend.db_init import create_tables
+from ceis_backend.db_connection import (
+    close_all_connections,
+    get_connection,
+    open_connection_count,
+)
+from ceis_backend.db_init import apply_schema_migrations, create_tables
 from ceis_backend.wiser_bridge import WiserClient
 
 
@@ -32,12 +39,14 @@ def test_reuses_cached_access_token_for_multiple_requests(tmp_path, monkeypatch)
         auth_url="https://auth.example", api_base_url="https://api.example"
     )
 
-    with patch(
-        "ceis_backend.wiser_bridge.requests.post",
+    with patch.object(
+        client._session,
+        "post",
         return_value=_auth_response("cached-token"),
     ) as mocked_post:
-        with patch(
-            "ceis_backend.wiser_bridge.requests.request",
+        with patch.object(
+            client._session,
+            "request",
             side_effect=[_activity_response(200, 0.5), _activity_response(200, 0.8)],
         ) as mocked_request:
             assert client.get_emission_per_unit(1001) == 0.5
@@ -57,12 +66,14 @@ def test_refreshes_token_once_after_unauthorized_response(tmp_path, monkeypatch)
         auth_url="https://auth.example", api_base_url="https://api.example"
     )
 
-    with patch(
-        "ceis_backend.wiser_bridge.requests.post",
+    with patch.object(
+        client._session,
+        "post",
         side_effect=[_auth_response("stale-token"), _auth_response("fresh-token")],
     ) as mocked_post:
-        with patch(
-            "ceis_backend.wiser_bridge.requests.request",
+        with patch.object(
+            client._session,
+            "request",
             side_effect=[_activity_response(401), _activity_response(200, 1.5)],
         ) as mocked_request:
             assert client.get_emission_per_unit(2001) == 1.5
@@ -96,8 +107,8 @@ def test_reuses_fresh_database_emission_cache(tmp_path, monkeypatch):
         auth_url="https://auth.example", api_base_url="https://api.example"
     )
 
-    with patch("ceis_backend.wiser_bridge.requests.post") as mocked_post:
-        with patch("ceis_backend.wiser_bridge.requests.request") as mocked_request:
+    with patch.object(client._session, "post") as mocked_post:
+        with patch.object(client._session, "request") as mocked_request:
             assert client.get_emission_per_unit(3001) == 2.75
 
     mocked_post.assert_not_called()
@@ -111,7 +122,9 @@ def test_refreshes_stale_database_emission_cache(tmp_path, monkeypatch):
     monkeypatch.setattr("ceis_backend.wiser_bridge.time", lambda: now)
 
     conn = sqlite3.connect("ceis_backend.db")
-    create_tables(conn.cursor())
+    cursor = conn.cursor()
+    create_tables(cursor)
+    apply_schema_migrations(cursor)
     conn.execute(
         """
         INSERT INTO activity_emission_cache
@@ -124,15 +137,19 @@ def test_refreshes_stale_database_emission_cache(tmp_path, monkeypatch):
     conn.close()
 
     client = WiserClient(
-        auth_url="https://auth.example", api_base_url="https://api.example"
+        auth_url="https://auth.example",
+        api_base_url="https://api.example",
+        emission_cache_max_stale_seconds=0,
     )
 
-    with patch(
-        "ceis_backend.wiser_bridge.requests.post",
+    with patch.object(
+        client._session,
+        "post",
         return_value=_auth_response("fresh-token"),
     ):
-        with patch(
-            "ceis_backend.wiser_bridge.requests.request",
+        with patch.object(
+            client._session,
+            "request",
             return_value=_activity_response(200, 3.5),
         ) as mocked_request:
             assert client.get_emission_per_unit(4001) == 3.5
@@ -151,3 +168,396 @@ def test_refreshes_stale_database_emission_cache(tmp_path, monkeypatch):
     conn.close()
 
     assert row == (3.5, now)
+
+
+def test_serves_repeated_lookups_from_memory_without_database(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("ceis_backend.wiser_bridge.time", lambda: 1_000_000)
+
+    conn = sqlite3.connect("ceis_backend.db")
+    create_tables(conn.cursor())
+    conn.execute(
+        """
+        INSERT INTO activity_emission_cache
+            (activity_id, emission_per_unit, cached_at)
+        VALUES (?, ?, ?)
+        """,
+        (5001, 0.75, 1_000_000),
+    )
+    conn.commit()
+    conn.close()
+
+    client = WiserClient(
+        auth_url="https://auth.example", api_base_url="https://api.example"
+    )
+    assert client.get_emission_per_unit(5001) == 0.75
+
+    with patch("ceis_backend.wiser_bridge.get_connection") as mocked_connection:
+        with patch.object(client._session, "request") as mocked_request:
+            assert client.get_emission_per_unit(5001) == 0.75
+            assert client.get_emission_per_unit(5001) == 0.75
+
+    mocked_connection.assert_not_called()
+    mocked_request.assert_not_called()
+    stats = client.emission_cache_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+
+
+def test_memory_tier_is_bounded_and_expires_with_ttl(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    now = [1_000_000]
+    monkeypatch.setattr("ceis_backend.wiser_bridge.time", lambda: now[0])
+    client = WiserClient(
+        auth_url="https://auth.example",
+        api_base_url="https://api.example",
+        emission_cache_ttl_seconds=60,
+        emission_cache_max_stale_seconds=0,
+        emission_memory_cache_size=2,
+    )
+
+    with patch.object(
+        client._session,
+        "post",
+        return_value=_auth_response("token"),
+    ):
+        with patch.object(
+            client._session,
+            "request",
+            side_effect=[
+                _activity_response(200, 1.0),
+                _activity_response(200, 2.0),
+                _activity_response(200, 3.0),
+                _activity_response(200, 1.5),
+                _activity_response(200, 3.5),
+            ],
+        ) as mocked_request:
+            client.get_emission_per_unit(1)
+            client.get_emission_per_unit(2)
+            client.get_emission_per_unit(3)
+            # Activity 1 was evicted as least recently used.
+            assert client.get_emission_per_unit(1) == 1.5
+            now[0] += 61
+            assert client.get_emission_per_unit(3) == 3.5
+
+    assert mocked_request.call_count == 5
+    assert client.emission_cache_stats()["size"] == 2
+
+
+def test_batch_lookup_dedupes_and_fetches_misses_concurrently(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = WiserClient(
+        auth_url="https://auth.example",
+        api_base_url="https://api.example",
+        max_concurrent_requests=3,
+    )
+    client._emission_memory_cache.put(6001, 0.25, 1e12)
+    barrier = Barrier(3, timeout=5)
+    emissions_by_url = {
+        "https://api.example/activity/6002/": 1.0,
+        "https://api.example/activity/6003/": 2.0,
+        "https://api.example/activity/6004/": None,
+    }
+
+    def fake_request(method, url, **kwargs):
+        # Only passes if all three misses are in flight at the same time.
+        barrier.wait()
+        return _activity_response(200, emissions_by_url[url])
+
+    with patch.object(
+        client._session,
+        "post",
+        return_value=_auth_response("token"),
+    ):
+        with patch.object(
+            client._session, "request", side_effect=fake_request
+        ) as mocked_request:
+            emissions = client.get_emissions_per_unit(
+                [6001, 6002, 6003, 6002, 6004, 6001]
+            )
+
+    assert emissions == {6001: 0.25, 6002: 1.0, 6003: 2.0, 6004: None}
+    assert mocked_request.call_count == 3
+    assert client.get_emission_per_unit(6003) == 2.0
+
+
+def test_batch_lookups_reuse_one_bounded_fetch_pool(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conn = sqlite3.connect("ceis_backend.db")
+    create_tables(conn.cursor())
+    conn.commit()
+    conn.close()
+    client = WiserClient(
+        auth_url="https://auth.example",
+        api_base_url="https://api.example",
+        max_concurrent_requests=2,
+    )
+    fetch_threads = set()
+
+    def fake_request(method, url, **kwargs):
+        fetch_threads.add(current_thread().name)
+        return _activity_response(200, 1.0)
+
+    with get_connection():
+        open_before = open_connection_count()
+    with patch.object(client._session, "post", return_value=_auth_response("token")):
+        with patch.object(client._session, "request", side_effect=fake_request):
+            for batch in range(20):
+                client.get_emissions_per_unit([7000 + 2 * batch, 7001 + 2 * batch])
+
+    assert len(fetch_threads) <= 2
+    # One connection per fetch thread, not one per batch.
+    assert open_connection_count() <= open_before + 2
+    client.close()
+    assert client._fetch_executor is None
+    close_all_connections()
+
+
+def test_reuses_one_pooled_session_for_auth_and_api_calls(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = WiserClient(
+        auth_url="https://auth.example",
+        api_base_url="https://api.example",
+        http_pool_maxsize=4,
+    )
+    adapter = client._session.get_adapter("https://api.example/activity/1/")
+
+    with patch.object(client._session, "close") as mocked_close:
+        client.close()
+
+    assert adapter._pool_maxsize == 4
+    assert adapter._pool_block is True
+    assert client._session.get_adapter("https://auth.example") is adapter
+    mocked_close.assert_called_once()
+
+
+def _wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = monotonic() + timeout
+    while not condition():
+        if monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        sleep(0.001)
+
+
+def test_concurrent_misses_for_one_activity_share_a_single_fetch(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = WiserClient(
+        auth_url="https://auth.example", api_base_url="https://api.example"
+    )
+
+    def fake_request(method, url, **kwargs):
+        # Hold the leader's fetch open until the second caller has joined it.
+        _wait_until(lambda: client._emission_flights.coalesced == 1)
+        return _activity_response(200, 4.2)
+
+    results = []
+    with patch.object(client._session, "post", return_value=_auth_response("token")):
+        with patch.object(
+            client._session, "request", side_effect=fake_request
+        ) as mocked_request:
+            workers = [
+                Thread(
+                    target=lambda: results.append(client.get_emission_per_unit(7001))
+                )
+                for _ in range(2)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+    assert results == [4.2, 4.2]
+    assert mocked_request.call_count == 1
+    assert client.emission_cache_stats()["coalesced_fetches"] == 1
+
+
+def test_concurrent_identical_searches_share_a_single_request(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = WiserClient(
+        auth_url="https://auth.example", api_base_url="https://api.example"
+    )
+    search_response = MagicMock()
+    search_response.status_code = 200
+    search_response.json.return_value = {"search_results": [{"id": 1}]}
+
+    def fake_request(method, url, **kwargs):
+        _wait_until(lambda: client._search_flights.coalesced == 1)
+        return search_response
+
+    results = []
+    with patch.object(client._session, "post", return_value=_auth_response("token")):
+        with patch.object(
+            client._session, "request", side_effect=fake_request
+        ) as mocked_request:
+            workers = [
+                Thread(target=lambda: results.append(client.search_activities("hemp")))
+                for _ in range(2)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+    assert results == [[{"id": 1}], [{"id": 1}]]
+    assert mocked_request.call_count == 1
+
+
+def _seed_emission_cache(activity_id: int, emission: float, cached_at: float) -> None:
+    conn = sqlite3.connect("ceis_backend.db")
+    create_tables(conn.cursor())
+    conn.execute(
+        """
+        INSERT INTO activity_emission_cache
+            (activity_id, emission_per_unit, cached_at)
+        VALUES (?, ?, ?)
+        """,
+        (activity_id, emission, cached_at),
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_serves_stale_emission_and_refreshes_it_in_background(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    now = 1_000_000
+    monkeypatch.setattr("ceis_backend.wiser_bridge.time", lambda: now)
+    _seed_emission_cache(8001, 1.25, now - 8 * 24 * 60 * 60)
+    client = WiserClient(
+        auth_url="https://auth.example", api_base_url="https://api.example"
+    )
+    refresher = client._emission_refresher
+
+    with patch.object(refresher, "start") as mocked_start:
+        with patch.object(client._session, "request") as mocked_request:
+            assert client.get_emission_per_unit(8001) == 1.25
+
+    mocked_request.assert_not_called()
+    mocked_start.assert_called_once()
+    assert client.emission_cache_stats()["refresh_pending"] == 1
+
+    with patch.object(client._session, "post", return_value=_auth_response("token")):
+        with patch.object(
+            client._session,
+            "request",
+            return_value=_activity_response(200, 3.5),
+        ) as mocked_request:
+            refresher.refresh_now(refresher._pending)
+
+    assert mocked_request.call_count == 1
+    assert client.get_emission_per_unit(8001) == 3.5
+    stats = client.emission_cache_stats()
+    assert stats["stale_served"] == 1
+    assert stats["refreshed"] == 1
+    assert stats["refresh_failures"] == 0
+    assert stats["refresh_lag_seconds_last"] > 0
+
+
+def test_hard_expired_emission_is_fetched_synchronously(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    now = 1_000_000
+    monkeypatch.setattr("ceis_backend.wiser_bridge.time", lambda: now)
+    _seed_emission_cache(8002, 1.25, now - 20 * 24 * 60 * 60)
+    client = WiserClient(
+        auth_url="https://auth.example",
+        api_base_url="https://api.example",
+        emission_cache_max_stale_seconds=7 * 24 * 60 * 60,
+    )
+
+    with patch.object(client._session, "post", return_value=_auth_response("token")):
+        with patch.object(
+            client._session,
+            "request",
+            return_value=_activity_response(200, 2.0),
+        ):
+            assert client.get_emission_per_unit(8002) == 2.0
+
+    assert client.emission_cache_stats()["stale_served"] == 0
+
+
+def test_refresher_counts_failures_and_keeps_stale_value(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    now = 1_000_000
+    monkeypatch.setattr("ceis_backend.wiser_bridge.time", lambda: now)
+    _seed_emission_cache(8003, 1.25, now - 8 * 24 * 60 * 60)
+    client = WiserClient(
+        auth_url="https://auth.example", api_base_url="https://api.example"
+    )
+
+    with patch.object(client._session, "post", return_value=_auth_response("token")):
+        with patch.object(
+            client._session, "request", return_value=_activity_response(503)
+        ):
+            client._emission_refresher.refresh_now()
+
+    with patch.object(client._emission_refresher, "start"):
+        assert client.get_emission_per_unit(8003) == 1.25
+    assert client.emission_cache_stats()["refresh_failures"] == 1
+
+
+def test_refresher_backs_off_failing_activities(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    now = 1_000_000
+    monkeypatch.setattr("ceis_backend.wiser_bridge.time", lambda: now)
+    monkeypatch.setattr("ceis_backend.emission_refresh.time", lambda: now)
+    _seed_emission_cache(8004, 1.25, now - 8 * 24 * 60 * 60)
+    client = WiserClient(
+        auth_url="https://auth.example",
+        api_base_url="https://api.example",
+        emission_refresh_interval_seconds=60,
+        emission_refresh_max_backoff_seconds=200,
+    )
+    refresher = client._emission_refresher
+
+    def refresh(status_code: int) -> int:
+        with patch.object(
+            client._session, "post", return_value=_auth_response("token")
+        ):
+            with patch.object(
+                client._session,
+                "request",
+                return_value=_activity_response(status_code, 3.5),
+            ) as mocked_request:
+                refresher.refresh_now()
+        return mocked_request.call_count
+
+    assert refresh(503) == 1
+    assert refresh(503) == 0
+    now += 60
+    assert refresh(503) == 1
+    now += 60
+    assert refresh(503) == 0
+    now += 60
+    assert refresh(503) == 1
+    assert refresher._backoff[8004] == (now + 200, 200)
+    assert client.emission_cache_stats()["refresh_backing_off"] == 1
+
+    now += 200
+    assert refresh(200) == 1
+    assert client.emission_cache_stats()["refresh_backing_off"] == 0
+    assert client.get_emission_per_unit(8004) == 3.5
+
+
+def test_refresh_cycles_reuse_the_fetch_pool(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _seed_emission_cache(8005, 1.25, 0)
+    client = WiserClient(
+        auth_url="https://auth.example",
+        api_base_url="https://api.example",
+        max_concurrent_requests=2,
+    )
+    refresh_threads = set()
+
+    def fake_request(method, url, **kwargs):
+        refresh_threads.add(current_thread().name)
+        return _activity_response(200, 1.5)
+
+    with patch.object(client._session, "post", return_value=_auth_response("token")):
+        with patch.object(client._session, "request", side_effect=fake_request):
+            for _ in range(10):
+                errors = client._refresh_emissions([8005, 8006, 8007])
+
+    assert errors == {8005: None, 8006: None, 8007: None}
+    assert len(refresh_threads) <= 2
+    assert all(name.startswith("wiser-fetch") for name in refresh_threads)
+    client.close()
+    close_all_connections()
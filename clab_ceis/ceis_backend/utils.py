@@ -1,8 +1,15 @@
 from __future__ import annotations
 
+from typing import Iterable
+
 from fastapi import HTTPException
 
+from ceis_backend.block_matching import RecipeSlot, match_blocks
+from ceis_backend.co2_result_cache import co2_result_cache
+from ceis_backend.config import SECOND_LIFE_MIN_QUALITY
+from ceis_backend.distance_matrix import manufacturer_distance_matrix
 from ceis_backend.models import (
+    CompiledGarmentRecipe,
     GarmentCo2Response,
     EmissionDetails,
     FabricBlock,
@@ -10,7 +17,8 @@ from ceis_backend.models import (
     Process,
     Material,
 )
-from ceis_backend.wiser_bridge import WiserClient
+from ceis_backend.second_life_allocator import second_life_allocator
+from ceis_backend.wiser_bridge import WiserClient, WiserClientError
 from ceis_backend.data.location_details import (
     DISTANCES_TO_MANUFACTURER,
     ACTIVITY_ID_TRANSPORT,
@@ -24,16 +32,13 @@ from ceis_backend.data.location_details import (
     SUPPLY_CHAIN_TRANSPORT_PROCESS_NAME,
 )
 from ceis_backend.queries import (
-    db_get_garment_processes,
-    db_get_garment_inventory_processes,
-    db_get_inventory_fabric_blocks_for_garment,
+    compile_garment_recipe,
+    compile_garment_recipes,
+    db_get_sold_garment_co2_inputs,
     db_get_sold_garments_for_co2,
-    db_update_garment_inventory_co2,
+    db_update_garments_inventory_co2,
     get_fabric_block_recipe,
-    get_full_garment_recipe,
-    get_used_fabric_block,
     get_fabric_block_processes_for_emission,
-    get_manufacturer_distance_km,
 )
 
 
@@ -56,6 +61,40 @@ def _get_material_distance_to_manufacturer_km(material: Material) -> float:
     return material_distance_km[material]
 
 
+def prefetch_emissions(wiser_client: WiserClient, activity_ids: list[int]) -> None:
+    """Warm the emission cache for every activity a calculation will read."""
+    wiser_client.get_emissions_per_unit(
+        [ACTIVITY_ID_TRANSPORT, ACTIVITY_ID_LONG_DISTANCE_TRANSPORT, *activity_ids]
+    )
+
+
+def prefetch_recipe_emissions(
+    wiser_client: WiserClient, recipes: Iterable[CompiledGarmentRecipe]
+) -> None:
+    """Warm the emission cache for every activity of many recipes at once."""
+    activity_ids = []
+    for recipe in recipes:
+        activity_ids.extend(_recipe_activity_ids(recipe))
+    prefetch_emissions(wiser_client, activity_ids)
+
+
+def _recipe_activity_ids(recipe: CompiledGarmentRecipe) -> list[int]:
+    activity_ids = [process.activity_id for process in recipe.processes]
+    for entry in recipe.fabric_blocks:
+        activity_ids.append(entry.fabric_block.activity_id)
+        activity_ids.extend(
+            process.activity_id for process in entry.fabric_block.processes
+        )
+    # Which second-life alternatives are cheapest depends on the processes
+    # of every candidate block, not only of the chosen ones.
+    inventories = second_life_allocator.inventories(
+        entry.fabric_block.id for entry in recipe.fabric_blocks
+    )
+    for inventory in inventories.values():
+        activity_ids.extend(inventory.activity_ids.tolist())
+    return activity_ids
+
+
 def calculate_transport_emission(
     distance_km: float, amount_kg: float, emission_per_unit: float | None
 ) -> float | None:
@@ -166,23 +205,24 @@ def calculate_used_fabric_block_alternative(
     return alternative
 
 
-def process_fabric_block_emissions(
+def calculate_fabric_block_base_emissions(
     wiser_client: WiserClient,
     fabric_block_name: str,
     fabric_block_data: FabricBlock,
-    already_used_ids: list[int],
 ) -> dict:
     """
-    Calculate total emissions for a fabric block including material, production, and alternatives.
+    Calculate the material and production emissions of one fabric block.
+
+    The result does not depend on the inventory, so it is shared by every
+    copy of the same block in a recipe.
 
     Args:
         wiser_client: Client for the WISER API.
         fabric_block_name: Name of the fabric block.
         fabric_block_data: FabricBlock object with material and process info.
-        already_used_ids: List of already-used fabric block IDs.
 
     Returns:
-        Dictionary with fabric block emission details.
+        Dictionary with fabric block emission details, without an alternative.
     """
     block_weight_kg = fabric_block_data.weight_kg
     if block_weight_kg is None:
@@ -218,23 +258,6 @@ def process_fabric_block_emissions(
     # Total fabric block emission
     total_emission = material_emission + production_emission
 
-    # Used/alternative fabric block
-    preferred_material = getattr(
-        fabric_block_data.material, "value", fabric_block_data.material
-    )
-    used_fabric_block = get_used_fabric_block(
-        fabric_block_name,
-        already_used_ids,
-        preferred_material=str(preferred_material),
-    )
-    used_fabric_block_alternative = {}
-
-    if used_fabric_block:
-        already_used_ids.append(used_fabric_block.id)
-        used_fabric_block_alternative = calculate_used_fabric_block_alternative(
-            wiser_client, used_fabric_block, block_weight_kg
-        )
-
     return {
         "fabric_block": fabric_block_name,
         "material": fabric_block_data.material,
@@ -244,18 +267,46 @@ def process_fabric_block_emissions(
         "material_emission": material_emission,
         "production_emission": production_emission,
         "production_processes": production_details,
-        "alternative": used_fabric_block_alternative,
     }
 
 
+def _preferred_material(fabric_block_data: FabricBlock) -> str:
+    return str(getattr(fabric_block_data.material, "value", fabric_block_data.material))
+
+
+def garment_recipe_slots(
+    recipe: CompiledGarmentRecipe, min_quality: float = SECOND_LIFE_MIN_QUALITY
+) -> list[RecipeSlot]:
+    """One second-life block slot per fabric block copy of a compiled recipe."""
+    return [
+        RecipeSlot(
+            type_id=entry.fabric_block.id,
+            weight_kg=entry.fabric_block.weight_kg,
+            material=_preferred_material(entry.fabric_block),
+            min_quality=min_quality,
+        )
+        for entry in recipe.fabric_blocks
+        for _ in range(entry.quantity)
+    ]
+
+
 def get_co2_for_garment(
-    garment_type_id: int, wiser_client: WiserClient, material_id: int
+    garment_type_id: int,
+    wiser_client: WiserClient,
+    material_id: int,
+    recipe: CompiledGarmentRecipe | None = None,
+    prefetch: bool = True,
 ) -> GarmentCo2Response:
     """
     Calculate CO2 emissions for a garment, including fabric blocks and assembly processes.
 
+    Results are kept in co2_result_cache until a write they depend on.
+
     Args:
         garment_type_id: The ID of the garment type to calculate emissions for.
+        recipe: Already compiled recipe for this garment and material, if any.
+        prefetch: Whether to prefetch the recipe's emission factors; callers
+            that already prefetched them for many recipes pass False.
 
     Returns:
         GarmentCo2Response with detailed emission breakdowns for fabric blocks and processes.
@@ -264,29 +315,60 @@ def get_co2_for_garment(
         HTTPException: If the garment recipe is not found.
     """
 
-    recipe = get_full_garment_recipe(garment_type_id, material_id)
+    cache_version = co2_result_cache.version()
+    cached = co2_result_cache.get(garment_type_id, material_id, wiser_client)
+    if cached is not None:
+        return cached.model_copy(deep=True)
+
+    if recipe is None:
+        recipe = compile_garment_recipe(garment_type_id, material_id)
     if recipe is None:
         raise HTTPException(
             status_code=404,
             detail=f"Garment recipe not found for garment type ID: {garment_type_id}",
         )
 
+    activity_ids = _recipe_activity_ids(recipe)
+    if prefetch:
+        prefetch_emissions(wiser_client, activity_ids)
+
     emission_details = GarmentCo2Response(
         fabric_blocks=EmissionDetails(details=[], total_emission=0),
         processes=EmissionDetails(details=[], total_emission=0),
     )
 
-    # Process fabric block emissions
-    already_used_fabric_block_ids = []
-    for fabric_block_data in recipe.fabric_blocks:
-        fabric_block_detail = process_fabric_block_emissions(
-            wiser_client,
-            fabric_block_data.name,
-            fabric_block_data,
-            already_used_fabric_block_ids,
+    # Process fabric block emissions. Copies of a block share their material
+    # and production emissions; only the second-life alternative differs.
+    used_fabric_blocks = iter(match_blocks(garment_recipe_slots(recipe), wiser_client))
+    base_details_by_block_id: dict[int, dict] = {}
+    for entry in recipe.fabric_blocks:
+        fabric_block_data = entry.fabric_block
+        base_detail = base_details_by_block_id.get(fabric_block_data.id)
+        if base_detail is None:
+            base_detail = calculate_fabric_block_base_emissions(
+                wiser_client, fabric_block_data.name, fabric_block_data
+            )
+            base_details_by_block_id[fabric_block_data.id] = base_detail
+
+        for _ in range(entry.quantity):
+            used_fabric_block = next(used_fabric_blocks)
+            alternative = (
+                calculate_used_fabric_block_alternative(
+                    wiser_client, used_fabric_block, fabric_block_data.weight_kg
+                )
+                if used_fabric_block
+                else {}
+            )
+            emission_details.fabric_blocks.details.append(
+                {
+                    **base_detail,
+                    "production_processes": list(base_detail["production_processes"]),
+                    "alternative": alternative,
+                }
+            )
+        emission_details.fabric_blocks.total_emission += (
+            base_detail["emission"] * entry.quantity
         )
-        emission_details.fabric_blocks.details.append(fabric_block_detail)
-        emission_details.fabric_blocks.total_emission += fabric_block_detail["emission"]
 
     # Process garment assembly process emissions
     for process in recipe.processes:
@@ -305,11 +387,14 @@ def get_co2_for_garment(
         )
         emission_details.processes.total_emission += process_emission
 
-    supply_chain_distance_km = get_manufacturer_distance_km(
+    supply_chain_distance_km = manufacturer_distance_matrix.matrix().get(
         SUPPLY_CHAIN_SOURCE_COMPANY, SUPPLY_CHAIN_DESTINATION_COMPANY
     )
     if supply_chain_distance_km is not None:
-        total_garment_weight_kg = sum(block.weight_kg for block in recipe.fabric_blocks)
+        total_garment_weight_kg = sum(
+            entry.fabric_block.weight_kg * entry.quantity
+            for entry in recipe.fabric_blocks
+        )
         transport_emission_per_unit = _get_transport_emission_per_unit(wiser_client)
         supply_chain_transport_emission = calculate_transport_emission(
             supply_chain_distance_km,
@@ -328,31 +413,103 @@ def get_co2_for_garment(
             supply_chain_transport_emission or 0
         )
 
+    # Alternatives come from the unassigned inventory of the recipe's block
+    # types, so inventory changes only matter for those types.
+    block_type_ids = {entry.fabric_block.id for entry in recipe.fabric_blocks}
+    dependencies = [
+        ("garment_types", garment_type_id),
+        ("materials", material_id),
+        ("process_types", None),
+        ("locations", None),
+        ("manufacturer_distances", None),
+        *(("fabric_block_types", type_id) for type_id in block_type_ids),
+        *(("fabric_blocks_inventory", type_id) for type_id in block_type_ids),
+    ]
+    activity_ids.extend([ACTIVITY_ID_TRANSPORT, ACTIVITY_ID_LONG_DISTANCE_TRANSPORT])
+    co2_result_cache.put(
+        garment_type_id,
+        material_id,
+        wiser_client,
+        emission_details.model_copy(deep=True),
+        dependencies,
+        activity_ids,
+        cache_version,
+    )
+
     return emission_details
 
 
-def get_co2_for_sold_garment(
-    garment_id: int,
-    garment_type_id: int,
-    wiser_client: WiserClient,
+def get_co2_for_garments(
+    pairs: list[tuple[int, int]], wiser_client: WiserClient
+) -> list[dict]:
+    """Calculate CO2 emissions for many (garment type, material) pairs.
+
+    The recipes are loaded together and their emission factors prefetched
+    once. Returns one item per pair, in order, carrying either the
+    GarmentCo2Response or the error that pair would have raised on its own.
+    """
+    recipes, recipe_errors = compile_garment_recipes(pairs)
+    try:
+        prefetch_recipe_emissions(wiser_client, recipes.values())
+    except WiserClientError:
+        # Lookups below fail, and are reported, per pair.
+        pass
+
+    items = []
+    for garment_type_id, material_id in pairs:
+        item = {
+            "garment_type_id": garment_type_id,
+            "material_id": material_id,
+            "result": None,
+            "error": None,
+        }
+        try:
+            recipe_error = recipe_errors.get((garment_type_id, material_id))
+            if recipe_error is not None:
+                raise recipe_error
+            item["result"] = get_co2_for_garment(
+                garment_type_id,
+                wiser_client,
+                material_id,
+                recipe=recipes[(garment_type_id, material_id)],
+                prefetch=False,
+            )
+        except HTTPException as error:
+            item["error"] = {"status_code": error.status_code, "detail": error.detail}
+        except WiserClientError as error:
+            item["error"] = {"status_code": 502, "detail": str(error)}
+        items.append(item)
+    return items
+
+
+def _sold_garment_activity_ids(garment_inputs: dict) -> list[int]:
+    activity_ids = [
+        process.activity_id
+        for process in garment_inputs["recipe_processes"]
+        + garment_inputs["inventory_processes"]
+    ]
+    for block in garment_inputs["fabric_blocks"]:
+        if block["activity_id"] is not None:
+            activity_ids.append(block["activity_id"])
+        activity_ids.extend(process.activity_id for process in block["processes"])
+        activity_ids.extend(
+            process.activity_id for process in block["recipe_processes"]
+        )
+    return activity_ids
+
+
+def _calculate_sold_garment_co2(
+    garment_id: int, garment_inputs: dict, wiser_client: WiserClient
 ) -> GarmentCo2Response:
-    """Calculate CO2 emissions for a sold garment from its actual linked fabric blocks."""
-    inventory_fabric_blocks = db_get_inventory_fabric_blocks_for_garment(garment_id)
+    """CO2 of a sold garment from inputs loaded by db_get_sold_garment_co2_inputs."""
+    inventory_fabric_blocks = garment_inputs["fabric_blocks"]
     if not inventory_fabric_blocks:
         raise HTTPException(
             status_code=400,
             detail=f"Sold garment {garment_id} has no linked fabric blocks",
         )
-
-    emission_details = GarmentCo2Response(
-        fabric_blocks=EmissionDetails(details=[], total_emission=0),
-        processes=EmissionDetails(details=[], total_emission=0),
-    )
-
     for block in inventory_fabric_blocks:
-        material_name = block.get("material_name")
-        activity_id = block.get("activity_id")
-        if material_name is None or activity_id is None:
+        if block.get("material_name") is None or block.get("activity_id") is None:
             raise HTTPException(
                 status_code=400,
                 detail=(
@@ -361,19 +518,15 @@ def get_co2_for_sold_garment(
                 ),
             )
 
-        block_weight_kg = float(block["kg_per_sqm"]) * float(block["sqm"])
-        fabric_block_recipe = get_fabric_block_recipe(
-            block["type_name"], int(block["material_id"])
-        )
-        if fabric_block_recipe is None:
-            raise HTTPException(
-                status_code=400,
-                detail=(
-                    f"Fabric block recipe not found for '{block['type_name']}' "
-                    f"and material '{material_name}'"
-                ),
-            )
+    emission_details = GarmentCo2Response(
+        fabric_blocks=EmissionDetails(details=[], total_emission=0),
+        processes=EmissionDetails(details=[], total_emission=0),
+    )
 
+    for block in inventory_fabric_blocks:
+        material_name = block["material_name"]
+        activity_id = block["activity_id"]
+        block_weight_kg = float(block["kg_per_sqm"]) * float(block["sqm"])
         material_emission_per_unit = wiser_client.get_emission_per_unit(activity_id)
         material_emission = 0
         if not block.get("second_life", True):
@@ -384,7 +537,7 @@ def get_co2_for_sold_garment(
             )
 
         recipe_production_emission, recipe_production_details = (
-            calculate_process_emissions(wiser_client, fabric_block_recipe.processes)
+            calculate_process_emissions(wiser_client, block["recipe_processes"])
         )
 
         inventory_process_emission, inventory_process_details = (
@@ -410,14 +563,11 @@ def get_co2_for_sold_garment(
         )
         emission_details.fabric_blocks.total_emission += total_block_emission
 
-    recipe_garment_processes = db_get_garment_processes(garment_type_id)
-    inventory_garment_processes = db_get_garment_inventory_processes(garment_id)
-
     recipe_process_total, recipe_process_details = calculate_process_emissions(
-        wiser_client, recipe_garment_processes
+        wiser_client, garment_inputs["recipe_processes"]
     )
     inventory_process_total, inventory_process_details = calculate_process_emissions(
-        wiser_client, inventory_garment_processes
+        wiser_client, garment_inputs["inventory_processes"]
     )
     emission_details.processes.details = (
         recipe_process_details + inventory_process_details
@@ -429,17 +579,74 @@ def get_co2_for_sold_garment(
     return emission_details
 
 
-def refresh_sold_garment_co2_values(wiser_client: WiserClient) -> None:
-    """Recalculate and persist CO2 values for sold garments."""
-    sold_garments = db_get_sold_garments_for_co2()
-    for garment in sold_garments:
-        emission_details = get_co2_for_sold_garment(
-            garment["id"], garment["type_id"], wiser_client
-        )
-        total_co2 = float(emission_details.fabric_blocks.total_emission) + float(
-            emission_details.processes.total_emission
+def get_co2_for_sold_garment(
+    garment_id: int,
+    garment_type_id: int,
+    wiser_client: WiserClient,
+) -> GarmentCo2Response:
+    """Calculate CO2 emissions for a sold garment from its actual linked fabric blocks."""
+    garment_inputs = db_get_sold_garment_co2_inputs(
+        [{"id": garment_id, "type_id": garment_type_id}]
+    )[garment_id]
+    prefetch_emissions(wiser_client, _sold_garment_activity_ids(garment_inputs))
+    return _calculate_sold_garment_co2(garment_id, garment_inputs, wiser_client)
+
+
+def calculate_sold_garments_co2(
+    sold_garments: list[dict], wiser_client: WiserClient
+) -> tuple[dict[int, GarmentCo2Response], dict[int, Exception]]:
+    """Calculate the CO2 of many sold garments in one pass.
+
+    Their inputs are loaded with grouped queries and every emission factor
+    is prefetched at once. Returns the results and the errors by garment ID;
+    a garment that fails does not stop the others.
+    """
+    inputs_by_garment = db_get_sold_garment_co2_inputs(sold_garments)
+    activity_ids = []
+    for garment_inputs in inputs_by_garment.values():
+        activity_ids.extend(_sold_garment_activity_ids(garment_inputs))
+    try:
+        prefetch_emissions(wiser_client, activity_ids)
+    except Exception:
+        # Lookups below fail, and are reported, per garment.
+        pass
+
+    results: dict[int, GarmentCo2Response] = {}
+    errors: dict[int, Exception] = {}
+    for garment_id, garment_inputs in inputs_by_garment.items():
+        try:
+            results[garment_id] = _calculate_sold_garment_co2(
+                garment_id, garment_inputs, wiser_client
+            )
+        except Exception as error:
+            errors[garment_id] = error
+    return results, errors
+
+
+def refresh_sold_garment_co2_values(
+    wiser_client: WiserClient, sold_garments: list[dict] | None = None
+) -> dict[int, Exception]:
+    """Calculate and persist CO2 values for sold garments.
+
+    Defaults to every sold garment whose value is missing or stale. The
+    values are written with a single executemany; the errors are returned by garment ID.
+    """
+    if sold_garments is None:
+        sold_garments = db_get_sold_garments_for_co2()
+    results, errors = calculate_sold_garments_co2(sold_garments, wiser_client)
+    if results:
+        db_update_garments_inventory_co2(
+            {
+                garment_id: float(emission_details.fabric_blocks.total_emission)
+                + float(emission_details.processes.total_emission)
+                for garment_id, emission_details in results.items()
+            },
+            {
+                garment["id"]: garment.get("co2_stale", 0)
+                for garment in sold_garments
+            },
         )
-        db_update_garment_inventory_co2(garment["id"], total_co2)
+    return errors
 
 
 def calculate_replacement_fabric_blocks_emissions(
@@ -1,24 +1,44 @@
 from __future__ import annotations
 
 import sqlite3
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from pathlib import Path
 from threading import Lock
 from time import time
-from typing import Any
+from typing import Any, Callable, Hashable, Iterable, TypeVar
 
 import requests
+from fastapi.concurrency import run_in_threadpool
+from requests.adapters import HTTPAdapter
 
+from ceis_backend.activity_dependencies import mark_sold_garments_stale
+from ceis_backend.co2_result_cache import co2_result_cache
 from ceis_backend.config import (
     DB_PATH,
     WISER_SP3_API_USER,
     WISER_SP3_API_KEY,
     WISER_AUTH_URL,
     WISER_API_BASE_URL,
+    WISER_EMISSION_CACHE_MAX_STALE_SECONDS,
+    WISER_EMISSION_MEMORY_CACHE_SIZE,
+    WISER_EMISSION_REFRESH_AHEAD_SECONDS,
+    WISER_EMISSION_REFRESH_BATCH_SIZE,
+    WISER_EMISSION_REFRESH_INTERVAL_SECONDS,
+    WISER_EMISSION_REFRESH_MAX_BACKOFF_SECONDS,
+    WISER_HTTP_POOL_HOSTS,
+    WISER_HTTP_POOL_MAXSIZE,
+    WISER_MAX_CONCURRENT_REQUESTS,
 )
+from ceis_backend.db_connection import get_connection
+from ceis_backend.designer_reference_cache import designer_reference_cache
+from ceis_backend.emission_cache import EmissionMemoryCache
+from ceis_backend.emission_refresh import EmissionRefresher
 
 
 EMISSION_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
 
+_T = TypeVar("_T")
+
 
 class WiserClientError(RuntimeError):
     """Raised when the backend cannot complete a Wiser API request."""
@@ -28,6 +48,44 @@ class WiserAuthError(WiserClientError):
     """Raised when the backend cannot authenticate with Wiser."""
 
 
+class _SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution.
+
+    The first caller runs the function; callers arriving while it is in
+    flight wait for and share its result or exception.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._calls: dict[Hashable, Future] = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], _T]) -> _T:
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.coalesced += 1
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
 class WiserClient:
     def __init__(
         self,
@@ -39,6 +97,15 @@ class WiserClient:
         timeout_seconds: float = 30.0,
         token_refresh_margin_seconds: int = 30,
         emission_cache_ttl_seconds: int = EMISSION_CACHE_TTL_SECONDS,
+        emission_cache_max_stale_seconds: int = WISER_EMISSION_CACHE_MAX_STALE_SECONDS,
+        emission_refresh_interval_seconds: float = WISER_EMISSION_REFRESH_INTERVAL_SECONDS,
+        emission_refresh_ahead_seconds: float = WISER_EMISSION_REFRESH_AHEAD_SECONDS,
+        emission_refresh_batch_size: int = WISER_EMISSION_REFRESH_BATCH_SIZE,
+        emission_refresh_max_backoff_seconds: float = WISER_EMISSION_REFRESH_MAX_BACKOFF_SECONDS,
+        emission_memory_cache_size: int = WISER_EMISSION_MEMORY_CACHE_SIZE,
+        max_concurrent_requests: int = WISER_MAX_CONCURRENT_REQUESTS,
+        http_pool_hosts: int = WISER_HTTP_POOL_HOSTS,
+        http_pool_maxsize: int = WISER_HTTP_POOL_MAXSIZE,
     ) -> None:
         self.auth_url = auth_url
         self.api_base_url = api_base_url.rstrip("/")
@@ -47,11 +114,72 @@ class WiserClient:
         self.timeout_seconds = timeout_seconds
         self.token_refresh_margin_seconds = token_refresh_margin_seconds
         self.emission_cache_ttl_seconds = emission_cache_ttl_seconds
+        self.emission_cache_max_stale_seconds = max(emission_cache_max_stale_seconds, 0)
+        self.max_concurrent_requests = max(int(max_concurrent_requests), 1)
+        self._emission_memory_cache = EmissionMemoryCache(
+            emission_memory_cache_size,
+            emission_cache_ttl_seconds + self.emission_cache_max_stale_seconds,
+        )
+        self._emission_refresher = EmissionRefresher(
+            self,
+            interval_seconds=emission_refresh_interval_seconds,
+            refresh_ahead_seconds=emission_refresh_ahead_seconds,
+            batch_size=emission_refresh_batch_size,
+            max_backoff_seconds=emission_refresh_max_backoff_seconds,
+        )
         self._access_token: str | None = None
         self._token_expires_at = 0.0
         self._token_lock = Lock()
+        self._session = self._build_session(http_pool_hosts, http_pool_maxsize)
+        self._emission_flights = _SingleFlight()
+        self._search_flights = _SingleFlight()
+        self._fetch_executor: ThreadPoolExecutor | None = None
+        self._fetch_executor_lock = Lock()
+
+    @staticmethod
+    def _build_session(pool_hosts: int, pool_maxsize: int) -> requests.Session:
+        # One long-lived session keeps TCP/TLS connections to the auth and API
+        # hosts alive between calls instead of handshaking on every request.
+        adapter = HTTPAdapter(
+            pool_connections=max(pool_hosts, 1),
+            pool_maxsize=max(pool_maxsize, 1),
+            pool_block=True,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def start_background_refresh(self) -> None:
+        """Start refreshing stale and soon-to-expire emission factors."""
+        self._emission_refresher.start()
+
+    def close(self) -> None:
+        """Stop the refresher and release the fetch threads and HTTP connections."""
+        self._emission_refresher.stop()
+        with self._fetch_executor_lock:
+            executor, self._fetch_executor = self._fetch_executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        self._session.close()
+
+    def _fetch_pool(self) -> ThreadPoolExecutor:
+        # One bounded pool for every batched fetch, so its threads and their
+        # pooled SQLite connections are reused instead of spawned per call.
+        # Created on first use, and again after close(), e.g. between tests.
+        with self._fetch_executor_lock:
+            if self._fetch_executor is None:
+                self._fetch_executor = ThreadPoolExecutor(
+                    self.max_concurrent_requests, thread_name_prefix="wiser-fetch"
+                )
+            return self._fetch_executor
 
     def search_activities(self, query: str) -> list[dict[str, Any]]:
+        return self._search_flights.do(
+            query, lambda: self._fetch_search_activities(query)
+        )
+
+    def _fetch_search_activities(self, query: str) -> list[dict[str, Any]]:
         body = self._request_json(
             "POST",
             "/activity/search/",
@@ -63,11 +191,68 @@ class WiserClient:
             raise WiserClientError("Wiser activity search returned an invalid payload")
         return search_results
 
+    def get_emissions_per_unit(
+        self, activity_ids: Iterable[int]
+    ) -> dict[int, float | None]:
+        """Resolve many activities at once, fetching cache misses in parallel.
+
+        Raises the first WiserClientError after all fetches have finished, so
+        the factors that did resolve are still cached.
+        """
+        emissions: dict[int, float | None] = {}
+        missing_activity_ids: list[int] = []
+        for activity_id in dict.fromkeys(activity_ids):
+            cache_hit, cached_emission = self._get_cached_emission_per_unit(
+                activity_id
+            )
+            if cache_hit:
+                emissions[activity_id] = cached_emission
+            else:
+                missing_activity_ids.append(activity_id)
+
+        if len(missing_activity_ids) == 1:
+            activity_id = missing_activity_ids[0]
+            emissions[activity_id] = self._load_emission_per_unit(activity_id)
+        elif missing_activity_ids:
+            executor = self._fetch_pool()
+            futures = {
+                activity_id: executor.submit(self._load_emission_per_unit, activity_id)
+                for activity_id in missing_activity_ids
+            }
+            wait(futures.values())
+            errors = [
+                future.exception()
+                for future in futures.values()
+                if future.exception() is not None
+            ]
+            if errors:
+                raise errors[0]
+            for activity_id, future in futures.items():
+                emissions[activity_id] = future.result()
+
+        return emissions
+
     def get_emission_per_unit(self, activity_id: int) -> float | None:
         cache_hit, cached_emission = self._get_cached_emission_per_unit(activity_id)
         if cache_hit:
             return cached_emission
+        return self._load_emission_per_unit(activity_id)
+
+    def _load_emission_per_unit(self, activity_id: int) -> float | None:
+        # Concurrent misses for one activity share a single Wiser call.
+        return self._emission_flights.do(
+            activity_id, lambda: self._fetch_uncached_emission_per_unit(activity_id)
+        )
+
+    def _fetch_uncached_emission_per_unit(self, activity_id: int) -> float | None:
+        # A flight that just finished may already have cached the value.
+        now = time()
+        entry = self._emission_memory_cache.get(activity_id, now, record_stats=False)
+        if entry is not None and now - entry[1] <= self.emission_cache_ttl_seconds:
+            return entry[0]
+        return self._fetch_emission_per_unit(activity_id)
 
+    def _fetch_emission_per_unit(self, activity_id: int) -> float | None:
         print(f"Fetching Wiser emission per unit for activity {activity_id}")
         body = self._request_json(
             "GET",
@@ -89,49 +274,139 @@ class WiserClient:
         self._cache_emission_per_unit(activity_id, None)
         return None
 
+    def clear_emission_memory_cache(self) -> None:
+        """Drop in-memory factors, e.g. after the cache table was bulk-loaded."""
+        self._emission_memory_cache.clear()
+
+    def emission_cache_stats(self) -> dict[str, int | float]:
+        """Hit/miss counters of the in-memory emission factor tier."""
+        return {
+            **self._emission_memory_cache.stats(),
+            "coalesced_fetches": self._emission_flights.coalesced,
+            **self._emission_refresher.stats(),
+        }
+
     def _get_cached_emission_per_unit(
         self, activity_id: int
     ) -> tuple[bool, float | None]:
-        if not Path(DB_PATH).exists():
+        now = time()
+        entry = self._emission_memory_cache.get(activity_id, now)
+        if entry is None:
+            entry = self._get_database_emission_entry(activity_id, now)
+            if entry is not None:
+                self._emission_memory_cache.put(activity_id, *entry)
+        if entry is None:
             return False, None
+        return True, self._serve_cached_entry(activity_id, entry, now)
+
+    def _serve_cached_entry(
+        self, activity_id: int, entry: tuple[float | None, float], now: float
+    ) -> float | None:
+        emission_per_unit, cached_at = entry
+        if now - cached_at > self.emission_cache_ttl_seconds:
+            # Serve the stale value now and let the refresher replace it.
+            self._emission_refresher.schedule(activity_id, cached_at)
+        return emission_per_unit
+
+    def _get_database_emission_entry(
+        self, activity_id: int, now: float
+    ) -> tuple[float | None, float] | None:
+        if not Path(DB_PATH).exists():
+            return None
 
         try:
-            with sqlite3.connect(DB_PATH) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
+            with get_connection() as conn:
+                row = conn.execute(
                     """
                     SELECT emission_per_unit, cached_at
                     FROM activity_emission_cache
                     WHERE activity_id = ?
                     """,
                     (activity_id,),
-                )
-                row = cursor.fetchone()
+                ).fetchone()
         except sqlite3.Error:
-            return False, None
+            return None
 
         if row is None:
-            return False, None
+            return None
 
         emission_per_unit, cached_at = row
         try:
-            cache_age_seconds = time() - float(cached_at)
+            cached_at = float(cached_at)
         except (TypeError, ValueError):
-            return False, None
+            return None
 
-        if cache_age_seconds > self.emission_cache_ttl_seconds:
-            return False, None
+        hard_expiry_seconds = (
+            self.emission_cache_ttl_seconds + self.emission_cache_max_stale_seconds
+        )
+        if now - cached_at > hard_expiry_seconds:
+            return None
+
+        return emission_per_unit, cached_at
+
+    def _find_expiring_emissions(self, expiring_before: float) -> dict[int, float]:
+        """Cached activities whose TTL ends before ``expiring_before``."""
+        if not Path(DB_PATH).exists():
+            return {}
+
+        try:
+            with get_connection() as conn:
+                rows = conn.execute(
+                    """
+                    SELECT activity_id, cached_at
+                    FROM activity_emission_cache
+                    WHERE cached_at <= ?
+                    ORDER BY cached_at
+                    """,
+                    (expiring_before - self.emission_cache_ttl_seconds,),
+                ).fetchall()
+        except sqlite3.Error:
+            return {}
 
-        return True, emission_per_unit
+        return {activity_id: float(cached_at) for activity_id, cached_at in rows}
+
+    def _refresh_emissions(
+        self, activity_ids: list[int]
+    ) -> dict[int, WiserClientError | None]:
+        """Re-fetch activities regardless of cache state; return errors by ID."""
+
+        def refresh(activity_id: int) -> None:
+            self._emission_flights.do(
+                activity_id, lambda: self._fetch_emission_per_unit(activity_id)
+            )
+
+        executor = self._fetch_pool()
+        futures = {
+            activity_id: executor.submit(refresh, activity_id)
+            for activity_id in activity_ids
+        }
+        wait(futures.values())
+        return {
+            activity_id: future.exception() for activity_id, future in futures.items()
+        }
 
     def _cache_emission_per_unit(
         self, activity_id: int, emission_per_unit: float | None
     ) -> None:
+        cached_at = time()
+        previous = self._emission_memory_cache.get(
+            activity_id, cached_at, record_stats=False
+        )
+        self._emission_memory_cache.put(activity_id, emission_per_unit, cached_at)
+        # A first fetch changes nothing a cached result can have read.
+        if previous is not None and previous[0] != emission_per_unit:
+            co2_result_cache.invalidate_activities([activity_id])
+            designer_reference_cache.invalidate_activities([activity_id])
         if not Path(DB_PATH).exists():
             return
 
         try:
-            with sqlite3.connect(DB_PATH) as conn:
+            with get_connection() as conn:
+                stored = conn.execute(
+                    "SELECT emission_per_unit FROM activity_emission_cache "
+                    "WHERE activity_id = ?",
+                    (activity_id,),
+                ).fetchone()
                 conn.execute(
                     """
                     INSERT INTO activity_emission_cache
@@ -141,10 +416,19 @@ class WiserClient:
                         emission_per_unit = excluded.emission_per_unit,
                         cached_at = excluded.cached_at
                     """,
-                    (activity_id, emission_per_unit, time()),
+                    (activity_id, emission_per_unit, cached_at),
                 )
+                # Persisted sold-garment CO2 only goes stale when the stored
+                # factor it was computed from changes (or was never stored).
+                if stored is None or stored[0] != emission_per_unit:
+                    mark_sold_garments_stale([activity_id], conn)
+                conn.commit()
         except sqlite3.Error:
             return
+        # Results may also have read the stored factor after it left memory.
+        if previous is None and stored is not None and stored[0] != emission_per_unit:
+            co2_result_cache.invalidate_activities([activity_id])
+            designer_reference_cache.invalidate_activities([activity_id])
 
     def _request_json(self, method: str, path: str, **kwargs: Any) -> dict[str, Any]:
         url = f"{self.api_base_url}/{path.lstrip('/')}"
@@ -191,7 +475,7 @@ class WiserClient:
 
     def _send_request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
         try:
-            return requests.request(
+            return self._session.request(
                 method,
                 url,
                 timeout=self.timeout_seconds,
@@ -225,7 +509,7 @@ class WiserClient:
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
         try:
-            response = requests.post(
+            response = self._session.post(
                 self.auth_url,
                 data=payload,
                 headers=headers,
@@ -254,3 +538,17 @@ class WiserClient:
             max(expires_in - 1, 0),
         )
         return access_token, time() + expires_in - refresh_margin
+
+
+class AsyncWiserClient:
+    """Awaitable facade of a ``WiserClient`` for async endpoints.
+
+    Wiser requests run in the worker threadpool, so a slow Wiser call only
+    holds a thread, never the loop.
+    """
+
+    def __init__(self, client: WiserClient) -> None:
+        self.client = client
+
+    async def search_activities(self, query: str) -> list[dict[str, Any]]:
+        return await run_in_threadpool(self.client.search_activities, query)
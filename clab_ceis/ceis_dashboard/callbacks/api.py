@@ -4,16 +4,38 @@ import config
 
 from ceis_backend.models import GarmentCo2Response
 
-
-def fetch_fabric_blocks():
+FABRIC_BLOCKS_PAGE_SIZE = 50
+
+
+def fetch_fabric_blocks(
+    after_id: int | None = None,
+    *,
+    material_id: int | None = None,
+    location_id: int | None = None,
+    min_quality: float | None = None,
+    limit: int = FABRIC_BLOCKS_PAGE_SIZE,
+) -> list[dict]:
+    """One page of unassigned fabric blocks with IDs above ``after_id``.
+
+    Blocks come in ID order, so the last ID of a full page is the
+    ``after_id`` of the next one.
+    """
     try:
-        resp = requests.get(f"{config.BACKEND_API_URL}/fabric-blocks")
+        resp = requests.get(
+            f"{config.BACKEND_API_URL}/fabric-blocks",
+            params={
+                "limit": limit,
+                "after_id": after_id,
+                "material_id": material_id,
+                "location_id": location_id,
+                "min_quality": min_quality,
+            },
+        )
 
         if resp.status_code != 200:
             return []
 
         backend_data = resp.json()
-
         for block in backend_data:
             processes = block.get("processes", [])
 
@@ -86,12 +108,26 @@ def fetch_designer_balance_options() -> dict:
         return {}
 
 
+# Last reference payload and its ETag; the backend answers 304 while it holds.
+_designer_garment_reference: dict = {"etag": None, "payload": {}}
+
+
 def fetch_designer_garment_reference() -> dict:
     try:
-        resp = requests.get(f"{config.BACKEND_API_URL}/designer-garment/reference")
+        etag = _designer_garment_reference["etag"]
+        resp = requests.get(
+            f"{config.BACKEND_API_URL}/designer-garment/reference",
+            headers={"If-None-Match": etag} if etag else {},
+        )
+        if resp.status_code == 304:
+            return _designer_garment_reference["payload"]
         if resp.status_code != 200:
             return {}
-        return resp.json()
+        payload = resp.json()
+        _designer_garment_reference.update(
+            etag=resp.headers.get("ETag"), payload=payload
+        )
+        return payload
     except Exception:
         return {}
 
@@ -135,3 +171,37 @@ def get_co2(garment_type_id: int, material_id: int) -> GarmentCo2Response | None
     except Exception as e:
         print(e)
         return None
+
+
+def get_co2_batch(
+    pairs: list[tuple[int, int]],
+) -> dict[tuple[int, int], GarmentCo2Response | None]:
+    """CO2 of many (garment type, material) pairs in one request.
+
+    Pairs the backend could not calculate map to None, like in get_co2.
+    """
+    results = {pair: None for pair in pairs}
+    if not pairs:
+        return results
+    try:
+        resp = requests.post(
+            f"{config.BACKEND_API_URL}/co2/batch",
+            json={
+                "items": [
+                    {"garment_type_id": garment_type_id, "material_id": material_id}
+                    for garment_type_id, material_id in pairs
+                ]
+            },
+        )
+        if resp.status_code != 200:
+            return results
+
+        for item in resp.json():
+            if item.get("result") is not None:
+                pair = (item["garment_type_id"], item["material_id"])
+                results[pair] = GarmentCo2Response(**item["result"])
+        return results
+
+    except Exception as e:
+        print(e)
+        return results
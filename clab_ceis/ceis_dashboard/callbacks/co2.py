@@ -3,7 +3,7 @@ from dash import Dash, Input, Output, html
 
 import ceis_data
 from ceis_dashboard.callbacks.api import (
-    get_co2,
+    get_co2_batch,
     fetch_garment_types,
     fetch_materials_for_garment,
 )
@@ -346,11 +346,14 @@ def register_co2_callbacks(app: Dash, data: ceis_data.CeisData) -> None:
                 ]
             )
 
+        co2_by_pair = get_co2_batch(
+            [(garment_id, material["id"]) for material in materials]
+        )
         sections = []
         for material in materials:
             material_id = material["id"]
             material_name = material.get("name", "Unknown")
-            co2_data = get_co2(garment_id, material_id)
+            co2_data = co2_by_pair.get((garment_id, material_id))
             if not co2_data:
                 sections.append(
                     html.Div(
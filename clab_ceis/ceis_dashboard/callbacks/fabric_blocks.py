@@ -5,7 +5,7 @@ from dash.dependencies import ALL
 
 import config
 import ceis_data
-from ceis_dashboard.callbacks.api import fetch_fabric_blocks
+from ceis_dashboard.callbacks.api import FABRIC_BLOCKS_PAGE_SIZE, fetch_fabric_blocks
 from ceis_backend.models import FabricBlockInventoryCreate, InventoryProcessInfo
 
 
@@ -30,6 +30,7 @@ def register_fabric_block_callbacks(app: Dash, data: ceis_data.CeisData) -> None
 
     @app.callback(
         Output("fabric-location", "options"),
+        Output("fabric-blocks-filter-location", "options"),
         Input("url", "pathname"),
     )
     def load_locations(pathname):
@@ -39,15 +40,17 @@ def register_fabric_block_callbacks(app: Dash, data: ceis_data.CeisData) -> None
             if resp.status_code == 200:
                 data = resp.json()
 
-                return [{"label": loc["name"], "value": loc["id"]} for loc in data]
+                options = [{"label": loc["name"], "value": loc["id"]} for loc in data]
+                return options, options
 
         except Exception:
             pass
 
-        return []
+        return [], []
 
     @app.callback(
         Output("fabric-material", "options"),
+        Output("fabric-blocks-filter-material", "options"),
         Input("url", "pathname"),
     )
     def load_materials(pathname):
@@ -57,30 +60,26 @@ def register_fabric_block_callbacks(app: Dash, data: ceis_data.CeisData) -> None
             if resp.status_code == 200:
                 data = resp.json()
 
-                return [{"label": mat["name"], "value": mat["id"]} for mat in data]
+                options = [{"label": mat["name"], "value": mat["id"]} for mat in data]
+                return options, options
 
         except Exception:
             pass
 
-        return []
+        return [], []
 
     @app.callback(
         Output("delete-fabric-block-id", "options"),
-        Input("url", "pathname"),
-        Input("refresh-fabric-blocks", "n_clicks"),
-        Input("add-fabric-blocks", "n_clicks"),
-        Input("delete-fabric-block-button", "n_clicks"),
+        Input("fabric-blocks-table", "data"),
     )
-    def load_fabric_block_inventory_options(
-        pathname, refresh_clicks, add_clicks, delete_clicks
-    ):
-        blocks = fetch_fabric_blocks()
+    def load_fabric_block_inventory_options(blocks):
+        # The blocks of the page on display, not the whole inventory.
         return [
             {
                 "label": f"{block.get('id')} - {block.get('type')}",
                 "value": block.get("id"),
             }
-            for block in blocks
+            for block in blocks or []
         ]
 
     # Callback to add/remove process input fields
@@ -169,10 +168,19 @@ def register_fabric_block_callbacks(app: Dash, data: ceis_data.CeisData) -> None
         Output("fabric-blocks-table", "data"),
         Output("fabric-add-status", "children"),
         Output("fabric-remove-status", "children"),
+        Output("fabric-blocks-page-cursors", "data"),
+        Output("fabric-blocks-page-status", "children"),
+        Output("fabric-blocks-previous-page", "disabled"),
+        Output("fabric-blocks-next-page", "disabled"),
         [
             Input("refresh-fabric-blocks", "n_clicks"),
             Input("add-fabric-blocks", "n_clicks"),
             Input("delete-fabric-block-button", "n_clicks"),
+            Input("fabric-blocks-previous-page", "n_clicks"),
+            Input("fabric-blocks-next-page", "n_clicks"),
+            Input("fabric-blocks-filter-material", "value"),
+            Input("fabric-blocks-filter-location", "value"),
+            Input("fabric-blocks-filter-min-quality", "value"),
         ],
         [
             State("fabric-type", "value"),
@@ -183,12 +191,18 @@ def register_fabric_block_callbacks(app: Dash, data: ceis_data.CeisData) -> None
             State({"type": "process-amount", "index": ALL}, "value"),
             State("delete-fabric-block-id", "value"),
             State("fabric-blocks-table", "data"),
+            State("fabric-blocks-page-cursors", "data"),
         ],
     )
     def update_fabric_table(
         refresh_clicks,
         add_clicks,
         delete_clicks,
+        previous_clicks,
+        next_clicks,
+        filter_material,
+        filter_location,
+        filter_min_quality,
         type_val,
         location_val,
         material_val,
@@ -197,46 +211,73 @@ def register_fabric_block_callbacks(app: Dash, data: ceis_data.CeisData) -> None
         process_amounts,
         delete_id,
         current_data,
+        cursors,
     ):
         ctx = callback_context
         triggered = ctx.triggered[0]["prop_id"].split(".")[0] if ctx.triggered else None
+        cursors = cursors or [None]
+
+        def show_page(page_cursors, add_msg="", remove_msg=""):
+            # One page per request; its last ID is the next page's cursor.
+            blocks = fetch_fabric_blocks(
+                page_cursors[-1],
+                material_id=filter_material,
+                location_id=filter_location,
+                min_quality=filter_min_quality,
+            )
+            return (
+                blocks,
+                add_msg,
+                remove_msg,
+                page_cursors,
+                f"Page {len(page_cursors)}",
+                len(page_cursors) == 1,
+                len(blocks) < FABRIC_BLOCKS_PAGE_SIZE,
+            )
 
-        if not triggered:
-            return fetch_fabric_blocks(), "", ""
-        if triggered == "refresh-fabric-blocks":
-            return fetch_fabric_blocks(), "", ""
+        def keep_page(add_msg="", remove_msg=""):
+            return (no_update, add_msg, remove_msg) + (no_update,) * 4
+
+        if not triggered or triggered == "refresh-fabric-blocks":
+            return show_page(cursors)
+        if triggered.startswith("fabric-blocks-filter-"):
+            return show_page([None])
+        if triggered == "fabric-blocks-previous-page":
+            return show_page(cursors[:-1] or [None])
+        if triggered == "fabric-blocks-next-page":
+            if not current_data:
+                return keep_page()
+            return show_page(cursors + [current_data[-1]["id"]])
 
         if triggered == "add-fabric-blocks":
 
             if not type_val:
-                return no_update, "Please select a fabric type.", ""
+                return keep_page("Please select a fabric type.")
 
             if quality_val is None:
-                return no_update, "Please enter a quality percentage.", ""
+                return keep_page("Please enter a quality percentage.")
             try:
                 quality = float(quality_val)
             except (TypeError, ValueError):
-                return no_update, "Quality must be a valid number.", ""
+                return keep_page("Quality must be a valid number.")
             if quality < 0 or quality > 100:
-                return no_update, "Quality must be between 0 and 100.", ""
+                return keep_page("Quality must be between 0 and 100.")
 
             processes: list[InventoryProcessInfo] = []
             for name, amount in zip(process_names or [], process_amounts or []):
                 if name is None:
                     continue
                 if amount is None:
-                    return (
-                        no_update,
-                        "Please provide an amount for each selected process.",
-                        "",
+                    return keep_page(
+                        "Please provide an amount for each selected process."
                     )
                 try:
                     process_id = int(name)
                     process_amount = float(amount)
                 except (TypeError, ValueError):
-                    return no_update, "Process inputs must be valid numbers.", ""
+                    return keep_page("Process inputs must be valid numbers.")
                 if process_amount <= 0:
-                    return no_update, "Process amount must be greater than 0.", ""
+                    return keep_page("Process amount must be greater than 0.")
                 processes.append(
                     InventoryProcessInfo(process_id=process_id, amount=process_amount)
                 )
@@ -262,36 +303,30 @@ def register_fabric_block_callbacks(app: Dash, data: ceis_data.CeisData) -> None
                     )
 
                     # Now fetch fresh data
-                    return fetch_fabric_blocks(), status_msg, ""
+                    return show_page(cursors, status_msg)
 
                 else:
-                    return (
-                        no_update,
-                        f"Error adding fabric block: {resp.status_code}",
-                        "",
-                    )
+                    return keep_page(f"Error adding fabric block: {resp.status_code}")
 
             except Exception as e:
-                return no_update, f"Error connecting to backend: {str(e)}", ""
+                return keep_page(f"Error connecting to backend: {str(e)}")
 
         if triggered == "delete-fabric-block-button":
             if not delete_id:
-                return no_update, "", "Please select a fabric block to remove."
+                return keep_page(remove_msg="Please select a fabric block to remove.")
 
             try:
                 resp = requests.delete(
                     f"{config.BACKEND_API_URL}/fabric-blocks/{delete_id}"
                 )
                 if resp.status_code in (200, 204):
-                    return fetch_fabric_blocks(), "", "Fabric block removed."
+                    return show_page(cursors, remove_msg="Fabric block removed.")
                 if resp.status_code == 404:
-                    return no_update, "", "Fabric block not found."
-                return (
-                    no_update,
-                    "",
-                    f"Error removing fabric block: {resp.status_code}",
+                    return keep_page(remove_msg="Fabric block not found.")
+                return keep_page(
+                    remove_msg=f"Error removing fabric block: {resp.status_code}"
                 )
             except Exception as e:
-                return no_update, "", f"Error connecting to backend: {str(e)}"
+                return keep_page(remove_msg=f"Error connecting to backend: {str(e)}")
 
-        return no_update, "", ""
+        return keep_page()
@@ -33,6 +33,10 @@ def _build_strategy_progress_section(progress_data: dict):
         if delta_pct >= 0
         else f"{abs(delta_pct):.2f} percentage points below threshold"
     )
+    co2_pending = int(aggregates.get("co2_pending_garments", 0))
+    co2_text = "Summed CO2eq across all sold garments"
+    if co2_pending:
+        co2_text += f" ({co2_pending} garments pending)"
 
     return html.Div(
         [
@@ -68,7 +72,7 @@ def _build_strategy_progress_section(progress_data: dict):
                     _metric_card(
                         "Environmental Costs",
                         f"{float(aggregates.get('environmental_cost_co2eq', 0)):.2f} kg CO2eq",
-                        "Summed CO2eq across all sold garments",
+                        co2_text,
                         "#7c3aed",
                     ),
                     _metric_card(
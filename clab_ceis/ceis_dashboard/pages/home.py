@@ -28,6 +28,52 @@ def get_index_layout():
                 id="refresh-fabric-blocks",
                 n_clicks=0,
             ),
+            html.Div(
+                [
+                    html.Div(
+                        [
+                            html.Label("Material"),
+                            dcc.Dropdown(
+                                id="fabric-blocks-filter-material",
+                                options=[],
+                                placeholder="Any material",
+                                clearable=True,
+                            ),
+                        ],
+                        className="field-panel",
+                    ),
+                    html.Div(
+                        [
+                            html.Label("Location"),
+                            dcc.Dropdown(
+                                id="fabric-blocks-filter-location",
+                                options=[],
+                                placeholder="Any location",
+                                clearable=True,
+                            ),
+                        ],
+                        className="field-panel",
+                    ),
+                    html.Div(
+                        [
+                            html.Label("Minimum quality (%)"),
+                            dcc.Input(
+                                id="fabric-blocks-filter-min-quality",
+                                type="number",
+                                min=0,
+                                max=100,
+                                step=1,
+                                placeholder="e.g., 80",
+                                debounce=True,
+                            ),
+                        ],
+                        className="field-panel",
+                    ),
+                ],
+                className="form-grid",
+            ),
+            # after_id of every page up to the current one; None is the first.
+            dcc.Store(id="fabric-blocks-page-cursors", data=[None]),
             dash_table.DataTable(
                 id="fabric-blocks-table",
                 columns=[
@@ -47,6 +93,24 @@ def get_index_layout():
                 style_cell={"textAlign": "center", "padding": "10px"},
                 style_header={"fontWeight": "bold"},
             ),
+            html.Div(
+                [
+                    html.Button(
+                        "Previous Page",
+                        id="fabric-blocks-previous-page",
+                        n_clicks=0,
+                        disabled=True,
+                    ),
+                    html.Span(id="fabric-blocks-page-status"),
+                    html.Button(
+                        "Next Page",
+                        id="fabric-blocks-next-page",
+                        n_clicks=0,
+                        disabled=True,
+                    ),
+                ],
+                className="button-row",
+            ),
         ],
         className="panel table-panel",
     )
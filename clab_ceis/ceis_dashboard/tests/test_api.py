@@ -4,9 +4,10 @@ from callbacks import api
 
 
 class _Response:
-    def __init__(self, status_code: int, payload):
+    def __init__(self, status_code: int, payload, headers=None):
         self.status_code = status_code
         self._payload = payload
+        self.headers = headers or {}
 
     def json(self):
         return self._payload
@@ -25,8 +26,15 @@ def test_fetch_garment_types_returns_payload(monkeypatch):
 
 
 def test_fetch_fabric_blocks_formats_processes(monkeypatch):
-    def fake_get(url):
+    def fake_get(url, params=None):
         assert url.endswith("/fabric-blocks")
+        assert params == {
+            "limit": api.FABRIC_BLOCKS_PAGE_SIZE,
+            "after_id": None,
+            "material_id": None,
+            "location_id": None,
+            "min_quality": None,
+        }
         return _Response(
             200,
             [
@@ -54,6 +62,30 @@ def test_fetch_fabric_blocks_formats_processes(monkeypatch):
     assert result[0]["processes"] == "sewing(0.42)"
 
 
+def test_fetch_fabric_blocks_requests_a_single_filtered_page(monkeypatch):
+    requests_made = []
+
+    def fake_get(url, params=None):
+        assert url.endswith("/fabric-blocks")
+        requests_made.append(params)
+        return _Response(200, [{"id": 8, "processes": []}])
+
+    monkeypatch.setattr(api.requests, "get", fake_get)
+
+    result = api.fetch_fabric_blocks(7, material_id=2, location_id=3, min_quality=80.0)
+
+    assert [block["id"] for block in result] == [8]
+    assert requests_made == [
+        {
+            "limit": api.FABRIC_BLOCKS_PAGE_SIZE,
+            "after_id": 7,
+            "material_id": 2,
+            "location_id": 3,
+            "min_quality": 80.0,
+        }
+    ]
+
+
 def test_fetch_strategy_progress_returns_payload(monkeypatch):
     payload = {
         "aggregates": {
@@ -72,3 +104,68 @@ def test_fetch_strategy_progress_returns_payload(monkeypatch):
     result = api.fetch_strategy_progress()
 
     assert result == payload
+
+
+def test_fetch_designer_garment_reference_revalidates_with_etag(monkeypatch):
+    payload = {"materials": [{"id": 1, "name": "hemp"}]}
+    sent_etags = []
+
+    def fake_get(url, headers=None):
+        assert url.endswith("/designer-garment/reference")
+        sent_etags.append(headers.get("If-None-Match"))
+        if headers.get("If-None-Match") == '"v1"':
+            return _Response(304, None, {"ETag": '"v1"'})
+        return _Response(200, payload, {"ETag": '"v1"'})
+
+    monkeypatch.setattr(api.requests, "get", fake_get)
+    monkeypatch.setattr(
+        api, "_designer_garment_reference", {"etag": None, "payload": {}}
+    )
+
+    assert api.fetch_designer_garment_reference() == payload
+    assert api.fetch_designer_garment_reference() == payload
+    assert sent_etags == [None, '"v1"']
+
+
+def test_get_co2_batch_posts_all_pairs_once(monkeypatch):
+    result_payload = {
+        "processes": {"details": [], "total_emission": 1.5},
+        "fabric_blocks": {"details": [], "total_emission": 2.0},
+    }
+    requests_made = []
+
+    def fake_post(url, json=None):
+        assert url.endswith("/co2/batch")
+        requests_made.append(json)
+        return _Response(
+            200,
+            [
+                {
+                    "garment_type_id": 1,
+                    "material_id": 2,
+                    "result": result_payload,
+                    "error": None,
+                },
+                {
+                    "garment_type_id": 1,
+                    "material_id": 3,
+                    "result": None,
+                    "error": {"status_code": 400, "detail": "Invalid material"},
+                },
+            ],
+        )
+
+    monkeypatch.setattr(api.requests, "post", fake_post)
+
+    result = api.get_co2_batch([(1, 2), (1, 3)])
+
+    assert requests_made == [
+        {
+            "items": [
+                {"garment_type_id": 1, "material_id": 2},
+                {"garment_type_id": 1, "material_id": 3},
+            ]
+        }
+    ]
+    assert result[(1, 2)].processes.total_emission == 1.5
+    assert result[(1, 3)] is None
@@ -88,8 +88,6 @@ def test_dashboard_api_reads_seeded_backend_data(tmp_path):
             l["id"] for l in locations.json() if l["name"] == "St. Gallen"
         )
 
-        baseline_blocks = api.fetch_fabric_blocks()
-
         create_response = requests.post(
             f"{base_url}/fabric-blocks",
             json={
@@ -100,9 +98,13 @@ def test_dashboard_api_reads_seeded_backend_data(tmp_path):
             timeout=5,
         )
         assert create_response.status_code == 200
+        created_id = create_response.json()["id"]
 
-        blocks = api.fetch_fabric_blocks()
-        assert len(blocks) == len(baseline_blocks) + 1
+        # The new block has the highest ID, so it opens the page after it.
+        blocks = api.fetch_fabric_blocks(
+            created_id - 1, location_id=st_gallen_location_id
+        )
+        assert [block["id"] for block in blocks] == [created_id]
 
         matching_blocks = [
             block